@@ -1,17 +1,18 @@
 """
 Flask应用工厂函数
 """
-from flask import Flask
+from flask import Flask, current_app
 from flask_sqlalchemy import SQLAlchemy
 from flask_migrate import Migrate
 from flask_cors import CORS
 from flask_jwt_extended import JWTManager
 from flask_restx import Api
 
+from app.utils.db_routing import RoutingSession
 from config import config
 
-# 初始化扩展
-db = SQLAlchemy()
+# 初始化扩展（会话按请求类型在主库和只读副本之间路由）
+db = SQLAlchemy(session_options={'class_': RoutingSession})
 migrate = Migrate()
 cors = CORS()
 jwt = JWTManager()
@@ -22,14 +23,30 @@ def create_app(config_name='default'):
     
     # 加载配置
     app.config.from_object(config[config_name])
+    app.config['CONFIG_NAME'] = config_name
     config[config_name].init_app(app)
+
+    # 反向代理之后按可信的转发头还原客户端IP（限流、登录记录依赖 request.remote_addr）
+    if app.config.get('PROXY_FIX_HOPS'):
+        from werkzeug.middleware.proxy_fix import ProxyFix
+        hops = app.config['PROXY_FIX_HOPS']
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=hops, x_proto=hops)
     
     # 初始化扩展
+    from app.utils.db_pool import configure_engine_options, init_pool_metrics
+    from app.utils.db_routing import init_db_routing
+    configure_engine_options(app)
+    init_db_routing(app)
     db.init_app(app)
+    init_pool_metrics(app)
     migrate.init_app(app, db)
     cors.init_app(app, origins=app.config['CORS_ORIGINS'])
     jwt.init_app(app)
 
+    # 初始化响应缓存
+    from app.utils.response_cache import init_cache
+    init_cache(app)
+
     # 注册JWT回调
     register_jwt_callbacks(jwt)
     
@@ -56,6 +73,10 @@ def create_app(config_name='default'):
     
     # 注册错误处理器
     register_error_handlers(app)
+
+    # 注册监控端点（详细健康检查和系统指标）
+    from app.utils.monitoring import init_monitoring
+    init_monitoring(app)
     
     # 注册JWT回调
     register_jwt_callbacks(jwt)
@@ -64,6 +85,16 @@ def create_app(config_name='default'):
     from app.commands import register_commands
     register_commands(app)
 
+    # 预热PDF渲染上下文（中文字体注册和样式构建）；默认关闭，gunicorn工作进程在 gunicorn.conf.py 中预热
+    if app.config.get('PDF_WARMUP_ON_START'):
+        from app.utils.export import warm_pdf_renderer
+        warm_pdf_renderer()
+
+    # 后台预热热门题库的缓存，避免部署后的首批请求全部未命中
+    if app.config.get('CACHE_WARMUP_ON_START'):
+        from app.services.cache_warmup import start_background_warmup
+        start_background_warmup(app)
+
     return app
 
 def register_error_handlers(app):
@@ -109,15 +140,21 @@ def register_jwt_callbacks(jwt):
 
     @jwt.user_lookup_loader
     def user_lookup_callback(_jwt_header, jwt_data):
-        """用户查找回调"""
-        identity = jwt_data["sub"]
-        # identity现在是字符串，需要转换为整数
-        try:
-            user_id = int(identity)
-            from app.models import User
-            return User.query.filter_by(id=user_id).one_or_none()
-        except (ValueError, TypeError):
-            return None
+        """用户查找回调（与权限装饰器共用请求内的用户缓存，claims授权模式的只读请求不查询数据库）"""
+        from app.utils.identity import lookup_token_user
+        return lookup_token_user(jwt_data)
+
+    @jwt.token_in_blocklist_loader
+    def token_revoked_check(_jwt_header, jwt_payload):
+        """已登出或被撤销的令牌（进程内布隆过滤器，通常不查询数据库）"""
+        if not current_app.config.get('JWT_REVOCATION_ENABLED'):
+            return False
+        from app.services.token_revocation import is_token_revoked
+        return is_token_revoked(jwt_payload)
+
+    @jwt.revoked_token_loader
+    def revoked_token_callback(jwt_header, jwt_payload):
+        return {'message': 'Token已被撤销'}, 401
 
     @jwt.expired_token_loader
     def expired_token_callback(jwt_header, jwt_payload):
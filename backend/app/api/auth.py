@@ -6,14 +6,17 @@ from flask import request, current_app
 from flask_restx import Namespace, Resource, fields
 from flask_jwt_extended import (
     create_access_token, create_refresh_token, jwt_required,
-    get_jwt_identity, get_jwt, verify_jwt_in_request
+    get_jwt_identity, get_jwt, get_jti, verify_jwt_in_request
 )
 from marshmallow import Schema, fields as ma_fields, validate, ValidationError
 import re
 
 from app import db
-from app.models import User, UserSession, Tenant
-from app.utils.decorators import admin_required, tenant_required
+from app.models import User, UserSession
+from app.services.token_revocation import revoke_sessions, revoke_user_sessions
+from app.utils.decorators import admin_required, tenant_required, rate_limit
+from app.utils.identity import load_user
+from app.utils.tenants import get_active_tenant_by_code, tenant_disabled
 from app.utils.validators import validate_email, validate_password
 
 # 创建命名空间
@@ -76,6 +79,7 @@ class UserProfileSchema(Schema):
 @auth_bp.route('/login')
 class Login(Resource):
     @auth_bp.expect(login_model)
+    @rate_limit(scope='login', config_key='RATELIMIT_LOGIN')
     @auth_bp.marshal_with(token_model)
     def post(self):
         """用户登录"""
@@ -100,6 +104,9 @@ class Login(Resource):
         if not user.is_active:
             return {'message': '账户已被禁用，请联系管理员'}, 401
 
+        if tenant_disabled(user.tenant_id):
+            return {'message': '所属租户已被停用，请联系管理员'}, 401
+
         # 更新最后登录时间和IP
         user.last_login = datetime.utcnow()
         user.last_login_ip = request.remote_addr
@@ -107,6 +114,9 @@ class Login(Resource):
         # 设置令牌过期时间
         remember_me = data.get('remember_me', False)
         expires_delta = timedelta(days=30) if remember_me else timedelta(hours=24)
+        if current_app.config['AUTHZ_MODE'] == 'claims':
+            # 令牌声明不随用户修改实时更新，访问令牌使用短有效期，过期后用刷新令牌续期
+            expires_delta = min(expires_delta, current_app.config['AUTHZ_CLAIMS_TOKEN_EXPIRES'])
 
         # 生成令牌（包含用户角色和租户信息）
         additional_claims = {
@@ -122,13 +132,14 @@ class Login(Resource):
         )
         refresh_token = create_refresh_token(identity=str(user.id))
 
-        # 记录用户会话
+        # 记录用户会话（jti用于登出后撤销令牌；会话在刷新令牌过期后结束）
         session = UserSession(
             user_id=user.id,
-            access_token_jti=None,  # 暂时设为None，因为JWT还未在上下文中
+            access_token_jti=get_jti(access_token),
+            refresh_token_jti=get_jti(refresh_token),
             ip_address=request.remote_addr,
             user_agent=request.headers.get('User-Agent', ''),
-            expires_at=datetime.utcnow() + expires_delta
+            expires_at=datetime.utcnow() + max(expires_delta, current_app.config['JWT_REFRESH_TOKEN_EXPIRES'])
         )
 
         try:
@@ -167,7 +178,7 @@ class Register(Resource):
         # 处理租户信息（多租户支持）
         tenant_id = 'default'  # 默认租户
         if tenant_code:
-            tenant = Tenant.query.filter_by(code=tenant_code, is_active=True).first()
+            tenant = get_active_tenant_by_code(tenant_code)
             if tenant:
                 tenant_id = tenant.id
             else:
@@ -229,7 +240,7 @@ class RefreshToken(Resource):
     def post(self):
         """刷新访问令牌"""
         current_user_id = int(get_jwt_identity())  # 转换为整数
-        user = User.query.get(current_user_id)
+        user = load_user(current_user_id)
 
         if not user or not user.is_active:
             return {'message': '用户不存在或已被禁用'}, 401
@@ -246,6 +257,16 @@ class RefreshToken(Resource):
             additional_claims=additional_claims
         )
 
+        # 会话记录新的访问令牌，登出时撤销的是最近签发的令牌
+        session = UserSession.query.filter_by(refresh_token_jti=get_jwt()['jti']).first()
+        if session:
+            session.access_token_jti = get_jti(access_token)
+            try:
+                db.session.commit()
+            except Exception as e:
+                db.session.rollback()
+                current_app.logger.error(f"Failed to update user session: {e}")
+
         return {
             'access_token': access_token
         }
@@ -256,7 +277,7 @@ class CurrentUser(Resource):
     def get(self):
         """获取当前用户信息"""
         current_user_id = int(get_jwt_identity())  # 转换为整数
-        user = User.query.get(current_user_id)
+        user = load_user(current_user_id)
         
         if not user:
             return {'message': '用户不存在'}, 404
@@ -271,7 +292,7 @@ class CurrentUser(Resource):
     def put(self):
         """更新用户资料"""
         current_user_id = get_jwt_identity()
-        user = User.query.get(current_user_id)
+        user = load_user(current_user_id)
 
         if not user:
             return {'message': '用户不存在'}, 404
@@ -325,7 +346,7 @@ class ChangePassword(Resource):
     def post(self):
         """修改密码"""
         current_user_id = get_jwt_identity()
-        user = User.query.get(current_user_id)
+        user = load_user(current_user_id)
 
         if not user:
             return {'message': '用户不存在'}, 404
@@ -340,8 +361,9 @@ class ChangePassword(Resource):
         if not user.check_password(data['old_password']):
             return {'message': '当前密码错误'}, 400
 
-        # 设置新密码
+        # 设置新密码，并使该用户已签发的令牌全部失效
         user.set_password(data['new_password'])
+        revoke_user_sessions(user.id)
 
         try:
             db.session.commit()
@@ -360,7 +382,7 @@ class Logout(Resource):
         current_user_id = get_jwt_identity()
         jti = get_jwt().get('jti')
 
-        # 将当前会话标记为已登出
+        # 将当前会话标记为已登出，会话的访问令牌和刷新令牌随之撤销
         if jti:
             try:
                 session = UserSession.query.filter_by(
@@ -368,7 +390,7 @@ class Logout(Resource):
                     access_token_jti=jti
                 ).first()
                 if session:
-                    session.is_active = False
+                    revoke_sessions([session])
                     db.session.commit()
             except Exception as e:
                 db.session.rollback()
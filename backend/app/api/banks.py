@@ -1,20 +1,36 @@
 """
 题库管理API - 支持多租户
 """
-from flask import request, current_app, send_file, jsonify
+from flask import request, current_app, send_file, jsonify, Response, stream_with_context
 from flask_restx import Namespace, Resource, fields
 from flask_jwt_extended import jwt_required, get_jwt_identity, get_jwt
 from marshmallow import Schema, fields as ma_fields, validate, ValidationError
 from sqlalchemy import and_, or_, func
 import io
 import json
+import tempfile
 from datetime import datetime
 
 from app import db
-from app.models import User, QuestionBank, UserProgress, Question
-from app.utils.decorators import tenant_required, admin_required, log_user_action, optional_jwt
+from app.models import QuestionBank, UserProgress, ExportJob
+from app.utils.decorators import tenant_required, admin_required, log_user_action, optional_jwt, rate_limit
+from app.utils.identity import current_identity, load_user
+from app.utils.db_routing import use_primary
+from app.utils.response_cache import cached_response
+from app.utils.tenants import get_tenant
 from app.utils.validators import validate_tags
-from app.utils.export import BankExporter, get_available_formats
+from app.services.export_cache import (
+    ExportCache, RENDERED_EXPORT_FORMATS, render_bank_export, invalidate_bank_exports, send_export_file
+)
+from app.services.export_jobs import create_export_job, dispatch_pending_jobs
+from app.utils.export import (
+    get_available_formats, write_parquet, PARQUET_ANSWER_COLUMNS, PARQUET_AVAILABLE, XLSX_AVAILABLE
+)
+from app.utils.export_archive import ARCHIVE_FORMATS, archive_bank_ids, stream_bank_archive
+from app.utils.export_stream import (
+    build_bank_info, count_bank_questions, iter_bank_answers, iter_bank_questions,
+    stream_json, stream_jsonl, gzip_stream, attachment_headers
+)
 
 # 创建命名空间
 banks_bp = Namespace('banks', description='题库管理相关接口')
@@ -91,6 +107,7 @@ class BankQuerySchema(Schema):
 
 @banks_bp.route('')
 class BankList(Resource):
+    @cached_response(['banks'], user_progress=True, stale_while_revalidate=True)
     @optional_jwt
     @banks_bp.marshal_with(bank_list_model)
     def get(self):
@@ -253,6 +270,7 @@ class BankList(Resource):
 
 @banks_bp.route('/<int:bank_id>')
 class BankDetail(Resource):
+    @cached_response(lambda bank_id: [f'bank:{bank_id}'], user_progress=True)
     @banks_bp.marshal_with(bank_model)
     def get(self, bank_id):
         """获取题库详情"""
@@ -265,7 +283,7 @@ class BankDetail(Resource):
         except:
             pass
 
-        current_user = User.query.get(current_user_id) if current_user_id else None
+        current_user = current_identity() if current_user_id else None
         
         if not bank.can_access(current_user):
             return {'message': '无权访问此题库'}, 403
@@ -287,7 +305,7 @@ class BankDetail(Resource):
     def put(self, bank_id):
         """更新题库"""
         current_user_id = int(get_jwt_identity())  # 转换为整数
-        current_user = User.query.get(current_user_id)
+        current_user = load_user(current_user_id)
         bank = QuestionBank.query.get_or_404(bank_id)
         
         # 检查编辑权限
@@ -311,13 +329,14 @@ class BankDetail(Resource):
             db.session.rollback()
             return {'message': '更新失败，请稍后重试'}, 500
         
+        invalidate_bank_exports(bank.id)
         return bank.to_dict()
     
     @jwt_required()
     def delete(self, bank_id):
         """删除题库"""
         current_user_id = int(get_jwt_identity())  # 转换为整数
-        current_user = User.query.get(current_user_id)
+        current_user = load_user(current_user_id)
         bank = QuestionBank.query.get_or_404(bank_id)
         
         # 检查删除权限
@@ -331,6 +350,7 @@ class BankDetail(Resource):
             db.session.rollback()
             return {'message': '删除失败，请稍后重试'}, 500
         
+        invalidate_bank_exports(bank_id)
         return {'message': '题库删除成功'}
 
 @banks_bp.route('/<int:bank_id>/statistics')
@@ -346,7 +366,7 @@ class BankStatistics(Resource):
         except:
             pass
 
-        current_user = User.query.get(current_user_id) if current_user_id else None
+        current_user = current_identity() if current_user_id else None
         
         if not bank.can_access(current_user):
             return {'message': '无权访问此题库'}, 403
@@ -355,6 +375,7 @@ class BankStatistics(Resource):
 
 @banks_bp.route('/categories')
 class BankCategories(Resource):
+    @cached_response(['banks'], vary='public', stale_while_revalidate=True)
     def get(self):
         """获取题库分类列表"""
         categories = db.session.query(QuestionBank.category).filter(
@@ -372,7 +393,7 @@ class BankUpdateStats(Resource):
     def post(self, bank_id):
         """更新题库统计信息"""
         current_user_id = int(get_jwt_identity())  # 转换为整数
-        current_user = User.query.get(current_user_id)
+        current_user = load_user(current_user_id)
 
         if not current_user:
             return {'message': '用户不存在'}, 404
@@ -398,10 +419,10 @@ class BankUpdateStats(Resource):
 @banks_bp.route('/<int:bank_id>/export')
 class BankExport(Resource):
     @jwt_required()
+    @rate_limit(scope='export', config_key='RATELIMIT_EXPORT')
     def get(self, bank_id):
         """导出题库"""
-        current_user_id = int(get_jwt_identity())
-        current_user = User.query.get(current_user_id)
+        current_user = current_identity()
 
         # 获取题库
         bank = QuestionBank.query.get_or_404(bank_id)
@@ -420,77 +441,243 @@ class BankExport(Resource):
                 'available_formats': available_formats
             }, 400
 
-        # 获取题库的所有题目
-        questions = Question.query.filter_by(bank_id=bank_id).order_by(Question.order_index, Question.id).all()
-
-        # 构建导出数据
-        export_data = {
-            'bank_info': {
-                'name': bank.name,
-                'description': bank.description,
-                'category': bank.category,
-                'difficulty': bank.difficulty,
-                'tags': bank.tags,
-                'question_count': len(questions),
-                'exported_at': datetime.now().isoformat(),
-                'exported_by': current_user.username
-            },
-            'questions': []
-        }
+        include_answers = request.args.get('include_answers', 'true').lower() not in ('false', '0')
 
-        for question in questions:
-            question_data = {
-                'id': question.id,
-                'type': question.type,
-                'title': question.title,
-                'content': question.content,
-                'answer': question.answer,
-                'explanation': question.explanation,
-                'difficulty': question.difficulty,
-                'tags': question.tags,
-                'points': question.points,
-                'order_index': question.order_index
-            }
-            export_data['questions'].append(question_data)
+        # JSON / JSON Lines 流式导出，边查询边输出
+        if export_format in STREAMING_EXPORT_FORMATS:
+            return _stream_bank_export(bank, current_user, export_format, include_answers)
 
-        # 使用导出工具
-        exporter = BankExporter(export_data)
+        _, mimetype, extension = RENDERED_EXPORT_FORMATS[export_format]
+        filename = f"{bank.name}_题库导出_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{extension}"
 
-        try:
-            if export_format == 'json':
-                buffer = exporter.export_json()
-                mimetype = 'application/json'
-                extension = 'json'
-            elif export_format == 'markdown':
-                buffer = exporter.export_markdown()
-                mimetype = 'text/markdown'
-                extension = 'md'
-            elif export_format == 'docx':
-                buffer = exporter.export_docx()
-                mimetype = 'application/vnd.openxmlformats-officedocument.wordprocessingml.document'
-                extension = 'docx'
-            elif export_format == 'pdf':
-                buffer = exporter.export_pdf()
-                mimetype = 'application/pdf'
-                extension = 'pdf'
-            elif export_format == 'xlsx':
-                buffer = exporter.export_xlsx()
-                mimetype = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-                extension = 'xlsx'
-
-            filename = f"{bank.name}_题库导出_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{extension}"
-
-            return send_file(
-                buffer,
-                as_attachment=True,
-                download_name=filename,
-                mimetype=mimetype
-            )
+        # 题库内容未变化时直接返回缓存的导出文件（支持Range和条件请求）；文件先打开再发送，淘汰不影响下载
+        cache = ExportCache()
+        cache_key = cache.make_key(cache.bank_version(bank), export_format, include_answers)
+        handle = cache.open(bank.id, cache_key, extension)
 
-        except ImportError as e:
-            return {'message': str(e)}, 400
+        if handle is None:
+            try:
+                cache_path = render_bank_export(cache, bank, export_format, include_answers, cache_key)
+                handle = open(cache_path, 'rb')
+            except ImportError as e:
+                return {'message': str(e)}, 400
+            except Exception as e:
+                return {'message': f'导出失败: {str(e)}'}, 500
+
+        return send_export_file(handle, filename, mimetype, etag=cache_key)
+
+
+@banks_bp.route('/<int:bank_id>/answer-log')
+class BankAnswerLogExport(Resource):
+    @jwt_required()
+    @rate_limit(scope='export', config_key='RATELIMIT_EXPORT')
+    def get(self, bank_id):
+        """以Parquet格式导出题库的答题记录，供数据分析直接加载"""
+        current_user = current_identity()
+        bank = QuestionBank.query.get_or_404(bank_id)
+
+        if not bank.can_edit(current_user):
+            return {'message': '无权导出此题库的答题记录'}, 403
+
+        if not PARQUET_AVAILABLE:
+            return {'message': 'pyarrow 库未安装，无法导出Parquet格式'}, 400
+
+        # 写入匿名临时文件，响应结束后自动删除
+        output = tempfile.TemporaryFile()
+        try:
+            write_parquet(iter_bank_answers(bank.id), PARQUET_ANSWER_COLUMNS, output,
+                          metadata={'bank_id': bank.id, 'bank_name': bank.name})
         except Exception as e:
+            output.close()
+            current_app.logger.error(f"Failed to export answer log for bank {bank.id}: {e}")
             return {'message': f'导出失败: {str(e)}'}, 500
+        output.seek(0)
+
+        return send_file(
+            output,
+            as_attachment=True,
+            download_name=f"{bank.name}_答题记录_{datetime.now().strftime('%Y%m%d_%H%M%S')}.parquet",
+            mimetype='application/vnd.apache.parquet'
+        )
+
+
+# 流式导出的格式: 格式 -> (MIME类型, 扩展名)
+STREAMING_EXPORT_FORMATS = {
+    'json': ('application/json', 'json'),
+    'jsonl': ('application/x-ndjson', 'jsonl')
+}
+
+
+def _stream_bank_export(bank, current_user, export_format, include_answers=True):
+    """以生成器响应流式导出题库，可选gzip压缩（?gzip=true）"""
+    mimetype, extension = STREAMING_EXPORT_FORMATS[export_format]
+    questions = iter_bank_questions(bank.id, include_answers=include_answers)
+
+    if export_format == 'jsonl':
+        chunks = stream_jsonl(questions)
+    else:
+        bank_info = build_bank_info(bank, current_user.username, count_bank_questions(bank.id))
+        chunks = stream_json(bank_info, questions)
+
+    filename = f"{bank.name}_题库导出_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{extension}"
+    if request.args.get('gzip', 'false').lower() in ('true', '1'):
+        chunks = gzip_stream(chunks)
+        filename += '.gz'
+        mimetype = 'application/gzip'
+
+    return Response(
+        stream_with_context(chunks),
+        mimetype=mimetype,
+        headers=attachment_headers(filename)
+    )
+
+
+class ExportArchiveQuerySchema(Schema):
+    bank_ids = ma_fields.Str(validate=validate.Regexp(r'^\d+(,\d+)*$', error='题库ID列表格式应为逗号分隔的数字'))
+    tenant_id = ma_fields.Str(validate=validate.Length(max=50))
+    category = ma_fields.Str(validate=validate.Length(max=50))
+    format = ma_fields.Str(validate=validate.OneOf(ARCHIVE_FORMATS), missing='jsonl')
+    include_answers = ma_fields.Bool(missing=True)
+    start_after = ma_fields.Int(validate=validate.Range(min=0))
+
+
+@banks_bp.route('/export-archive')
+class BankExportArchive(Resource):
+    @tenant_required
+    @rate_limit(scope='export', config_key='RATELIMIT_EXPORT')
+    def get(self):
+        """
+        将多个题库打包为ZIP归档流式导出
+        
+        每个题库一个条目（JSONL或XLSX），条目按题库ID升序，末尾附带 manifest.json。
+        下载中断后，以已完整收到的最后一个条目的题库ID作为 start_after 重新请求即可续传剩余题库
+        """
+        # tenant_required 已拒绝不存在或已停用的账号
+        current_user = request.current_user
+
+        try:
+            args = ExportArchiveQuerySchema().load(request.args)
+        except ValidationError as err:
+            return {'message': '请求参数错误', 'errors': err.messages}, 400
+
+        if args['format'] == 'xlsx' and not XLSX_AVAILABLE:
+            return {'message': '服务器不支持导出格式: xlsx'}, 400
+
+        # 只有管理员可以按租户归档
+        if args.get('tenant_id') and not current_user.is_admin():
+            return {'message': '需要管理员权限'}, 403
+        if args.get('tenant_id') and get_tenant(args['tenant_id']) is None:
+            return {'message': '租户不存在'}, 404
+
+        bank_ids = archive_bank_ids(
+            current_user,
+            bank_ids=[int(bank_id) for bank_id in args['bank_ids'].split(',')] if args.get('bank_ids') else None,
+            tenant_id=args.get('tenant_id'),
+            category=args.get('category'),
+            start_after=args.get('start_after')
+        )
+        if not bank_ids:
+            return {'message': '没有符合条件的题库'}, 404
+
+        filename = f"题库归档_{datetime.now().strftime('%Y%m%d_%H%M%S')}.zip"
+        headers = attachment_headers(filename)
+        headers['X-Archive-Bank-Count'] = str(len(bank_ids))
+        headers['X-Archive-Last-Bank-Id'] = str(bank_ids[-1])
+
+        return Response(
+            stream_bank_archive(
+                current_app._get_current_object(), bank_ids, current_user.username,
+                args['format'], args['include_answers']
+            ),
+            mimetype='application/zip',
+            headers=headers
+        )
+
+
+export_job_create_model = banks_bp.model('ExportJobCreate', {
+    'format': fields.String(required=True, description='导出格式', enum=list(RENDERED_EXPORT_FORMATS)),
+    'include_answers': fields.Boolean(description='是否包含答案和解析', default=True)
+})
+
+class ExportJobCreateSchema(Schema):
+    format = ma_fields.Str(required=True, validate=validate.OneOf(list(RENDERED_EXPORT_FORMATS)))
+    include_answers = ma_fields.Bool(missing=True)
+
+
+@banks_bp.route('/<int:bank_id>/export-jobs')
+class BankExportJobCreate(Resource):
+    @jwt_required()
+    @banks_bp.expect(export_job_create_model)
+    @rate_limit(scope='export', config_key='RATELIMIT_EXPORT')
+    def post(self, bank_id):
+        """创建异步导出任务（适用于PDF、DOCX等耗时格式）"""
+        current_user_id = int(get_jwt_identity())
+        current_user = load_user(current_user_id)
+        bank = QuestionBank.query.get_or_404(bank_id)
+
+        if not bank.can_edit(current_user):
+            return {'message': '无权导出此题库'}, 403
+
+        try:
+            data = ExportJobCreateSchema().load(request.json or {})
+        except ValidationError as err:
+            return {'message': '请求参数错误', 'errors': err.messages}, 400
+
+        if data['format'] not in get_available_formats():
+            return {'message': f'服务器不支持导出格式: {data["format"]}'}, 400
+
+        extension = RENDERED_EXPORT_FORMATS[data['format']][2]
+        download_name = f"{bank.name}_题库导出_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{extension}"
+
+        try:
+            job = create_export_job(
+                current_user, bank, data['format'], data['include_answers'], download_name
+            )
+        except Exception as e:
+            db.session.rollback()
+            current_app.logger.error(f"Failed to create export job: {e}")
+            return {'message': '创建导出任务失败'}, 500
+
+        return job.to_dict(), 202
+
+
+def _get_user_export_job(job_id):
+    current_user_id = int(get_jwt_identity())
+    return ExportJob.query.filter_by(id=job_id, user_id=current_user_id).first_or_404()
+
+
+@banks_bp.route('/export-jobs/<string:job_id>')
+class BankExportJobDetail(Resource):
+    @jwt_required()
+    def get(self, job_id):
+        """查询导出任务状态和进度"""
+        job = _get_user_export_job(job_id)
+        if job.status in ('pending', 'running'):
+            # 提交任务的进程可能已退出：清理失去心跳的任务，并调度该租户排队的任务
+            dispatch_pending_jobs(current_app._get_current_object(), job.tenant_id)
+            with use_primary():
+                db.session.refresh(job)
+        return job.to_dict()
+
+
+@banks_bp.route('/export-jobs/<string:job_id>/download')
+class BankExportJobDownload(Resource):
+    @jwt_required()
+    def get(self, job_id):
+        """下载导出任务的结果"""
+        job = _get_user_export_job(job_id)
+
+        if job.status != 'completed':
+            return {'message': '导出任务尚未完成', 'status': job.status, 'progress': job.progress}, 409
+
+        try:
+            handle = open(job.file_path, 'rb') if job.file_path else None
+        except OSError:
+            handle = None
+        if handle is None:
+            return {'message': '导出文件已过期，请重新创建导出任务'}, 410
+
+        return send_export_file(handle, job.download_name, RENDERED_EXPORT_FORMATS[job.format][1], etag=job.id)
 
 
 @banks_bp.route('/export-formats')
@@ -501,10 +688,12 @@ class ExportFormats(Resource):
             'formats': get_available_formats(),
             'format_descriptions': {
                 'json': 'JSON格式，包含完整的题库和题目数据',
+                'jsonl': 'JSON Lines格式，每行一道题，适合大题库和数据处理',
                 'markdown': 'Markdown格式，适合阅读和文档',
                 'docx': 'Word文档格式，适合打印和编辑',
                 'pdf': 'PDF格式，适合打印和分享',
-                'xlsx': 'Excel格式，适合数据分析'
+                'xlsx': 'Excel格式，适合数据分析',
+                'parquet': 'Parquet列式格式，适合大题库迁移和数据分析（可重新导入）'
             }
         }
 
@@ -10,8 +10,9 @@ from marshmallow import Schema, fields as ma_fields, validate, ValidationError
 from sqlalchemy import and_, or_, func
 
 from app import db
-from app.models import User, QuestionBank, Question, Exam, ExamAttempt, ExamQuestion
-from app.utils.decorators import tenant_required, admin_required, log_user_action
+from app.models import QuestionBank, Question, Exam, ExamAttempt, ExamQuestion
+from app.utils.decorators import tenant_required, admin_required, log_user_action, rate_limit
+from app.utils.identity import current_identity, load_user
 
 # 创建命名空间
 exams_bp = Namespace('exams', description='考试管理相关接口')
@@ -87,7 +88,7 @@ class ExamList(Resource):
     def get(self):
         """获取考试列表"""
         current_user_id = int(get_jwt_identity())  # 转换为整数
-        current_user = User.query.get(current_user_id)
+        current_user = current_identity()
 
         if not current_user:
             return {'message': '用户不存在'}, 404
@@ -119,7 +120,7 @@ class ExamList(Resource):
     def post(self):
         """创建考试"""
         current_user_id = get_jwt_identity()
-        current_user = User.query.get(current_user_id)
+        current_user = load_user(current_user_id)
         
         try:
             schema = ExamCreateSchema()
@@ -192,7 +193,7 @@ class ExamDetail(Resource):
     def get(self, exam_id):
         """获取考试详情"""
         current_user_id = get_jwt_identity()
-        current_user = User.query.get(current_user_id)
+        current_user = current_identity()
         
         exam = Exam.query.filter_by(
             id=exam_id,
@@ -215,7 +216,7 @@ class ExamDetail(Resource):
     def put(self, exam_id):
         """更新考试"""
         current_user_id = get_jwt_identity()
-        current_user = User.query.get(current_user_id)
+        current_user = load_user(current_user_id)
         
         exam = Exam.query.filter_by(
             id=exam_id,
@@ -253,7 +254,7 @@ class ExamDetail(Resource):
     def delete(self, exam_id):
         """删除考试"""
         current_user_id = get_jwt_identity()
-        current_user = User.query.get(current_user_id)
+        current_user = load_user(current_user_id)
         
         exam = Exam.query.filter_by(
             id=exam_id,
@@ -286,7 +287,7 @@ class ExamStart(Resource):
     def post(self, exam_id):
         """开始考试"""
         current_user_id = get_jwt_identity()
-        current_user = User.query.get(current_user_id)
+        current_user = load_user(current_user_id)
 
         exam = Exam.query.filter_by(
             id=exam_id,
@@ -375,6 +376,7 @@ class ExamStart(Resource):
 @exams_bp.route('/attempts/<int:attempt_id>/answer')
 class ExamAnswer(Resource):
     @tenant_required
+    @rate_limit(scope='answer', config_key='RATELIMIT_ANSWER')
     def post(self, attempt_id):
         """提交答案"""
         current_user_id = get_jwt_identity()
@@ -423,6 +425,7 @@ class ExamAnswer(Resource):
 @exams_bp.route('/attempts/<int:attempt_id>/submit')
 class ExamSubmit(Resource):
     @tenant_required
+    @rate_limit(scope='answer', config_key='RATELIMIT_ANSWER')
     def post(self, attempt_id):
         """提交考试"""
         current_user_id = get_jwt_identity()
@@ -459,7 +462,7 @@ class ExamAttemptList(Resource):
     def get(self):
         """获取考试记录列表"""
         current_user_id = get_jwt_identity()
-        current_user = User.query.get(current_user_id)
+        current_user = current_identity()
 
         query = ExamAttempt.query.filter_by(tenant_id=current_user.tenant_id)
 
@@ -484,7 +487,7 @@ class ExamAttemptDetail(Resource):
     def get(self, attempt_id):
         """获取考试记录详情"""
         current_user_id = get_jwt_identity()
-        current_user = User.query.get(current_user_id)
+        current_user = current_identity()
 
         attempt = ExamAttempt.query.filter_by(
             id=attempt_id,
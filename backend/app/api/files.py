@@ -7,20 +7,22 @@ from datetime import datetime
 from flask import request, current_app
 from flask_restx import Namespace, Resource, fields
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from werkzeug.utils import secure_filename
 from marshmallow import Schema, fields as ma_fields, validate, ValidationError
 
 from app import db
-from app.models import User, QuestionBank, FileImport, Question
-from app.services.file_parser import FileParserService
-from app.utils.decorators import tenant_required, log_user_action
-from app.utils.validators import validate_file_extension, validate_file_size, sanitize_filename
+from app.models import QuestionBank, FileImport, ChunkedUpload, User
+from app.services.file_parser import FileParserService, ImportRefusedError, MERGE_MODES
+from app.services.export_cache import invalidate_bank_exports
+from app.services.upload_store import UploadStore
+from app.services.xlsx_validator import validate_xlsx
+from app.utils.decorators import rate_limit
+from app.utils.identity import load_user
 
 # 创建命名空间
 files_bp = Namespace('files', description='文件上传和解析相关接口')
 
 # 允许的文件扩展名
-ALLOWED_EXTENSIONS = {'pdf', 'docx', 'xlsx', 'xls', 'json'}
+ALLOWED_EXTENSIONS = {'pdf', 'docx', 'xlsx', 'xls', 'json', 'parquet'}
 
 def allowed_file(filename):
     """检查文件扩展名是否允许"""
@@ -30,7 +32,16 @@ def allowed_file(filename):
 # 请求模型
 file_upload_model = files_bp.model('FileUpload', {
     'bank_id': fields.Integer(required=True, description='题库ID'),
-    'merge_mode': fields.String(description='合并模式: replace, append', default='append')
+    'merge_mode': fields.String(description='合并模式: append, replace, sync', default='append')
+})
+
+chunked_upload_init_model = files_bp.model('ChunkedUploadInit', {
+    'filename': fields.String(required=True, description='文件名'),
+    'file_size': fields.Integer(required=True, description='文件大小（字节）'),
+    'bank_id': fields.Integer(description='题库ID'),
+    'sha256': fields.String(description='文件内容SHA-256（可选，用于秒传和完整性校验）'),
+    'chunk_size': fields.Integer(description='分片大小（字节）'),
+    'merge_mode': fields.String(description='合并模式: append, replace, sync', default='append')
 })
 
 # 响应模型
@@ -39,6 +50,7 @@ file_import_model = files_bp.model('FileImport', {
     'filename': fields.String(description='文件名'),
     'file_type': fields.String(description='文件类型'),
     'file_size': fields.Integer(description='文件大小'),
+    'content_hash': fields.String(description='文件内容SHA-256'),
     'status': fields.String(description='处理状态'),
     'total_questions': fields.Integer(description='总题目数'),
     'success_count': fields.Integer(description='成功导入数'),
@@ -51,11 +63,77 @@ file_import_model = files_bp.model('FileImport', {
 # Marshmallow验证模式
 class FileUploadSchema(Schema):
     bank_id = ma_fields.Int(required=True)
-    merge_mode = ma_fields.Str(validate=validate.OneOf(['replace', 'append']), missing='append')
+    merge_mode = ma_fields.Str(validate=validate.OneOf(MERGE_MODES), missing='append')
+
+class ChunkedUploadInitSchema(Schema):
+    filename = ma_fields.Str(required=True, validate=validate.Length(min=1, max=255))
+    file_size = ma_fields.Int(required=True, validate=validate.Range(min=1))
+    bank_id = ma_fields.Int(missing=None)
+    sha256 = ma_fields.Str(missing=None, validate=validate.Regexp(r'^[0-9a-f]{64}$'))
+    chunk_size = ma_fields.Int(missing=None, validate=validate.Range(min=64 * 1024))
+    merge_mode = ma_fields.Str(validate=validate.OneOf(MERGE_MODES), missing='append')
+
+class FileParseSchema(Schema):
+    merge_mode = ma_fields.Str(validate=validate.OneOf(MERGE_MODES), missing=None)
+    # replace/sync 删除的题目有答题记录、收藏或考试关联时，需确认才一并删除
+    confirm_delete_history = ma_fields.Bool(missing=False)
+
+def _check_bank_permission(bank_id, current_user_id):
+    """检查当前用户是否可以向题库导入文件，无权限时返回错误响应"""
+    if bank_id:
+        bank = QuestionBank.query.get_or_404(bank_id)
+        current_user = load_user(current_user_id)
+        if not bank.can_edit(current_user):
+            return {'message': '无权向此题库导入文件'}, 403
+    return None
+
+def _owns_content(current_user_id, content_hash):
+    """
+    当前用户或其租户是否已上传过该内容（哈希由服务端计算得出）
+
+    秒传只复用这类内容对象；客户端声明的哈希不能证明持有文件，否则知道哈希即可导入其他租户的文件
+    """
+    current_user = load_user(current_user_id)
+    if current_user is None:
+        return False
+    if current_user.tenant_id:
+        owner_filter = User.tenant_id == current_user.tenant_id
+    else:
+        owner_filter = User.id == current_user.id
+
+    imported = db.session.query(FileImport.id).join(User, FileImport.user_id == User.id).filter(
+        FileImport.content_hash == content_hash, owner_filter
+    ).first()
+    if imported:
+        return True
+    # 完成的分片上传已在合并时校验了声明的哈希
+    uploaded = db.session.query(ChunkedUpload.id).join(User, ChunkedUpload.user_id == User.id).filter(
+        ChunkedUpload.sha256 == content_hash, ChunkedUpload.status == 'completed', owner_filter
+    ).first()
+    return uploaded is not None
+
+def _create_file_import(current_user_id, bank_id, filename, file_type, file_size, file_path, content_hash,
+                        merge_mode='append'):
+    """创建导入记录"""
+    file_import = FileImport(
+        user_id=current_user_id,
+        bank_id=bank_id,
+        filename=filename,
+        file_type=file_type,
+        file_size=file_size,
+        file_path=file_path,
+        content_hash=content_hash,
+        merge_mode=merge_mode,
+        status='pending'
+    )
+    db.session.add(file_import)
+    db.session.commit()
+    return file_import
 
 @files_bp.route('/upload')
 class FileUpload(Resource):
     @jwt_required()
+    @rate_limit(scope='upload', config_key='RATELIMIT_UPLOAD')
     def post(self):
         """上传文件"""
         current_user_id = int(get_jwt_identity())  # 转换为整数
@@ -66,6 +144,9 @@ class FileUpload(Resource):
         
         file = request.files['file']
         bank_id = request.form.get('bank_id', type=int)
+        merge_mode = request.form.get('merge_mode') or 'append'
+        if merge_mode not in MERGE_MODES:
+            return {'message': '无效的合并模式'}, 400
         
         if file.filename == '':
             return {'message': '没有选择文件'}, 400
@@ -74,52 +155,251 @@ class FileUpload(Resource):
             return {'message': '不支持的文件类型'}, 400
         
         # 检查题库权限（如果指定了题库）
-        if bank_id:
-            bank = QuestionBank.query.get_or_404(bank_id)
-            current_user = User.query.get(current_user_id)
-            if not bank.can_edit(current_user):
-                return {'message': '无权向此题库导入文件'}, 403
-        
-        # 保存文件
-        filename = secure_filename(file.filename)
-        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        filename = f"{timestamp}_{filename}"
+        permission_error = _check_bank_permission(bank_id, current_user_id)
+        if permission_error:
+            return permission_error
         
-        file_path = os.path.join(current_app.config['UPLOAD_FOLDER'], filename)
+        # 按内容哈希保存文件，相同内容只存储一份
+        file_type = file.filename.rsplit('.', 1)[1].lower()
+        store = UploadStore()
         
         try:
-            file.save(file_path)
-            file_size = os.path.getsize(file_path)
+            content_hash, file_path, file_size = store.save_stream(file.stream, file_type)
         except Exception as e:
+            current_app.logger.error(f"Failed to save uploaded file: {e}")
             return {'message': '文件保存失败'}, 500
         
-        # 创建导入记录
+        # 创建导入记录（内容对象可能被其他记录共享，失败时不删除）
+        try:
+            file_import = _create_file_import(
+                current_user_id, bank_id, file.filename, file_type,
+                file_size, file_path, content_hash, merge_mode
+            )
+        except Exception:
+            db.session.rollback()
+            return {'message': '创建导入记录失败'}, 500
+        
+        return {
+            'message': '文件上传成功',
+            'import_id': file_import.id,
+            'filename': file.filename,
+            'file_size': file_size,
+            'content_hash': content_hash
+        }
+
+@files_bp.route('/uploads')
+class ChunkedUploadInit(Resource):
+    @jwt_required()
+    @files_bp.expect(chunked_upload_init_model)
+    @rate_limit(scope='upload', config_key='RATELIMIT_UPLOAD')
+    def post(self):
+        """初始化分片上传"""
+        current_user_id = int(get_jwt_identity())
+        
+        try:
+            schema = ChunkedUploadInitSchema()
+            data = schema.load(request.json or {})
+        except ValidationError as err:
+            return {'message': '请求参数错误', 'errors': err.messages}, 400
+        
+        filename = data['filename']
+        if not allowed_file(filename):
+            return {'message': '不支持的文件类型'}, 400
+        
+        if data['file_size'] > current_app.config['MAX_CONTENT_LENGTH']:
+            return {'message': '文件大小超过限制'}, 400
+        
+        permission_error = _check_bank_permission(data.get('bank_id'), current_user_id)
+        if permission_error:
+            return permission_error
+        
         file_type = filename.rsplit('.', 1)[1].lower()
-        file_import = FileImport(
+        store = UploadStore()
+        
+        # 秒传：本用户或本租户上传过的内容直接创建导入记录；其他情况需上传文件，合并后在服务端按哈希去重
+        content_hash = data.get('sha256')
+        if content_hash and _owns_content(current_user_id, content_hash):
+            existing_path = store.find_object(content_hash, file_type)
+            if existing_path and os.path.getsize(existing_path) == data['file_size']:
+                try:
+                    file_import = _create_file_import(
+                        current_user_id, data.get('bank_id'), filename, file_type,
+                        data['file_size'], existing_path, content_hash, data['merge_mode']
+                    )
+                except Exception:
+                    db.session.rollback()
+                    return {'message': '创建导入记录失败'}, 500
+                
+                return {
+                    'message': '文件已存在，无需重复上传',
+                    'instant': True,
+                    'import_id': file_import.id,
+                    'filename': filename,
+                    'file_size': data['file_size'],
+                    'content_hash': content_hash
+                }, 201
+        
+        chunk_size = min(
+            data.get('chunk_size') or current_app.config['UPLOAD_CHUNK_SIZE'],
+            current_app.config['UPLOAD_MAX_CHUNK_SIZE']
+        )
+        total_chunks = max(1, -(-data['file_size'] // chunk_size))
+        
+        upload = ChunkedUpload(
+            id=uuid.uuid4().hex,
             user_id=current_user_id,
-            bank_id=bank_id,
-            filename=file.filename,
+            bank_id=data.get('bank_id'),
+            filename=filename,
             file_type=file_type,
-            file_size=file_size,
-            file_path=file_path,
-            status='pending'
+            file_size=data['file_size'],
+            chunk_size=chunk_size,
+            total_chunks=total_chunks,
+            sha256=content_hash,
+            merge_mode=data['merge_mode'],
+            expires_at=datetime.utcnow() + current_app.config['UPLOAD_SESSION_EXPIRES']
         )
         
         try:
-            db.session.add(file_import)
+            db.session.add(upload)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            return {'message': '创建上传会话失败'}, 500
+        
+        result = upload.to_dict(received_chunks=[])
+        result['instant'] = False
+        return result, 201
+
+def _get_active_upload(upload_id, current_user_id):
+    """获取当前用户未完成的上传会话，不可用时返回错误响应"""
+    upload = ChunkedUpload.query.filter_by(
+        id=upload_id, user_id=current_user_id
+    ).first_or_404()
+    
+    if upload.status != 'uploading':
+        return None, ({'message': '上传会话已结束'}, 409)
+    if upload.is_expired():
+        return None, ({'message': '上传会话已过期，请重新上传'}, 410)
+    return upload, None
+
+@files_bp.route('/uploads/<string:upload_id>')
+class ChunkedUploadDetail(Resource):
+    @jwt_required()
+    def get(self, upload_id):
+        """获取分片上传进度（用于断点续传）"""
+        current_user_id = int(get_jwt_identity())
+        upload = ChunkedUpload.query.filter_by(
+            id=upload_id, user_id=current_user_id
+        ).first_or_404()
+        
+        received = UploadStore().received_chunks(upload_id) if upload.status == 'uploading' else []
+        return upload.to_dict(received_chunks=received)
+    
+    @jwt_required()
+    def delete(self, upload_id):
+        """取消分片上传"""
+        current_user_id = int(get_jwt_identity())
+        upload = ChunkedUpload.query.filter_by(
+            id=upload_id, user_id=current_user_id
+        ).first_or_404()
+        
+        UploadStore().discard_chunks(upload_id)
+        if upload.status == 'uploading':
+            upload.status = 'expired'
             db.session.commit()
+        
+        return {'message': '上传已取消'}
+
+@files_bp.route('/uploads/<string:upload_id>/chunks/<int:index>')
+class ChunkedUploadChunk(Resource):
+    @jwt_required()
+    def put(self, upload_id, index):
+        """上传单个分片（请求体为分片的原始字节）"""
+        current_user_id = int(get_jwt_identity())
+        upload, error = _get_active_upload(upload_id, current_user_id)
+        if error:
+            return error
+        
+        if index < 0 or index >= upload.total_chunks:
+            return {'message': f'分片序号超出范围: 0-{upload.total_chunks - 1}'}, 400
+        
+        # 除最后一个分片外，每个分片大小必须等于chunk_size
+        if index == upload.total_chunks - 1:
+            expected_size = upload.file_size - upload.chunk_size * (upload.total_chunks - 1)
+        else:
+            expected_size = upload.chunk_size
+        
+        store = UploadStore()
+        try:
+            size, chunk_hash = store.write_chunk(upload_id, index, request.stream, expected_size)
+        except ValueError as e:
+            return {'message': str(e)}, 400
         except Exception as e:
+            current_app.logger.error(f"Failed to write chunk {index} of upload {upload_id}: {e}")
+            return {'message': '分片保存失败'}, 500
+        
+        expected_hash = request.headers.get('X-Chunk-SHA256')
+        if size != expected_size or (expected_hash and expected_hash.lower() != chunk_hash):
+            os.remove(os.path.join(store.chunk_dir(upload_id), f'{index}.part'))
+            return {'message': '分片数据不完整或校验失败，请重新上传该分片'}, 400
+        
+        return {
+            'upload_id': upload_id,
+            'index': index,
+            'size': size,
+            'sha256': chunk_hash
+        }
+
+@files_bp.route('/uploads/<string:upload_id>/complete')
+class ChunkedUploadComplete(Resource):
+    @jwt_required()
+    def post(self, upload_id):
+        """合并分片，完成上传"""
+        current_user_id = int(get_jwt_identity())
+        upload, error = _get_active_upload(upload_id, current_user_id)
+        if error:
+            return error
+        
+        store = UploadStore()
+        received = store.received_chunks(upload_id)
+        missing = sorted(set(range(upload.total_chunks)) - set(received))
+        if missing:
+            return {'message': '分片未全部上传', 'missing_chunks': missing}, 400
+        
+        try:
+            content_hash, file_path, file_size = store.assemble(
+                upload_id, upload.total_chunks, upload.file_type
+            )
+        except Exception as e:
+            current_app.logger.error(f"Failed to assemble upload {upload_id}: {e}")
+            return {'message': '文件合并失败'}, 500
+        
+        if file_size != upload.file_size or (upload.sha256 and upload.sha256 != content_hash):
+            store.discard_chunks(upload_id)
+            upload.status = 'expired'
+            db.session.commit()
+            return {'message': '文件校验失败，请重新上传'}, 400
+        
+        try:
+            file_import = _create_file_import(
+                current_user_id, upload.bank_id, upload.filename, upload.file_type,
+                file_size, file_path, content_hash, upload.merge_mode or 'append'
+            )
+            upload.status = 'completed'
+            upload.import_id = file_import.id
+            db.session.commit()
+        except Exception:
             db.session.rollback()
-            # 删除已保存的文件
-            if os.path.exists(file_path):
-                os.remove(file_path)
             return {'message': '创建导入记录失败'}, 500
         
+        store.discard_chunks(upload_id)
+        
         return {
             'message': '文件上传成功',
             'import_id': file_import.id,
-            'filename': file.filename,
-            'file_size': file_size
+            'filename': upload.filename,
+            'file_size': file_size,
+            'content_hash': content_hash
         }
 
 @files_bp.route('/parse/<int:import_id>')
@@ -137,17 +417,45 @@ class FileParse(Resource):
         if file_import.status != 'pending':
             return {'message': '文件已处理或正在处理中'}, 400
         
+        try:
+            data = FileParseSchema().load(request.get_json(silent=True) or {})
+        except ValidationError as err:
+            return {'message': '请求参数错误', 'errors': err.messages}, 400
+        
+        # 请求中指定的合并模式优先于上传时的设置
+        if data['merge_mode']:
+            file_import.merge_mode = data['merge_mode']
+        
         # 更新状态为处理中
         file_import.status = 'processing'
         db.session.commit()
         
         try:
-            # 解析文件
+            # 解析文件：JSON和Parquet逐题流式解析，其他格式复用相同内容文件之前的解析结果
             parser_service = FileParserService()
-            questions_data = parser_service.parse_file(
-                file_import.file_path, 
-                file_import.file_type
-            )
+            store = UploadStore()
+            questions_data = None
+            if file_import.file_type == 'json':
+                questions_data = parser_service.iter_json_questions(file_import.file_path)
+            elif file_import.file_type == 'parquet':
+                questions_data = parser_service.iter_parquet_questions(file_import.file_path)
+            elif file_import.content_hash:
+                cached = store.load_parse_result(file_import.content_hash, file_import.file_type)
+                if cached is not None:
+                    questions_data, skipped = cached
+                    parser_service.skipped_count = skipped['skipped_count']
+                    parser_service.skipped_rows = skipped['skipped_rows']
+            
+            if questions_data is None:
+                questions_data = parser_service.parse_file(
+                    file_import.file_path, 
+                    file_import.file_type
+                )
+                if file_import.content_hash:
+                    store.save_parse_result(
+                        file_import.content_hash, file_import.file_type, questions_data,
+                        parser_service.skipped_report()
+                    )
             
             # 如果没有指定题库，创建新题库
             if not file_import.bank_id:
@@ -161,10 +469,12 @@ class FileParse(Resource):
                 db.session.flush()  # 获取bank.id
                 file_import.bank_id = bank.id
             
-            # 导入题目
-            questions_imported = parser_service.import_questions(
-                questions_data, file_import.bank_id
+            # 按合并模式导入题目（新建的题库只需追加）
+            merge_stats = parser_service.merge_questions(
+                questions_data, file_import.bank_id, file_import.merge_mode or 'append',
+                delete_history=data['confirm_delete_history']
             )
+            questions_imported = merge_stats['total']
 
             # 更新题库统计
             bank = QuestionBank.query.get(file_import.bank_id)
@@ -174,19 +484,52 @@ class FileParse(Resource):
             # 标记为完成
             file_import.mark_completed(questions_imported)
             db.session.commit()
+            invalidate_bank_exports(file_import.bank_id)
             
             return {
                 'message': '文件解析成功',
                 'questions_imported': questions_imported,
-                'bank_id': file_import.bank_id
+                'merge_mode': file_import.merge_mode,
+                'merge_stats': merge_stats,
+                'bank_id': file_import.bank_id,
+                **parser_service.skipped_report()
             }
             
+        except ImportRefusedError as e:
+            # 题库未修改，导入记录恢复为待处理，修正文件或确认后可重新解析
+            db.session.rollback()
+            file_import.status = 'pending'
+            db.session.commit()
+            return {'message': str(e), **parser_service.skipped_report()}, 400
+            
         except Exception as e:
-            # 标记为失败
+            # 撤销未提交的题目和题库，再标记为失败
+            db.session.rollback()
             file_import.mark_failed(str(e))
             db.session.commit()
             return {'message': f'文件解析失败: {str(e)}'}, 500
 
+@files_bp.route('/parse/<int:import_id>/validate')
+class FileValidate(Resource):
+    @jwt_required()
+    def post(self, import_id):
+        """预检文件（不写入数据库），返回带行号的错误报告"""
+        current_user_id = int(get_jwt_identity())
+        
+        file_import = FileImport.query.filter_by(
+            id=import_id, user_id=current_user_id
+        ).first_or_404()
+        
+        if file_import.file_type != 'xlsx':
+            return {'message': '目前仅支持预检XLSX文件'}, 400
+        
+        try:
+            report = validate_xlsx(file_import.file_path)
+        except ValueError as e:
+            return {'message': str(e)}, 400
+        
+        return {'import_id': file_import.id, 'filename': file_import.filename, 'report': report}
+
 @files_bp.route('/imports')
 class FileImportList(Resource):
     @jwt_required()
@@ -237,14 +580,21 @@ class FileImportDetail(Resource):
         ).first_or_404()
         
         try:
-            # 删除文件
-            if os.path.exists(file_import.file_path):
+            # 删除文件（内容寻址的文件可能被其他导入记录共享）
+            shared = FileImport.query.filter(
+                FileImport.file_path == file_import.file_path,
+                FileImport.id != file_import.id
+            ).count()
+            if not shared and os.path.exists(file_import.file_path):
                 os.remove(file_import.file_path)
+                parsed_cache = f'{file_import.file_path}.parsed.json'
+                if os.path.exists(parsed_cache):
+                    os.remove(parsed_cache)
             
             # 删除记录
             db.session.delete(file_import)
             db.session.commit()
-        except Exception as e:
+        except Exception:
             db.session.rollback()
             return {'message': '删除失败，请稍后重试'}, 500
         
@@ -275,6 +625,11 @@ class SupportedFormats(Resource):
                     'extension': 'json',
                     'description': 'JSON格式题库',
                     'max_size': '50MB'
+                },
+                {
+                    'extension': 'parquet',
+                    'description': 'Parquet列式题库（format=parquet 导出的文件）',
+                    'max_size': '50MB'
                 }
             ],
             'max_file_size': current_app.config['MAX_CONTENT_LENGTH']
@@ -6,9 +6,15 @@ from flask import request
 from flask_restx import Namespace, Resource, fields
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from marshmallow import Schema, fields as ma_fields, validate, ValidationError
+from sqlalchemy import func, select
 
 from app import db
-from app.models import User, QuestionBank, Question, UserAnswer, UserFavorite, UserProgress, UserPoints
+from app.models import QuestionBank, Question, UserAnswer, UserFavorite, UserProgress, UserPoints
+from app.utils.decorators import rate_limit
+from app.utils.identity import current_identity, load_user
+from app.utils.question_payload import json_response, page_rows, pages_count, question_fragments, with_extra_fields
+from app.utils.response_cache import cached_response
+from app.services.export_cache import invalidate_bank_exports
 
 # 创建命名空间
 questions_bp = Namespace('questions', description='题目管理和答题相关接口')
@@ -88,9 +94,10 @@ def get_type_name(question_type):
 
 @questions_bp.route('')
 class QuestionList(Resource):
-    @questions_bp.marshal_with(question_list_model)
+    @cached_response(lambda: [f"bank:{request.args.get('bank_id', type=int)}"])
+    @questions_bp.response(200, '题目列表', question_list_model)
     def get(self):
-        """获取题目列表"""
+        """获取题目列表（响应体由预编码的题目片段拼接）"""
         # 获取查询参数
         bank_id = request.args.get('bank_id', type=int)
         page = int(request.args.get('page', 1))
@@ -109,31 +116,29 @@ class QuestionList(Resource):
         except:
             pass
 
-        current_user = User.query.get(current_user_id) if current_user_id else None
+        current_user = current_identity() if current_user_id else None
         
         if not bank.can_access(current_user):
             return {'message': '无权访问此题库'}, 403
         
-        # 构建查询
-        query = Question.query.filter_by(bank_id=bank_id)
+        # 构建查询（只查询ID和更新时间，题目内容来自片段缓存）
+        query = select(Question.id, Question.updated_at).where(Question.bank_id == bank_id)
         
         if question_type:
-            query = query.filter_by(type=question_type)
+            query = query.where(Question.type == question_type)
         if difficulty:
-            query = query.filter_by(difficulty=difficulty)
+            query = query.where(Question.difficulty == difficulty)
         
         # 分页查询
-        pagination = query.order_by(Question.order_index, Question.id).paginate(
-            page=page, per_page=per_page, error_out=False
-        )
+        rows, total = page_rows(query.order_by(Question.order_index, Question.id), max(page, 1), per_page)
 
-        return {
-            'data': [q.to_dict() for q in pagination.items],
-            'total': pagination.total,
+        return json_response({
+            'data': None,
+            'total': total,
             'page': page,
             'per_page': per_page,
-            'pages': pagination.pages
-        }
+            'pages': pages_count(total, per_page)
+        }, 'data', question_fragments(rows, 'list'))
     
     @jwt_required()
     @questions_bp.expect(question_create_model)
@@ -141,7 +146,7 @@ class QuestionList(Resource):
     def post(self):
         """创建题目"""
         current_user_id = int(get_jwt_identity())  # 转换为整数
-        current_user = User.query.get(current_user_id)
+        current_user = load_user(current_user_id)
         
         try:
             # 验证请求数据
@@ -165,6 +170,7 @@ class QuestionList(Resource):
             db.session.rollback()
             return {'message': '创建失败，请稍后重试'}, 500
         
+        invalidate_bank_exports(question.bank_id)
         return question.to_dict()
 
 @questions_bp.route('/<int:question_id>')
@@ -182,7 +188,7 @@ class QuestionDetail(Resource):
         except:
             pass
 
-        current_user = User.query.get(current_user_id) if current_user_id else None
+        current_user = current_identity() if current_user_id else None
         
         if not question.bank.can_access(current_user):
             return {'message': '无权访问此题目'}, 403
@@ -218,7 +224,7 @@ class QuestionDetail(Resource):
     def put(self, question_id):
         """更新题目"""
         current_user_id = int(get_jwt_identity())  # 转换为整数
-        current_user = User.query.get(current_user_id)
+        current_user = load_user(current_user_id)
         question = Question.query.get_or_404(question_id)
         
         # 检查编辑权限
@@ -243,19 +249,21 @@ class QuestionDetail(Resource):
             db.session.rollback()
             return {'message': '更新失败，请稍后重试'}, 500
         
+        invalidate_bank_exports(question.bank_id)
         return question.to_dict(include_answer=True)
     
     @jwt_required()
     def delete(self, question_id):
         """删除题目"""
         current_user_id = int(get_jwt_identity())  # 转换为整数
-        current_user = User.query.get(current_user_id)
+        current_user = load_user(current_user_id)
         question = Question.query.get_or_404(question_id)
         
         # 检查删除权限
         if not question.bank.can_edit(current_user):
             return {'message': '无权删除此题目'}, 403
         
+        bank_id = question.bank_id
         try:
             db.session.delete(question)
             db.session.commit()
@@ -263,19 +271,21 @@ class QuestionDetail(Resource):
             db.session.rollback()
             return {'message': '删除失败，请稍后重试'}, 500
         
+        invalidate_bank_exports(bank_id)
         return {'message': '题目删除成功'}
 
 @questions_bp.route('/<int:question_id>/answer')
 class QuestionAnswer(Resource):
     @jwt_required()
     @questions_bp.expect(answer_submit_model)
+    @rate_limit(scope='answer', config_key='RATELIMIT_ANSWER')
     def post(self, question_id):
         """提交答案"""
         current_user_id = int(get_jwt_identity())  # 转换为整数
         question = Question.query.get_or_404(question_id)
 
         # 检查题库访问权限
-        current_user = User.query.get(current_user_id)
+        current_user = load_user(current_user_id)
         if not question.bank.can_access(current_user):
             return {'message': '无权访问此题目'}, 403
 
@@ -345,7 +355,7 @@ class QuestionFavorite(Resource):
         question = Question.query.get_or_404(question_id)
 
         # 检查题库访问权限
-        current_user = User.query.get(current_user_id)
+        current_user = load_user(current_user_id)
         if not question.bank.can_access(current_user):
             return {'message': '无权访问此题目'}, 403
 
@@ -393,7 +403,7 @@ class QuestionFavorite(Resource):
 @questions_bp.route('/favorites')
 class FavoriteQuestions(Resource):
     @jwt_required()
-    @questions_bp.marshal_with(question_list_model)
+    @questions_bp.response(200, '收藏的题目列表', question_list_model)
     def get(self):
         """获取收藏的题目列表"""
         current_user_id = int(get_jwt_identity())  # 转换为整数
@@ -403,19 +413,19 @@ class FavoriteQuestions(Resource):
         per_page = min(int(request.args.get('per_page', 20)), 100)
 
         # 查询收藏的题目
-        query = db.session.query(Question).join(UserFavorite).filter(
+        query = select(Question.id, Question.updated_at).join(UserFavorite).where(
             UserFavorite.user_id == current_user_id
         ).order_by(UserFavorite.created_at.desc())
 
-        pagination = query.paginate(page=page, per_page=per_page, error_out=False)
+        rows, total = page_rows(query, max(page, 1), per_page)
 
-        return {
-            'data': [q.to_dict() for q in pagination.items],
-            'total': pagination.total,
+        return json_response({
+            'data': None,
+            'total': total,
             'page': page,
             'per_page': per_page,
-            'pages': pagination.pages
-        }
+            'pages': pages_count(total, per_page)
+        }, 'data', question_fragments(rows, 'list'))
 
 @questions_bp.route('/by-type')
 class QuestionsByType(Resource):
@@ -442,74 +452,71 @@ class QuestionsByType(Resource):
         except:
             pass
 
-        current_user = User.query.get(current_user_id) if current_user_id else None
+        current_user = current_identity() if current_user_id else None
 
         if not bank.can_access(current_user):
             return {'message': '无权访问此题库'}, 403
 
-        # 构建查询
+        # 构建查询（只查询ID和更新时间，题目内容来自片段缓存）
+        query = select(Question.id, Question.updated_at)
         if question_type in ['single_choice', 'multiple_choice']:
             # 处理单选和多选的特殊情况
-            query = Question.query.filter_by(bank_id=bank_id, type='choice')
+            query = query.where(Question.bank_id == bank_id, Question.type == 'choice')
+            answer_length = func.char_length(func.json_unquote(func.json_extract(Question.answer, '$.correct_option')))
 
             if question_type == 'single_choice':
                 # 单选题：正确答案长度为1
-                from sqlalchemy import func
-                query = query.filter(func.char_length(func.json_unquote(func.json_extract(Question.answer, '$.correct_option'))) == 1)
+                query = query.where(answer_length == 1)
             else:
                 # 多选题：正确答案长度>1
-                from sqlalchemy import func
-                query = query.filter(func.char_length(func.json_unquote(func.json_extract(Question.answer, '$.correct_option'))) > 1)
+                query = query.where(answer_length > 1)
         else:
-            query = Question.query.filter_by(
-                bank_id=bank_id,
-                type=question_type
-            )
+            query = query.where(Question.bank_id == bank_id, Question.type == question_type)
 
         if difficulty:
-            query = query.filter_by(difficulty=difficulty)
+            query = query.where(Question.difficulty == difficulty)
 
         # 分页查询
-        pagination = query.order_by(Question.order_index, Question.id).paginate(
-            page=page, per_page=per_page, error_out=False
-        )
+        page = max(page, 1)
+        rows, total = page_rows(query.order_by(Question.order_index, Question.id), page, per_page)
+        pages = pages_count(total, per_page)
+
+        # 如果用户已登录，一次查询当页题目中已收藏的
+        favorited_ids = set()
+        if current_user_id and rows:
+            favorited_ids = set(db.session.execute(
+                select(UserFavorite.question_id).where(
+                    UserFavorite.user_id == current_user_id,
+                    UserFavorite.question_id.in_([question_id for question_id, _ in rows])
+                )
+            ).scalars())
 
         # 构建返回数据
-        questions = []
-        for question in pagination.items:
-            question_data = question.to_dict()
-
-            # 如果用户已登录，检查是否已收藏
-            if current_user_id:
-                favorite = UserFavorite.query.filter_by(
-                    user_id=current_user_id,
-                    question_id=question.id
-                ).first()
-                question_data['is_favorited'] = favorite is not None
-            else:
-                question_data['is_favorited'] = False
-
-            questions.append(question_data)
+        questions = [
+            with_extra_fields(fragment, {'is_favorited': question_id in favorited_ids})
+            for (question_id, _), fragment in zip(rows, question_fragments(rows, 'detail'))
+        ]
 
-        return {
-            'questions': questions,
+        return json_response({
+            'questions': None,
             'pagination': {
                 'page': page,
                 'per_page': per_page,
-                'total': pagination.total,
-                'pages': pagination.pages,
-                'has_next': pagination.has_next,
-                'has_prev': pagination.has_prev
+                'total': total,
+                'pages': pages,
+                'has_next': page < pages,
+                'has_prev': page > 1
             },
             'type_info': {
                 'type': question_type,
                 'type_name': get_type_name(question_type),
-                'total_count': pagination.total
+                'total_count': total
             }
-        }
+        }, 'questions', questions)
 
 @questions_bp.route('/types-stats')
 class QuestionTypesStats(Resource):
+    @cached_response(lambda: [f"bank:{request.args.get('bank_id', type=int)}"])
     def get(self):
         """获取题库中各题型的统计信息"""
         bank_id = request.args.get('bank_id', type=int)
@@ -525,7 +532,7 @@ class QuestionTypesStats(Resource):
         except:
             pass
 
-        current_user = User.query.get(current_user_id) if current_user_id else None
+        current_user = current_identity() if current_user_id else None
 
         if not bank.can_access(current_user):
             return {'message': '无权访问此题库'}, 403
@@ -3,12 +3,14 @@
 """
 from flask import request
 from flask_restx import Namespace, Resource, fields
-from flask_jwt_extended import jwt_required, get_jwt_identity, get_jwt
+from flask_jwt_extended import jwt_required, get_jwt_identity
 from marshmallow import Schema, fields as ma_fields, validate, ValidationError
 from datetime import datetime
 
 from app import db
 from app.models import User, UserProgress, UserPoints
+from app.services.token_revocation import revoke_user_sessions
+from app.utils.identity import current_identity, load_user
 
 # 创建命名空间
 users_bp = Namespace('users', description='用户管理相关接口')
@@ -46,9 +48,9 @@ class PasswordChangeSchema(Schema):
     new_password = ma_fields.Str(required=True, validate=validate.Length(min=6, max=128))
 
 def admin_required():
-    """检查是否为管理员"""
-    claims = get_jwt()
-    if claims.get('role') != 'admin':
+    """检查是否为管理员（身份来源由 AUTHZ_MODE 决定，见 app.utils.identity）"""
+    identity = current_identity()
+    if not identity or not identity.is_admin():
         return {'message': '需要管理员权限'}, 403
     return None
 
@@ -113,9 +115,9 @@ class UserDetail(Resource):
         """获取用户详情"""
         # 检查权限：管理员或用户本人
         current_user_id = get_jwt_identity()
-        claims = get_jwt()
+        identity = current_identity()
 
-        if claims.get('role') != 'admin' and int(current_user_id) != user_id:
+        if not (identity and identity.is_admin()) and int(current_user_id) != user_id:
             return {'message': '权限不足'}, 403
 
         user = User.query.get_or_404(user_id)
@@ -165,6 +167,9 @@ class UserDetail(Resource):
 
         if 'is_active' in data:
             user.is_active = bool(data['is_active'])
+            if not user.is_active:
+                # 禁用账户时撤销其已签发的令牌
+                revoke_user_sessions(user.id)
 
         try:
             db.session.commit()
@@ -203,9 +208,9 @@ class UserStatistics(Resource):
         """获取用户统计信息"""
         # 检查权限：管理员或用户本人
         current_user_id = get_jwt_identity()
-        claims = get_jwt()
+        identity = current_identity()
 
-        if claims.get('role') != 'admin' and int(current_user_id) != user_id:
+        if not (identity and identity.is_admin()) and int(current_user_id) != user_id:
             return {'message': '权限不足'}, 403
 
         user = User.query.get_or_404(user_id)
@@ -227,15 +232,16 @@ class AdminStatistics(Resource):
             active_users = User.query.filter_by(is_active=True).count()
 
             # 获取题库统计
-            from app.models import QuestionBank, Question, UserAnswer
+            from app.models import QuestionBank, Question, AnswerRollup
             total_banks = QuestionBank.query.count()
 
             # 获取题目统计
             total_questions = Question.query.count()
 
-            # 获取答题统计
-            total_answers = UserAnswer.query.count()
-            correct_answers = UserAnswer.query.filter_by(is_correct=True).count()
+            # 获取答题统计（日汇总 + 未汇总的近期答题记录）
+            answer_totals = AnswerRollup.totals()
+            total_answers = answer_totals['attempts']
+            correct_answers = answer_totals['correct']
 
             return {
                 'total_users': total_users,
@@ -358,7 +364,7 @@ class UserProfile(Resource):
     def get(self):
         """获取用户资料"""
         current_user_id = int(get_jwt_identity())  # 转换为整数
-        user = User.query.get(current_user_id)
+        user = load_user(current_user_id)
         
         if not user:
             return {'message': '用户不存在'}, 404
@@ -371,7 +377,7 @@ class UserProfile(Resource):
     def put(self):
         """更新用户资料"""
         current_user_id = int(get_jwt_identity())  # 转换为整数
-        user = User.query.get(current_user_id)
+        user = load_user(current_user_id)
         
         if not user:
             return {'message': '用户不存在'}, 404
@@ -414,7 +420,7 @@ class ChangePassword(Resource):
     def post(self):
         """修改密码"""
         current_user_id = int(get_jwt_identity())  # 转换为整数
-        user = User.query.get(current_user_id)
+        user = load_user(current_user_id)
         
         if not user:
             return {'message': '用户不存在'}, 404
@@ -430,8 +436,9 @@ class ChangePassword(Resource):
         if not user.check_password(data['old_password']):
             return {'message': '旧密码错误'}, 400
         
-        # 设置新密码
+        # 设置新密码，并使该用户已签发的令牌全部失效
         user.set_password(data['new_password'])
+        revoke_user_sessions(user.id)
         
         try:
             db.session.commit()
@@ -447,7 +454,7 @@ class UserStatistics(Resource):
     def get(self):
         """获取用户统计信息"""
         current_user_id = int(get_jwt_identity())  # 转换为整数
-        user = User.query.get(current_user_id)
+        user = load_user(current_user_id)
         
         if not user:
             return {'message': '用户不存在'}, 404
@@ -175,6 +175,8 @@ def seed_data():
 @with_appcontext
 def create_tenant(tenant_code, tenant_name, description):
     """创建新租户"""
+    from app.utils.tenants import invalidate_tenants
+
     # 检查租户代码是否已存在
     if Tenant.query.filter_by(code=tenant_code).first():
         click.echo('租户代码已存在!')
@@ -190,6 +192,7 @@ def create_tenant(tenant_code, tenant_name, description):
     
     db.session.add(tenant)
     db.session.commit()
+    invalidate_tenants()
     
     click.echo(f'租户创建成功: {tenant_name} ({tenant_code})')
 
@@ -319,6 +322,359 @@ def cleanup_expired_invitations():
     else:
         click.echo('没有过期邀请需要清理')
 
+@click.command()
+@with_appcontext
+def cleanup_upload_chunks():
+    """清理过期的分片上传会话和孤立分片"""
+    from app.models import ChunkedUpload
+    from app.services.upload_store import UploadStore
+
+    store = UploadStore()
+
+    # 过期未完成的上传会话：删除分片并标记为过期
+    expired_uploads = ChunkedUpload.query.filter(
+        ChunkedUpload.status == 'uploading',
+        ChunkedUpload.expires_at < datetime.utcnow()
+    ).all()
+    for upload in expired_uploads:
+        store.discard_chunks(upload.id)
+        upload.status = 'expired'
+    db.session.commit()
+
+    # 没有对应活动会话的分片目录和临时文件
+    active_ids = [row[0] for row in db.session.query(ChunkedUpload.id).filter(
+        ChunkedUpload.status == 'uploading'
+    ).all()]
+    max_age = current_app.config['UPLOAD_SESSION_EXPIRES'].total_seconds()
+    orphan_count = store.collect_orphan_chunks(active_ids, max_age)
+
+    click.echo(f'已清理 {len(expired_uploads)} 个过期上传会话，{orphan_count} 个孤立分片目录或临时文件')
+
+@click.command()
+@click.option('--stale-minutes', default=60, help='运行超过该时间仍未结束的任务视为失败')
+@with_appcontext
+def cleanup_export_jobs(stale_minutes):
+    """清理过期的导出任务记录和结果文件，并将失去响应的任务标记为失败"""
+    from app.models import ExportJob
+    from app.services.export_jobs import fail_stale_jobs
+
+    now = datetime.utcnow()
+
+    # 提交任务的Web进程退出后心跳停止；排队过久的任务同样视为失败
+    stale_count = fail_stale_jobs()
+    stale_count += ExportJob.query.filter(
+        ExportJob.status.in_(['pending', 'running']),
+        ExportJob.created_at < now - timedelta(minutes=stale_minutes)
+    ).update({
+        'status': 'failed',
+        'error_message': '导出任务超时',
+        'completed_at': now
+    }, synchronize_session=False)
+
+    expired = ExportJob.query.filter(
+        ExportJob.status.in_(['completed', 'failed']),
+        ExportJob.created_at < now - current_app.config['EXPORT_JOB_RETENTION']
+    )
+    for job in expired.filter(ExportJob.file_path.isnot(None)):
+        if os.path.exists(job.file_path):
+            os.remove(job.file_path)
+    expired_count = expired.delete(synchronize_session=False)
+    db.session.commit()
+
+    click.echo(f'已将 {stale_count} 个超时任务标记为失败，删除 {expired_count} 条过期任务记录')
+
+@click.command()
+@click.option('--questions', default=20, help='样例题库的题目数量')
+@click.option('--runs', default=5, help='每项测量的重复次数')
+@with_appcontext
+def benchmark_pdf_export(questions, runs):
+    """测量PDF导出的初始化开销：每次导出都初始化（旧方式）与进程级预热后的对比"""
+    import time
+    from app.utils import export as export_utils
+
+    if not export_utils.PDF_AVAILABLE:
+        raise click.ClickException('reportlab 库未安装，无法导出PDF格式')
+
+    def average_ms(func):
+        timings = []
+        for _ in range(runs):
+            start = time.perf_counter()
+            func()
+            timings.append((time.perf_counter() - start) * 1000)
+        return sum(timings) / len(timings)
+
+    font_path = next((
+        path for paths in export_utils.CJK_FONT_PATHS.values() for path in paths if os.path.exists(path)
+    ), None)
+
+    def legacy_setup():
+        # 旧方式：每次导出都解析字体文件并重建全部样式
+        if font_path:
+            export_utils.TTFont(export_utils.PDF_FONT_NAME, font_path)
+        export_utils.PdfRenderContext()
+
+    sample = {
+        'bank_info': {'name': '基准测试题库', 'question_count': questions},
+        'questions': [{
+            'type': 'choice',
+            'title': f'第{i + 1}题：以下哪个选项正确？',
+            'content': {'options': [{'key': key, 'text': f'选项{key}'} for key in 'ABCD']},
+            'answer': {'correct_option': 'A'},
+            'explanation': '这是解析',
+            'difficulty': 'medium',
+            'points': 1
+        } for i in range(questions)]
+    }
+    exporter = export_utils.BankExporter(sample)
+
+    warm_start = time.perf_counter()
+    export_utils.warm_pdf_renderer()
+    warmup_ms = (time.perf_counter() - warm_start) * 1000
+
+    legacy_ms = average_ms(legacy_setup)
+    cached_ms = average_ms(export_utils.PdfRenderContext.get)
+    export_ms = average_ms(exporter.export_pdf)
+
+    click.echo(f'字体: {font_path or "未找到中文字体，使用内置字体"}')
+    click.echo(f'进程启动预热耗时: {warmup_ms:.2f} ms')
+    click.echo(f'每次导出的初始化开销（旧方式）: {legacy_ms:.2f} ms')
+    click.echo(f'每次导出的初始化开销（预热后）: {cached_ms:.4f} ms')
+    click.echo(f'{questions}题PDF导出总耗时（预热后）: {export_ms:.2f} ms，'
+               f'旧方式约 {export_ms + legacy_ms:.2f} ms')
+
+@click.command()
+@click.argument('output', type=click.Path(dir_okay=False))
+@click.option('--bank-id', 'bank_ids', multiple=True, type=int, help='要归档的题库ID，可重复指定；默认全部')
+@click.option('--tenant', 'tenant_id', help='只归档指定租户的题库')
+@click.option('--category', help='只归档指定分类的题库')
+@click.option('--format', 'export_format', type=click.Choice(['jsonl', 'xlsx']), default='jsonl',
+              help='每个题库的文件格式')
+@click.option('--no-answers', is_flag=True, help='不包含答案和解析')
+@click.option('--resume', is_flag=True, help='从上次中断处继续，剩余题库写入新的分卷文件')
+@with_appcontext
+def export_archive(output, bank_ids, tenant_id, category, export_format, no_answers, resume):
+    """将题库归档为ZIP文件（用于备份和迁移）
+
+    每个题库写完后记录到 OUTPUT.progress；中断后使用 --resume 继续，
+    剩余题库写入 OUTPUT 同目录下的 .partN.zip 分卷，已完成的归档保持不变；
+    续传时需使用与首次相同的筛选条件
+    """
+    import json
+    from app.utils.export_archive import archive_bank_ids, write_bank_archive
+    from app.utils.db_routing import use_replica
+
+    progress_path = f'{output}.progress'
+    start_after = None
+    target = output
+
+    if resume:
+        if not os.path.exists(progress_path):
+            raise click.ClickException(f'未找到进度文件 {progress_path}，无法续传')
+        with open(progress_path, encoding='utf-8') as f:
+            done_ids = [json.loads(line)['bank_id'] for line in f if line.strip()]
+        start_after = max(done_ids) if done_ids else None
+
+        stem, ext = os.path.splitext(output)
+        part = 2
+        while os.path.exists(f'{stem}.part{part}{ext}'):
+            part += 1
+        target = f'{stem}.part{part}{ext}'
+    elif os.path.exists(progress_path):
+        os.remove(progress_path)
+
+    # 归档只读数据，配置了只读副本时读副本
+    with use_replica():
+        ids = archive_bank_ids(
+            None, bank_ids=list(bank_ids) or None, tenant_id=tenant_id, category=category,
+            start_after=start_after, unrestricted=True
+        )
+    if not ids:
+        click.echo('没有需要归档的题库')
+        return
+
+    def record_progress(record):
+        with open(progress_path, 'a', encoding='utf-8') as progress_file:
+            progress_file.write(json.dumps({'bank_id': record['bank_id'], 'file': record['file'],
+                                            'archive': os.path.basename(target)}, ensure_ascii=False) + '\n')
+        click.echo(f'  [{record["bank_id"]}] {record["name"]}: {record["question_count"]} 题')
+
+    click.echo(f'正在归档 {len(ids)} 个题库到 {target}')
+    with open(target, 'wb') as f, use_replica():
+        manifest = write_bank_archive(f, ids, 'cli', export_format, not no_answers, on_bank_done=record_progress)
+
+    total = sum(record['question_count'] for record in manifest)
+    click.echo(f'归档完成: {len(manifest)} 个题库，共 {total} 题')
+
+@click.command()
+@click.argument('file_path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--max-errors', default=100, help='最多显示的错误条数')
+@click.option('--json', 'as_json', is_flag=True, help='以JSON格式输出完整报告')
+@with_appcontext
+def validate_import(file_path, max_errors, as_json):
+    """预检XLSX题库文件（不写入数据库）"""
+    import json
+    from app.services.xlsx_validator import validate_xlsx
+
+    try:
+        report = validate_xlsx(file_path, max_errors=max_errors)
+    except ValueError as e:
+        raise click.ClickException(str(e))
+
+    if as_json:
+        click.echo(json.dumps(report, ensure_ascii=False, indent=2))
+    else:
+        click.echo(f'数据行: {report["total_rows"]}，有效: {report["valid_rows"]}，'
+                   f'有错误: {report["invalid_rows"]}')
+        if report['type_counts']:
+            click.echo('题型分布: ' + '，'.join(f'{k} {v}' for k, v in report['type_counts'].items()))
+        if report['unrecognized_columns']:
+            click.echo('未识别的列（将被忽略）: ' + '，'.join(report['unrecognized_columns']))
+        for error in report['errors']:
+            column = f'[{error["column"]}] ' if error['column'] else ''
+            click.echo(f'  第{error["row"]}行 {column}{error["message"]}')
+        if report['errors_truncated']:
+            click.echo(f'  ……共 {report["error_count"]} 条错误，仅显示前 {max_errors} 条')
+
+    if not report['valid']:
+        raise SystemExit(1)
+@click.command('warm-cache')
+@click.option('--banks', 'limit', type=int, help='预热的热门题库数量，默认 CACHE_WARMUP_BANKS')
+@click.option('--days', type=int, help='统计答题量的天数，默认 CACHE_WARMUP_DAYS')
+@click.option('--pages', type=int, help='每个题库预热的题目列表页数，默认 CACHE_WARMUP_PAGES')
+@click.option('--concurrency', type=int, help='同时预热的题库数量，默认 CACHE_WARMUP_CONCURRENCY')
+@click.option('--bank-id', 'bank_ids', multiple=True, type=int, help='只预热指定的题库，可重复指定')
+@with_appcontext
+def warm_cache(limit, days, pages, concurrency, bank_ids):
+    """预热热门题库的响应缓存
+
+    响应缓存只有在 CACHE_BACKEND 为 filesystem 或 redis 时才与Web进程共享；
+    进程内的题目片段缓存需要在每个Web进程中预热（CACHE_WARMUP_ON_START）
+    """
+    from app.services.cache_warmup import warm_caches
+
+    backend = current_app.config.get('CACHE_BACKEND')
+    if backend in ('simple', 'null'):
+        click.echo(f'警告: CACHE_BACKEND={backend}，本命令写入的缓存不会被Web进程使用')
+
+    summary = warm_caches(
+        current_app._get_current_object(), limit=limit, days=days, pages=pages,
+        concurrency=concurrency, bank_ids=list(bank_ids) or None
+    )
+    if not summary['bank_ids']:
+        click.echo('没有需要预热的题库')
+        return
+
+    for bank in summary['banks']:
+        if bank['error']:
+            click.echo(f'  [{bank["bank_id"]}] 失败: {bank["error"]}')
+            continue
+        statuses = ', '.join(str(code) for code in bank['requests'].values()) or '私有题库，仅预热题目片段'
+        click.echo(f'  [{bank["bank_id"]}] {bank["name"]}: {bank["fragments"]} 个题目片段, '
+                   f'接口 {statuses}, {bank["elapsed_ms"]:.0f} ms')
+
+    failed = sum(1 for bank in summary['banks'] if bank['error'])
+    click.echo(f'预热完成: {len(summary["banks"]) - failed} 个题库'
+               + (f'，失败 {failed} 个' if failed else '') + f'，总耗时 {summary["elapsed_ms"]:.0f} ms')
+
+@click.command('index-advisor')
+@click.option('--queries', 'captured_path', type=click.Path(exists=True, dir_okay=False),
+              help='采集的SQL文件（分号分隔，"-- name: xxx" 注释命名），与内置的热点查询一起检查')
+@click.option('--captured-only', is_flag=True, help='只检查采集的SQL，不检查内置的热点查询')
+@click.option('--verbose', is_flag=True, help='输出每条查询的SQL和执行计划')
+@click.option('--json', 'as_json', is_flag=True, help='以JSON格式输出完整报告')
+@with_appcontext
+def index_advisor(captured_path, captured_only, verbose, as_json):
+    """对热点查询执行EXPLAIN，标记全表扫描、filesort和临时表
+
+    发现问题时退出码为1，可在CI中针对生产规模的数据库运行；
+    数据量很小时优化器可能选择全表扫描，结果以接近生产的数据为准
+    """
+    import json
+    from app.services.index_advisor import describe_problems, run_index_advisor
+
+    if captured_only and not captured_path:
+        raise click.ClickException('--captured-only 需要同时指定 --queries')
+
+    try:
+        report = run_index_advisor(captured_path, include_hot=not captured_only)
+    except ValueError as e:
+        raise click.ClickException(str(e))
+
+    if as_json:
+        click.echo(json.dumps(report, ensure_ascii=False, indent=2, default=str))
+    else:
+        click.echo(f'数据库: {report["dialect"]}，检查 {len(report["results"])} 条查询')
+        for result in report['results']:
+            if result['error']:
+                status = f'错误: {result["error"]}'
+            elif result['problems']:
+                status = f'问题: {describe_problems(result["problems"])}'
+            else:
+                status = 'OK'
+            if result['allowed']:
+                status += f'（已知: {describe_problems(result["allowed"])}）'
+            click.echo(f'  {result["name"]}: {status}')
+            if verbose:
+                click.echo(f'    {" ".join(result["sql"].split())}')
+                for row in result['plan']:
+                    click.echo(f'    {row}')
+        click.echo(f'发现问题的查询: {report["flagged"]} 条')
+
+    if report['flagged']:
+        raise SystemExit(1)
+
+@click.command('maintain-answers')
+@click.option('--retention-days', type=int, help='原始答题记录的保留天数，默认 ANSWER_RETENTION_DAYS')
+@click.option('--dry-run', is_flag=True, help='只列出可归档的月份和条数，不汇总、不写文件、不删除')
+@with_appcontext
+def maintain_answers(retention_days, dry_run):
+    """答题记录每晚维护：按天汇总、预建MySQL分区、归档超过保留期的原始记录到冷存储"""
+    from app.services.answer_lifecycle import maintain_answer_log
+
+    summary = maintain_answer_log(retention_days, dry_run=dry_run)
+
+    if summary['rollups']:
+        rows = sum(count for _, count in summary['rollups'])
+        click.echo(f'已汇总 {len(summary["rollups"])} 天（{summary["rollups"][0][0]} 至 '
+                   f'{summary["rollups"][-1][0]}），写入 {rows} 条汇总')
+    if summary['partitions']:
+        click.echo(f'新建分区: {", ".join(summary["partitions"])}')
+
+    if not summary['archived']:
+        click.echo('没有需要归档的月份')
+    for month in summary['archived']:
+        if dry_run:
+            click.echo(f'  {month["month"]}: {month["archived"]} 条可归档')
+        else:
+            method = '删除分区' if month['method'] == 'drop_partition' else '分批删除'
+            click.echo(f'  {month["month"]}: 归档 {month["archived"]} 条到 {month["file"] or "（已有归档文件）"}，'
+                       f'{method} {month["deleted"]} 条')
+
+@click.command('partition-answers')
+@click.option('--execute', is_flag=True, help='直接执行DDL（大表建议用在线DDL工具执行输出的语句）')
+@with_appcontext
+def partition_answers(execute):
+    """输出（或执行）把 user_answers 转换为按月分区表的DDL（仅MySQL）"""
+    from app.services.answer_lifecycle import partition_ddl
+
+    try:
+        statements = partition_ddl()
+    except ValueError as e:
+        raise click.ClickException(str(e))
+
+    if not statements:
+        click.echo('user_answers 已经是分区表')
+        return
+
+    for statement in statements:
+        click.echo(statement + ';')
+        if execute:
+            db.session.execute(db.text(statement))
+    if execute:
+        db.session.commit()
+        click.echo('分区转换完成')
+
+
 def register_commands(app):
     """注册CLI命令"""
     app.cli.add_command(init_db)
@@ -329,3 +685,12 @@ def register_commands(app):
     app.cli.add_command(migrate_to_multi_tenant)
     app.cli.add_command(cleanup_expired_sessions)
     app.cli.add_command(cleanup_expired_invitations)
+    app.cli.add_command(cleanup_upload_chunks)
+    app.cli.add_command(validate_import)
+    app.cli.add_command(cleanup_export_jobs)
+    app.cli.add_command(benchmark_pdf_export)
+    app.cli.add_command(export_archive)
+    app.cli.add_command(warm_cache)
+    app.cli.add_command(index_advisor)
+    app.cli.add_command(maintain_answers)
+    app.cli.add_command(partition_answers)
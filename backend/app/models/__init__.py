@@ -6,11 +6,13 @@ from .user_session import UserSession, Tenant, UserInvitation
 from .question_bank import QuestionBank
 from .question import Question
 from .user_answer import UserAnswer
+from .answer_rollup import AnswerRollup
 from .user_favorite import UserFavorite
 from .user_progress import UserProgress
-from .file_import import FileImport
+from .file_import import FileImport, ChunkedUpload
 from .user_points import UserPoints, PointRecord
 from .exam import Exam, ExamAttempt, ExamQuestion
+from .export_job import ExportJob
 
 __all__ = [
     'User',
@@ -20,12 +22,15 @@ __all__ = [
     'QuestionBank',
     'Question',
     'UserAnswer',
+    'AnswerRollup',
     'UserFavorite',
     'UserProgress',
     'FileImport',
+    'ChunkedUpload',
     'UserPoints',
     'PointRecord',
     'Exam',
     'ExamAttempt',
-    'ExamQuestion'
+    'ExamQuestion',
+    'ExportJob'
 ]
@@ -0,0 +1,106 @@
+"""
+答题记录日汇总模型
+"""
+from datetime import datetime, timedelta
+from typing import Dict, Optional
+
+from sqlalchemy import case, func, select
+
+from app import db
+from .user_answer import UserAnswer
+
+
+# 汇总维度对应的原始答题记录列
+ROLLUP_GRAIN_COLUMNS = {
+    'user': UserAnswer.user_id,
+    'bank': UserAnswer.bank_id,
+    'question': UserAnswer.question_id,
+}
+
+
+class AnswerRollup(db.Model):
+    """按天汇总的答题统计 - 原始答题记录归档后统计数据由汇总表和近期原始记录合并得到"""
+    __tablename__ = 'answer_rollups'
+
+    id = db.Column(db.Integer, primary_key=True)
+    day = db.Column(db.Date, nullable=False)
+    # 汇总维度: user 按用户；bank 按题库；question 按题目
+    grain = db.Column(db.Enum('user', 'bank', 'question'), nullable=False)
+    subject_id = db.Column(db.Integer, nullable=False)  # 用户ID / 题库ID / 题目ID
+    bank_id = db.Column(db.Integer)                     # 题目维度所属的题库
+    attempts = db.Column(db.Integer, default=0, nullable=False)
+    correct = db.Column(db.Integer, default=0, nullable=False)
+    total_score = db.Column(db.BigInteger, default=0, nullable=False)
+    total_time_spent = db.Column(db.BigInteger, default=0, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        db.UniqueConstraint('grain', 'subject_id', 'day', name='uq_rollup_grain_subject_day'),
+        db.Index('idx_rollup_day', 'day'),
+    )
+
+    @classmethod
+    def rolled_up_until(cls) -> Optional[datetime]:
+        """汇总已覆盖到的时间点（最后一个汇总日的次日零点），没有汇总时返回None"""
+        last_day = db.session.execute(select(func.max(cls.day))).scalar()
+        if last_day is None:
+            return None
+        return datetime.combine(last_day, datetime.min.time()) + timedelta(days=1)
+
+    @classmethod
+    def totals(cls, subject_id: Optional[int] = None, grain: str = 'bank') -> Dict[str, int]:
+        """
+        答题总数、正确数、总得分和总用时
+
+        grain 为 bank/user/question，subject_id 为对应的题库/用户/题目ID，为None时统计全部。
+        汇总覆盖的日期读汇总表，其后的答题读原始记录
+        """
+        rolled_until = cls.rolled_up_until()
+
+        raw = select(
+            func.count(UserAnswer.id),
+            func.sum(case((UserAnswer.is_correct.is_(True), 1), else_=0)),
+            func.sum(UserAnswer.score),
+            func.sum(UserAnswer.time_spent)
+        )
+        if subject_id is not None:
+            raw = raw.where(ROLLUP_GRAIN_COLUMNS[grain] == subject_id)
+        if rolled_until is not None:
+            raw = raw.where(UserAnswer.answered_at >= rolled_until)
+        totals = cls._as_totals(db.session.execute(raw).one())
+
+        if rolled_until is not None:
+            rolled = select(
+                func.sum(cls.attempts), func.sum(cls.correct), func.sum(cls.total_score), func.sum(cls.total_time_spent)
+            ).where(cls.grain == grain)
+            if subject_id is not None:
+                rolled = rolled.where(cls.subject_id == subject_id)
+            for key, value in cls._as_totals(db.session.execute(rolled).one()).items():
+                totals[key] += value
+        return totals
+
+    @staticmethod
+    def _as_totals(row) -> Dict[str, int]:
+        attempts, correct, total_score, total_time_spent = row
+        return {
+            'attempts': int(attempts or 0),
+            'correct': int(correct or 0),
+            'total_score': int(total_score or 0),
+            'total_time_spent': int(total_time_spent or 0)
+        }
+
+    def to_dict(self):
+        """转换为字典"""
+        return {
+            'day': self.day.isoformat() if self.day else None,
+            'grain': self.grain,
+            'subject_id': self.subject_id,
+            'bank_id': self.bank_id,
+            'attempts': self.attempts,
+            'correct': self.correct,
+            'total_score': self.total_score,
+            'total_time_spent': self.total_time_spent
+        }
+
+    def __repr__(self):
+        return f'<AnswerRollup {self.grain}:{self.subject_id} {self.day}>'
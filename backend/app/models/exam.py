@@ -123,6 +123,11 @@ class ExamAttempt(db.Model):
     # 时间戳
     created_at = Column(DateTime, default=datetime.utcnow, comment='创建时间')
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, comment='更新时间')
+
+    # 复合索引：查找用户在某场考试中进行中的尝试
+    __table_args__ = (
+        db.Index('idx_attempt_exam_user_status', 'exam_id', 'user_id', 'status'),
+    )
     
     # 关联关系
     exam = relationship('Exam', backref='attempts')
@@ -0,0 +1,49 @@
+"""
+导出任务模型
+"""
+from datetime import datetime
+from app import db
+
+class ExportJob(db.Model):
+    """异步导出任务 - 在后台进程池中渲染PDF/DOCX等耗时格式"""
+    __tablename__ = 'export_jobs'
+
+    id = db.Column(db.String(32), primary_key=True)  # 任务ID（uuid hex）
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False, index=True)
+    tenant_id = db.Column(db.String(50), nullable=False, default='default')
+    bank_id = db.Column(db.Integer, db.ForeignKey('question_banks.id'), nullable=False)
+    format = db.Column(db.String(20), nullable=False)
+    include_answers = db.Column(db.Boolean, default=True, nullable=False)
+    # pending: 等待租户并发名额；running: 已提交到进程池
+    status = db.Column(db.Enum('pending', 'running', 'completed', 'failed'), default='pending', nullable=False)
+    progress = db.Column(db.Integer, default=0, nullable=False)  # 进度百分比
+    file_path = db.Column(db.String(500))
+    download_name = db.Column(db.String(255))
+    error_message = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    started_at = db.Column(db.DateTime)
+    completed_at = db.Column(db.DateTime)
+    heartbeat_at = db.Column(db.DateTime)  # 提交任务的Web进程定期更新，停止更新说明该进程已退出
+
+    __table_args__ = (
+        db.Index('idx_export_job_tenant_status', 'tenant_id', 'status'),
+    )
+
+    def to_dict(self):
+        """转换为字典"""
+        return {
+            'job_id': self.id,
+            'bank_id': self.bank_id,
+            'format': self.format,
+            'include_answers': self.include_answers,
+            'status': self.status,
+            'progress': self.progress,
+            'download_name': self.download_name,
+            'error_message': self.error_message,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'completed_at': self.completed_at.isoformat() if self.completed_at else None
+        }
+
+    def __repr__(self):
+        return f'<ExportJob {self.id}: {self.format} bank {self.bank_id}>'
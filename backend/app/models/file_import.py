@@ -12,14 +12,21 @@ class FileImport(db.Model):
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
     bank_id = db.Column(db.Integer, db.ForeignKey('question_banks.id'))
     filename = db.Column(db.String(255), nullable=False)
-    file_type = db.Column(db.Enum('pdf', 'docx', 'xlsx', 'json'), nullable=False)
+    file_type = db.Column(db.Enum('pdf', 'docx', 'xlsx', 'json', 'parquet'), nullable=False)
     file_size = db.Column(db.Integer, nullable=False)
     file_path = db.Column(db.String(500), nullable=False)
+    content_hash = db.Column(db.String(64), index=True)  # 文件内容SHA-256，用于去重和复用解析结果
+    merge_mode = db.Column(db.Enum('append', 'replace', 'sync'), default='append')  # 导入到已有题库时的合并模式
     status = db.Column(db.Enum('pending', 'processing', 'completed', 'failed'), default='pending')
     questions_imported = db.Column(db.Integer, default=0)
     error_message = db.Column(db.Text)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     completed_at = db.Column(db.DateTime)
+
+    # 复合索引：用户的导入记录按状态筛选、按时间倒序
+    __table_args__ = (
+        db.Index('idx_import_user_status_created', 'user_id', 'status', 'created_at'),
+    )
     
     def to_dict(self):
         """转换为字典"""
@@ -28,6 +35,8 @@ class FileImport(db.Model):
             'filename': self.filename,
             'file_type': self.file_type,
             'file_size': self.file_size,
+            'content_hash': self.content_hash,
+            'merge_mode': self.merge_mode,
             'status': self.status,
             'total_questions': self.questions_imported,
             'success_count': self.questions_imported,
@@ -51,3 +60,49 @@ class FileImport(db.Model):
     
     def __repr__(self):
         return f'<FileImport {self.filename}>'
+
+
+class ChunkedUpload(db.Model):
+    """分片上传会话模型 - 已接收的分片以磁盘上的分片文件为准"""
+    __tablename__ = 'chunked_uploads'
+
+    id = db.Column(db.String(32), primary_key=True)  # 上传ID（uuid hex）
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False, index=True)
+    bank_id = db.Column(db.Integer, db.ForeignKey('question_banks.id'))
+    filename = db.Column(db.String(255), nullable=False)
+    file_type = db.Column(db.String(10), nullable=False)
+    file_size = db.Column(db.BigInteger, nullable=False)
+    chunk_size = db.Column(db.Integer, nullable=False)
+    total_chunks = db.Column(db.Integer, nullable=False)
+    sha256 = db.Column(db.String(64))  # 客户端声明的文件哈希（可选）
+    merge_mode = db.Column(db.Enum('append', 'replace', 'sync'), default='append')
+    status = db.Column(db.Enum('uploading', 'completed', 'expired'), default='uploading', index=True)
+    import_id = db.Column(db.Integer, db.ForeignKey('file_imports.id'))
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
+
+    def to_dict(self, received_chunks=None):
+        """转换为字典"""
+        data = {
+            'upload_id': self.id,
+            'filename': self.filename,
+            'file_type': self.file_type,
+            'file_size': self.file_size,
+            'chunk_size': self.chunk_size,
+            'total_chunks': self.total_chunks,
+            'merge_mode': self.merge_mode,
+            'status': self.status,
+            'import_id': self.import_id,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'expires_at': self.expires_at.isoformat() if self.expires_at else None
+        }
+        if received_chunks is not None:
+            data['received_chunks'] = received_chunks
+        return data
+
+    def is_expired(self):
+        """检查上传会话是否过期"""
+        return datetime.utcnow() > self.expires_at
+
+    def __repr__(self):
+        return f'<ChunkedUpload {self.id}: {self.filename}>'
@@ -21,6 +21,12 @@ class Question(db.Model):
     order_index = db.Column(db.Integer, default=0)  # 题目顺序
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    # 复合索引：题库内按顺序分页，按题型、难度筛选后分页
+    __table_args__ = (
+        db.Index('idx_question_bank_order', 'bank_id', 'order_index'),
+        db.Index('idx_question_bank_type_difficulty', 'bank_id', 'type', 'difficulty', 'order_index'),
+    )
     
     # 关系
     user_answers = db.relationship('UserAnswer', backref='question', lazy='dynamic')
@@ -159,18 +165,18 @@ class Question(db.Model):
         return False
     
     def get_statistics(self):
-        """获取题目统计信息"""
-        total_attempts = self.user_answers.count()
-        correct_attempts = self.user_answers.filter_by(is_correct=True).count()
+        """获取题目统计信息（已归档的答题记录由日汇总表计入）"""
+        from .answer_rollup import AnswerRollup
         
-        accuracy_rate = 0
-        if total_attempts > 0:
-            accuracy_rate = round((correct_attempts / total_attempts) * 100, 2)
+        totals = AnswerRollup.totals(self.id, grain='question')
+        total_attempts = totals['attempts']
+        correct_attempts = totals['correct']
         
+        accuracy_rate = 0
         avg_time = 0
         if total_attempts > 0:
-            total_time = sum([answer.time_spent for answer in self.user_answers])
-            avg_time = round(total_time / total_attempts, 2)
+            accuracy_rate = round((correct_attempts / total_attempts) * 100, 2)
+            avg_time = round(totals['total_time_spent'] / total_attempts, 2)
         
         return {
             'total_attempts': total_attempts,
@@ -69,7 +69,7 @@ class QuestionBank(db.Model):
     
     def get_statistics(self):
         """获取题库统计信息"""
-        from .user_answer import UserAnswer
+        from .answer_rollup import AnswerRollup
         
         # 题目类型统计
         question_types = {}
@@ -77,9 +77,10 @@ class QuestionBank(db.Model):
             q_type = question.type
             question_types[q_type] = question_types.get(q_type, 0) + 1
         
-        # 答题统计
-        total_attempts = UserAnswer.query.filter_by(bank_id=self.id).count()
-        correct_attempts = UserAnswer.query.filter_by(bank_id=self.id, is_correct=True).count()
+        # 答题统计（日汇总 + 未汇总的近期答题记录）
+        totals = AnswerRollup.totals(self.id)
+        total_attempts = totals['attempts']
+        correct_attempts = totals['correct']
         
         accuracy_rate = 0
         if total_attempts > 0:
@@ -127,17 +128,16 @@ class QuestionBank(db.Model):
 
     def update_statistics(self):
         """更新题库统计信息"""
-        from .user_answer import UserAnswer
+        from .answer_rollup import AnswerRollup
 
         # 更新题目数量
         self.question_count = self.questions.count()
 
-        # 更新答题统计
-        answers = UserAnswer.query.filter_by(bank_id=self.id).all()
-        if answers:
-            self.total_attempts = len(answers)
-            total_score = sum(answer.score for answer in answers)
-            self.avg_score = round(total_score / len(answers), 2)
+        # 更新答题统计（日汇总 + 未汇总的近期答题记录）
+        totals = AnswerRollup.totals(self.id)
+        if totals['attempts']:
+            self.total_attempts = totals['attempts']
+            self.avg_score = round(totals['total_score'] / totals['attempts'], 2)
         else:
             self.total_attempts = 0
             self.avg_score = 0.0
@@ -97,13 +97,13 @@ class User(db.Model):
         return data
     
     def get_statistics(self):
-        """获取用户统计信息"""
-        from .user_progress import UserProgress
-        from .user_answer import UserAnswer
+        """获取用户统计信息（已归档的答题记录由日汇总表计入）"""
+        from .answer_rollup import AnswerRollup
         
         total_banks = self.progress.count()
-        total_answers = self.answers.count()
-        correct_answers = self.answers.filter_by(is_correct=True).count()
+        totals = AnswerRollup.totals(self.id, grain='user')
+        total_answers = totals['attempts']
+        correct_answers = totals['correct']
         
         accuracy_rate = 0
         if total_answers > 0:
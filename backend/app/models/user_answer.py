@@ -17,6 +17,13 @@ class UserAnswer(db.Model):
     score = db.Column(db.Integer, default=0)          # 得分
     time_spent = db.Column(db.Integer, default=0)     # 答题耗时(秒)
     answered_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+
+    # 复合索引：用户在题库中的答题记录、题目和题库的正确率统计
+    __table_args__ = (
+        db.Index('idx_answer_user_bank', 'user_id', 'bank_id', 'answered_at'),
+        db.Index('idx_answer_question_correct', 'question_id', 'is_correct'),
+        db.Index('idx_answer_bank_correct', 'bank_id', 'is_correct'),
+    )
     
     def to_dict(self):
         """转换为字典"""
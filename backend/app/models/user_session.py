@@ -21,6 +21,11 @@ class UserSession(db.Model):
     
     # 关联关系
     user = db.relationship('User', backref=db.backref('sessions', lazy='dynamic'))
+
+    # 撤销检查按 updated_at 增量同步已停用的会话
+    __table_args__ = (
+        db.Index('ix_user_sessions_active_updated', 'is_active', 'updated_at'),
+    )
     
     def __repr__(self):
         return f'<UserSession {self.id}: User {self.user_id}>'
@@ -0,0 +1,338 @@
+"""
+答题记录生命周期管理
+每晚执行：把已结束的日期按用户、题库、题目汇总到 answer_rollups，
+再把超过保留期的原始记录按月写入冷存储（gzip压缩的JSONL文件）并从 user_answers 中删除。
+
+MySQL 上 user_answers 可以转换为按月RANGE分区的表（partition_ddl），此后整月的删除是 DROP PARTITION，
+不再逐行删除；其他数据库分批按ID删除。统计查询读汇总表和汇总之后的原始记录（AnswerRollup.totals）
+"""
+import glob
+import gzip
+import json
+import os
+import re
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from flask import current_app
+from sqlalchemy import DateTime, Date, Integer, String, case, delete, func, insert, inspect, literal, select, text
+
+from app import db
+from app.models import AnswerRollup, UserAnswer
+
+# 冷存储文件名: user_answers-<年-月>-<首个ID>-<最后ID>.jsonl.gz
+ARCHIVE_FILE_PATTERN = re.compile(r'^user_answers-(\d{4}-\d{2})-(\d+)-(\d+)\.jsonl\.gz$')
+
+ARCHIVE_FIELDS = (
+    'id', 'user_id', 'question_id', 'bank_id', 'user_answer', 'is_correct', 'score', 'time_spent', 'answered_at'
+)
+
+ROLLUP_COLUMNS = [
+    'day', 'grain', 'subject_id', 'bank_id', 'attempts', 'correct', 'total_score', 'total_time_spent', 'created_at'
+]
+
+
+def _month_start(value) -> date:
+    return date(value.year, value.month, 1)
+
+
+def _next_month(month: date) -> date:
+    return date(month.year + (month.month == 12), month.month % 12 + 1, 1)
+
+
+def _day_start(day: date) -> datetime:
+    return datetime.combine(day, datetime.min.time())
+
+
+# 日汇总
+
+def _rollup_select(grain: str, subject_column, bank_column, day: date, created_at: datetime):
+    start = _day_start(day)
+    query = select(
+        literal(day, Date),
+        literal(grain, String),
+        subject_column,
+        bank_column if bank_column is not None else literal(None, Integer),
+        func.count(UserAnswer.id),
+        func.sum(case((UserAnswer.is_correct.is_(True), 1), else_=0)),
+        func.coalesce(func.sum(UserAnswer.score), 0),
+        func.coalesce(func.sum(UserAnswer.time_spent), 0),
+        literal(created_at, DateTime)
+    ).where(UserAnswer.answered_at >= start, UserAnswer.answered_at < start + timedelta(days=1))
+    group_by = [subject_column] + ([bank_column] if bank_column is not None else [])
+    return query.group_by(*group_by)
+
+
+def rollup_day(day: date) -> int:
+    """重新计算某一天的汇总（可重复执行），返回写入的汇总行数"""
+    db.session.execute(delete(AnswerRollup).where(AnswerRollup.day == day))
+    now = datetime.utcnow()
+    written = 0
+    for grain, subject_column, bank_column in (
+        ('user', UserAnswer.user_id, None),
+        ('bank', UserAnswer.bank_id, None),
+        ('question', UserAnswer.question_id, UserAnswer.bank_id),
+    ):
+        result = db.session.execute(
+            insert(AnswerRollup).from_select(ROLLUP_COLUMNS, _rollup_select(grain, subject_column, bank_column, day, now))
+        )
+        written += max(result.rowcount or 0, 0)
+    db.session.commit()
+    return written
+
+
+def rollup_answers(until: Optional[date] = None) -> List[Tuple[date, int]]:
+    """
+    汇总尚未汇总的日期，直到 until（不含，默认今天UTC）
+
+    从最后一个汇总日的次日开始；没有汇总时从最早的答题记录开始
+    """
+    until = until or datetime.utcnow().date()
+    rolled_until = AnswerRollup.rolled_up_until()
+    if rolled_until is not None:
+        day = rolled_until.date()
+    else:
+        first_answer = db.session.execute(select(func.min(UserAnswer.answered_at))).scalar()
+        if first_answer is None:
+            return []
+        day = first_answer.date()
+
+    results = []
+    while day < until:
+        results.append((day, rollup_day(day)))
+        day += timedelta(days=1)
+    return results
+
+
+# MySQL按月分区
+
+def _is_mysql() -> bool:
+    return db.engine.dialect.name == 'mysql'
+
+
+def answer_partitions() -> Dict[str, Optional[int]]:
+    """user_answers 的分区: 分区名 -> 上界（TO_DAYS值，MAXVALUE为None）；未分区或非MySQL时为空"""
+    if not _is_mysql():
+        return {}
+    rows = db.session.execute(text(
+        "SELECT PARTITION_NAME, PARTITION_DESCRIPTION FROM information_schema.PARTITIONS "
+        "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'user_answers' AND PARTITION_NAME IS NOT NULL"
+    )).all()
+    return {
+        name: None if description == 'MAXVALUE' else int(description)
+        for name, description in rows
+    }
+
+
+def _partition_name(month: date) -> str:
+    return f'p{month:%Y%m}'
+
+
+def _partition_clause(month: date) -> str:
+    return f"PARTITION {_partition_name(month)} VALUES LESS THAN (TO_DAYS('{_next_month(month).isoformat()}'))"
+
+
+def partition_ddl(months_ahead: Optional[int] = None) -> List[str]:
+    """
+    把 user_answers 转换为按月分区表的DDL
+
+    MySQL分区表不支持外键，且主键必须包含分区列：删除外键，主键改为 (id, answered_at)。
+    表很大时应使用 pt-online-schema-change / gh-ost 执行这些语句
+    """
+    if not _is_mysql():
+        raise ValueError('只有MySQL支持分区，其他数据库直接使用 maintain-answers 归档')
+    if answer_partitions():
+        return []
+
+    months_ahead = months_ahead if months_ahead is not None else current_app.config['ANSWER_PARTITION_MONTHS_AHEAD']
+    first_answer = db.session.execute(select(func.min(UserAnswer.answered_at))).scalar()
+    month = _month_start(first_answer or datetime.utcnow())
+    last_month = _month_start(datetime.utcnow())
+    for _ in range(months_ahead):
+        last_month = _next_month(last_month)
+
+    partitions = []
+    while month <= last_month:
+        partitions.append(_partition_clause(month))
+        month = _next_month(month)
+    partitions.append('PARTITION pmax VALUES LESS THAN MAXVALUE')
+
+    statements = [
+        f'ALTER TABLE user_answers DROP FOREIGN KEY `{foreign_key["name"]}`'
+        for foreign_key in inspect(db.engine).get_foreign_keys('user_answers') if foreign_key.get('name')
+    ]
+    statements.append(
+        'ALTER TABLE user_answers MODIFY answered_at DATETIME NOT NULL, '
+        'DROP PRIMARY KEY, ADD PRIMARY KEY (id, answered_at)'
+    )
+    statements.append(
+        'ALTER TABLE user_answers PARTITION BY RANGE (TO_DAYS(answered_at)) (\n    '
+        + ',\n    '.join(partitions) + '\n)'
+    )
+    return statements
+
+
+def ensure_future_partitions(months_ahead: Optional[int] = None) -> List[str]:
+    """分区表上预先建立当前月之后 months_ahead 个月的分区（从空的 pmax 中拆出），返回新建的分区名"""
+    partitions = answer_partitions()
+    if 'pmax' not in partitions:
+        return []
+
+    months_ahead = months_ahead if months_ahead is not None else current_app.config['ANSWER_PARTITION_MONTHS_AHEAD']
+    month = _month_start(datetime.utcnow())
+    missing = []
+    for _ in range(months_ahead + 1):
+        if _partition_name(month) not in partitions:
+            missing.append(month)
+        month = _next_month(month)
+    if not missing:
+        return []
+
+    # 只能拆分 pmax，已有分区之前的月份不再补建
+    highest = max((bound for bound in partitions.values() if bound is not None), default=None)
+    if highest is not None:
+        highest_day = date.fromordinal(highest - 365)  # TO_DAYS('0001-01-01') = 366
+        missing = [month for month in missing if month >= highest_day]
+    if not missing:
+        return []
+
+    clauses = ', '.join(_partition_clause(month) for month in missing)
+    db.session.execute(text(
+        f'ALTER TABLE user_answers REORGANIZE PARTITION pmax INTO ({clauses}, PARTITION pmax VALUES LESS THAN MAXVALUE)'
+    ))
+    db.session.commit()
+    return [_partition_name(month) for month in missing]
+
+
+# 冷存储归档
+
+def _archived_ranges(folder: str, month: date) -> List[Tuple[int, int]]:
+    ranges = []
+    for path in glob.glob(os.path.join(folder, f'user_answers-{month:%Y-%m}-*.jsonl.gz')):
+        match = ARCHIVE_FILE_PATTERN.match(os.path.basename(path))
+        if match:
+            ranges.append((int(match.group(2)), int(match.group(3))))
+    return ranges
+
+
+def _serialize(row) -> str:
+    record = dict(row._mapping)
+    record['answered_at'] = record['answered_at'].isoformat() if record['answered_at'] else None
+    return json.dumps(record, ensure_ascii=False)
+
+
+def _month_filter(month: date):
+    return (UserAnswer.answered_at >= _day_start(month), UserAnswer.answered_at < _day_start(_next_month(month)))
+
+
+def write_month_archive(folder: str, month: date, batch_size: int) -> Tuple[int, Optional[str]]:
+    """
+    把某月的原始记录写入冷存储文件，返回 (写入条数, 文件路径)
+
+    已有归档文件覆盖的ID不再写入（上次归档写完文件但删除中断时）
+    """
+    os.makedirs(folder, exist_ok=True)
+    archived = _archived_ranges(folder, month)
+    tmp_path = os.path.join(folder, f'.user_answers-{month:%Y-%m}.tmp')
+
+    columns = [getattr(UserAnswer, field) for field in ARCHIVE_FIELDS]
+    result = db.session.execute(
+        select(*columns).where(*_month_filter(month)).order_by(UserAnswer.id).execution_options(yield_per=batch_size)
+    )
+
+    count = 0
+    first_id = last_id = None
+    with gzip.open(tmp_path, 'wt', encoding='utf-8') as f:
+        for row in result:
+            if any(start <= row.id <= end for start, end in archived):
+                continue
+            f.write(_serialize(row) + '\n')
+            first_id = row.id if first_id is None else first_id
+            last_id = row.id
+            count += 1
+
+    if not count:
+        os.remove(tmp_path)
+        return 0, None
+
+    with open(tmp_path, 'rb') as f:
+        os.fsync(f.fileno())
+    path = os.path.join(folder, f'user_answers-{month:%Y-%m}-{first_id}-{last_id}.jsonl.gz')
+    os.replace(tmp_path, path)
+    return count, path
+
+
+def delete_month(month: date, batch_size: int) -> Tuple[int, str]:
+    """删除某月的原始记录，返回 (删除条数, 方式)；分区表上直接删除该月分区"""
+    partition = _partition_name(month)
+    if partition in answer_partitions():
+        count = db.session.execute(select(func.count(UserAnswer.id)).where(*_month_filter(month))).scalar()
+        db.session.execute(text(f'ALTER TABLE user_answers DROP PARTITION {partition}'))
+        db.session.commit()
+        return count, 'drop_partition'
+
+    deleted = 0
+    while True:
+        ids = db.session.execute(
+            select(UserAnswer.id).where(*_month_filter(month)).order_by(UserAnswer.id).limit(batch_size)
+        ).scalars().all()
+        if not ids:
+            break
+        db.session.execute(delete(UserAnswer).where(UserAnswer.id.in_(ids)))
+        db.session.commit()
+        deleted += len(ids)
+    return deleted, 'delete'
+
+
+def archivable_months(retention_days: int) -> List[date]:
+    """
+    超过保留期且已完整汇总的月份
+
+    保留期的截止点向前取整到月初，未汇总的日期不归档
+    """
+    cutoff = _month_start(datetime.utcnow() - timedelta(days=retention_days))
+    rolled_until = AnswerRollup.rolled_up_until()
+    if rolled_until is None:
+        return []
+    cutoff = min(cutoff, _month_start(rolled_until))
+
+    first_answer = db.session.execute(select(func.min(UserAnswer.answered_at))).scalar()
+    if first_answer is None:
+        return []
+
+    months = []
+    month = _month_start(first_answer)
+    while month < cutoff:
+        months.append(month)
+        month = _next_month(month)
+    return months
+
+
+def archive_answers(retention_days: Optional[int] = None, folder: Optional[str] = None,
+                    batch_size: Optional[int] = None, dry_run: bool = False) -> List[Dict]:
+    """按月归档超过保留期的原始记录"""
+    config = current_app.config
+    retention_days = retention_days if retention_days is not None else config['ANSWER_RETENTION_DAYS']
+    folder = folder or config['ANSWER_ARCHIVE_FOLDER']
+    batch_size = batch_size or config['ANSWER_ARCHIVE_BATCH_SIZE']
+
+    results = []
+    for month in archivable_months(retention_days):
+        result = {'month': f'{month:%Y-%m}', 'archived': 0, 'deleted': 0, 'file': None, 'method': None}
+        if dry_run:
+            result['archived'] = db.session.execute(
+                select(func.count(UserAnswer.id)).where(*_month_filter(month))
+            ).scalar()
+        else:
+            result['archived'], result['file'] = write_month_archive(folder, month, batch_size)
+            result['deleted'], result['method'] = delete_month(month, batch_size)
+        results.append(result)
+    return results
+
+
+def maintain_answer_log(retention_days: Optional[int] = None, dry_run: bool = False) -> Dict:
+    """每晚的维护任务：汇总、预建分区、归档"""
+    rollups = [] if dry_run else rollup_answers()
+    partitions = [] if dry_run else ensure_future_partitions()
+    archived = archive_answers(retention_days, dry_run=dry_run)
+    return {'rollups': rollups, 'partitions': partitions, 'archived': archived}
@@ -0,0 +1,138 @@
+"""
+缓存预热服务
+部署后按近期答题量选出热门题库，预先加载其题目JSON片段（本进程）和公开题库的
+详情、题型统计、前几页题目列表的响应缓存（按 CACHE_BACKEND 存放在本进程或共享后端）。
+
+带当前用户可见性的缓存条目无法预先计算，预热的是匿名访问的条目和所有用户共用的题目片段
+"""
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+from sqlalchemy import func, select
+
+from app import db
+from app.models import Question, QuestionBank, UserAnswer
+from app.utils.question_payload import page_rows, question_fragments
+
+# 预热的题目列表每页题数（与题目列表接口的默认值一致）
+WARMUP_PER_PAGE = 20
+
+
+def hot_bank_ids(limit: int, days: int) -> List[int]:
+    """
+    近 days 天答题次数最多的 limit 个题库
+
+    答题记录不足时（如新部署）按题目数量补足
+    """
+    since = datetime.utcnow() - timedelta(days=days)
+    answer_count = func.count(UserAnswer.id)
+    bank_ids = list(db.session.execute(
+        select(UserAnswer.bank_id)
+        .where(UserAnswer.answered_at >= since)
+        .group_by(UserAnswer.bank_id)
+        .order_by(answer_count.desc())
+        .limit(limit)
+    ).scalars())
+
+    if len(bank_ids) < limit:
+        query = select(QuestionBank.id).order_by(QuestionBank.question_count.desc(), QuestionBank.id)
+        if bank_ids:
+            query = query.where(QuestionBank.id.notin_(bank_ids))
+        bank_ids.extend(db.session.execute(query.limit(limit - len(bank_ids))).scalars())
+    return bank_ids
+
+
+def bank_warmup_paths(bank_id: int, pages: int) -> List[str]:
+    """题库需要预热的接口路径"""
+    paths = [f'/api/v1/banks/{bank_id}', f'/api/v1/questions/types-stats?bank_id={bank_id}']
+    paths.extend(
+        f'/api/v1/questions?bank_id={bank_id}&page={page}&per_page={WARMUP_PER_PAGE}'
+        for page in range(1, pages + 1)
+    )
+    return paths
+
+
+def warm_bank(app, bank_id: int, pages: int) -> Dict:
+    """预热单个题库，返回耗时和各接口的状态码"""
+    start = time.perf_counter()
+    result = {'bank_id': bank_id, 'fragments': 0, 'requests': {}, 'error': None}
+    try:
+        with app.app_context():
+            bank = db.session.get(QuestionBank, bank_id)
+            if bank is None:
+                result['error'] = '题库不存在'
+                return result
+            result['name'] = bank.name
+            is_public = bool(bank.is_public)
+
+            # 题目片段与可见性无关，私有题库也预热
+            query = select(Question.id, Question.updated_at).where(Question.bank_id == bank_id) \
+                .order_by(Question.order_index, Question.id)
+            for page in range(1, pages + 1):
+                rows, _ = page_rows(query, page, WARMUP_PER_PAGE)
+                if not rows:
+                    break
+                for variant in ('list', 'detail'):
+                    result['fragments'] += len(question_fragments(rows, variant))
+
+        # 响应缓存条目通过匿名请求生成，只有公开题库可以匿名访问
+        if is_public:
+            client = app.test_client()
+            for path in bank_warmup_paths(bank_id, pages):
+                response = client.get(path)
+                result['requests'][path] = response.status_code
+    except Exception as e:
+        result['error'] = str(e)
+    finally:
+        result['elapsed_ms'] = round((time.perf_counter() - start) * 1000, 2)
+    return result
+
+
+def warm_caches(app, limit: Optional[int] = None, days: Optional[int] = None, pages: Optional[int] = None,
+                concurrency: Optional[int] = None, bank_ids: Optional[List[int]] = None) -> Dict:
+    """
+    预热热门题库，最多同时预热 concurrency 个
+
+    返回 {'bank_ids', 'banks': [每个题库的结果], 'elapsed_ms'}
+    """
+    config = app.config
+    limit = limit or config.get('CACHE_WARMUP_BANKS', 20)
+    days = days or config.get('CACHE_WARMUP_DAYS', 7)
+    pages = pages or config.get('CACHE_WARMUP_PAGES', 1)
+    concurrency = concurrency or config.get('CACHE_WARMUP_CONCURRENCY', 4)
+
+    start = time.perf_counter()
+    if bank_ids is None:
+        with app.app_context():
+            bank_ids = hot_bank_ids(limit, days)
+
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as executor:
+        banks = list(executor.map(lambda bank_id: warm_bank(app, bank_id, pages), bank_ids))
+
+    return {
+        'bank_ids': bank_ids,
+        'banks': banks,
+        'elapsed_ms': round((time.perf_counter() - start) * 1000, 2)
+    }
+
+
+def start_background_warmup(app) -> threading.Thread:
+    """在后台线程中预热，进程启动后立即开始处理请求"""
+    def run():
+        try:
+            summary = warm_caches(app)
+        except Exception as e:
+            app.logger.warning(f"Cache warmup failed: {e}")
+            return
+        failed = [bank['bank_id'] for bank in summary['banks'] if bank['error']]
+        app.logger.info(
+            f"Cache warmup finished: {len(summary['banks'])} banks in {summary['elapsed_ms']} ms"
+            + (f", failed: {failed}" if failed else '')
+        )
+
+    thread = threading.Thread(target=run, name='cache-warmup', daemon=True)
+    thread.start()
+    return thread
@@ -0,0 +1,103 @@
+"""
+DOCX流式读取
+直接以迭代方式解析 word/document.xml，按文档顺序产出段落和表格行，
+不构建python-docx的完整对象模型
+"""
+import zipfile
+from typing import Iterator, List, Tuple, Union
+from xml.etree.ElementTree import iterparse
+
+W_NS = '{http://schemas.openxmlformats.org/wordprocessingml/2006/main}'
+
+_P = W_NS + 'p'
+_T = W_NS + 't'
+_TAB = W_NS + 'tab'
+_BR = W_NS + 'br'
+_CR = W_NS + 'cr'
+_TBL = W_NS + 'tbl'
+_TR = W_NS + 'tr'
+_TC = W_NS + 'tc'
+_BODY = W_NS + 'body'
+
+# 产出的块类型
+BLOCK_PARAGRAPH = 'paragraph'    # (BLOCK_PARAGRAPH, 段落文本)
+BLOCK_TABLE_START = 'table_start'  # (BLOCK_TABLE_START, None)
+BLOCK_ROW = 'row'                # (BLOCK_ROW, [单元格文本, ...])
+BLOCK_TABLE_END = 'table_end'    # (BLOCK_TABLE_END, None)
+
+Block = Tuple[str, Union[str, List[str], None]]
+
+
+def iter_docx_blocks(file_path: str) -> Iterator[Block]:
+    """
+    按文档顺序逐个产出DOCX正文中的段落和表格行
+
+    嵌套表格的内容并入外层单元格文本；文本框等嵌套段落并入所在段落。
+    已处理的XML元素会被立即清理，内存占用与文档长度基本无关。
+    """
+    with zipfile.ZipFile(file_path) as archive:
+        with archive.open('word/document.xml') as xml_file:
+            yield from _iter_blocks(xml_file)
+
+
+def _iter_blocks(xml_file) -> Iterator[Block]:
+    paragraph_stack: List[List[str]] = []  # 正在读取的段落（文本框段落会嵌套）
+    table_depth = 0
+    row_cells: List[str] = []
+    cell_paragraphs: List[str] = []
+    body = None
+
+    for event, elem in iterparse(xml_file, events=('start', 'end')):
+        tag = elem.tag
+
+        if event == 'start':
+            if tag == _P:
+                paragraph_stack.append([])
+            elif tag == _TBL:
+                table_depth += 1
+                if table_depth == 1:
+                    yield BLOCK_TABLE_START, None
+            elif table_depth == 1 and tag == _TR:
+                row_cells = []
+            elif table_depth == 1 and tag == _TC:
+                cell_paragraphs = []
+            elif tag == _BODY:
+                body = elem
+            continue
+
+        # end 事件
+        if tag == _T:
+            if paragraph_stack and elem.text:
+                paragraph_stack[-1].append(elem.text)
+        elif tag == _TAB:
+            if paragraph_stack:
+                paragraph_stack[-1].append('\t')
+        elif tag in (_BR, _CR):
+            if paragraph_stack:
+                paragraph_stack[-1].append('\n')
+        elif tag == _P:
+            text = ''.join(paragraph_stack.pop()) if paragraph_stack else ''
+            if paragraph_stack:
+                # 文本框等嵌套在段落内的段落
+                if text:
+                    paragraph_stack[-1].append('\n' + text)
+            elif table_depth:
+                cell_paragraphs.append(text)
+            else:
+                yield BLOCK_PARAGRAPH, text
+            elem.clear()
+        elif table_depth == 1 and tag == _TC:
+            row_cells.append('\n'.join(p for p in cell_paragraphs if p).strip())
+            elem.clear()
+        elif table_depth == 1 and tag == _TR:
+            yield BLOCK_ROW, row_cells
+            elem.clear()
+        elif tag == _TBL:
+            table_depth -= 1
+            if table_depth == 0:
+                yield BLOCK_TABLE_END, None
+            elem.clear()
+
+        # 释放正文中已处理完毕的顶层元素
+        if body is not None and not paragraph_stack and table_depth == 0 and tag in (_P, _TBL):
+            body.clear()
@@ -0,0 +1,229 @@
+"""
+题库导出缓存服务
+渲染后的导出文件按 (题库, 内容版本, 格式, 是否包含答案) 缓存在磁盘上，所有用户共享，超出容量时按最近访问时间淘汰
+"""
+import hashlib
+import json
+import os
+import shutil
+import time
+import uuid
+from typing import Callable, Optional
+
+from flask import current_app, request, send_file
+from sqlalchemy import func
+
+from app import db
+from app.models import Question
+from app.utils.export import BankExporter, write_questions_parquet, write_xlsx
+from app.utils.export_stream import build_bank_info, count_bank_questions, iter_bank_questions
+
+# 写入缓存文件的缓冲区大小
+COPY_BUFFER_SIZE = 64 * 1024
+
+# 需要渲染的导出格式: 格式 -> (BankExporter方法, MIME类型, 扩展名)
+RENDERED_EXPORT_FORMATS = {
+    'markdown': ('export_markdown', 'text/markdown', 'md'),
+    'docx': ('export_docx', 'application/vnd.openxmlformats-officedocument.wordprocessingml.document', 'docx'),
+    'pdf': ('export_pdf', 'application/pdf', 'pdf'),
+    'xlsx': ('export_xlsx', 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet', 'xlsx'),
+    'parquet': ('export_parquet', 'application/vnd.apache.parquet', 'parquet')
+}
+
+# 读取题目期间汇报进度的间隔（题数）
+PROGRESS_INTERVAL = 500
+
+
+class ExportCache:
+    """磁盘导出缓存
+
+    目录结构:
+        <EXPORT_CACHE_FOLDER>/<bank_id>/<key>.<ext>
+
+    内容版本由题库元数据和题目的数量、最大ID、最后修改时间计算，题库变化后旧版本自然失效；
+    修改题目和题库的接口还会调用 invalidate 立即删除该题库的全部缓存。
+    最近访问时间记录在文件的atime上（显式设置，不依赖文件系统的atime策略）。
+    读取方通过 open 取得已打开的文件句柄再发送，淘汰和失效删除文件不影响正在进行的下载。
+    缓存文件不包含导出人，所有用户共享同一份。
+    """
+
+    def __init__(self, root: Optional[str] = None, max_bytes: Optional[int] = None):
+        self.root = os.path.abspath(root or current_app.config['EXPORT_CACHE_FOLDER'])
+        self.max_bytes = max_bytes if max_bytes is not None else current_app.config['EXPORT_CACHE_MAX_BYTES']
+
+    @staticmethod
+    def bank_version(bank) -> str:
+        """计算题库当前的内容版本"""
+        count, max_id, last_updated = db.session.query(
+            func.count(Question.id), func.max(Question.id), func.max(Question.updated_at)
+        ).filter(Question.bank_id == bank.id).one()
+
+        payload = json.dumps([
+            bank.name, bank.description, bank.category, bank.difficulty, bank.tags,
+            count, max_id, last_updated
+        ], ensure_ascii=False, default=str)
+        return hashlib.sha1(payload.encode('utf-8')).hexdigest()[:16]
+
+    @staticmethod
+    def make_key(version: str, export_format: str, include_answers: bool) -> str:
+        """生成缓存键（题库ID体现在目录上）"""
+        return f'{version}-{export_format}-{int(include_answers)}'
+
+    def path_for(self, bank_id: int, key: str, ext: str) -> str:
+        return os.path.join(self.root, str(bank_id), f'{key}.{ext}')
+
+    def get(self, bank_id: int, key: str, ext: str) -> Optional[str]:
+        """查找缓存文件，命中时更新访问时间"""
+        path = self.path_for(bank_id, key, ext)
+        try:
+            stat = os.stat(path)
+            os.utime(path, (time.time(), stat.st_mtime))
+        except OSError:
+            return None
+        return path
+
+    def open(self, bank_id: int, key: str, ext: str):
+        """打开缓存文件并更新访问时间，未命中返回None；之后文件被淘汰也可以继续读取已打开的句柄"""
+        try:
+            handle = open(self.path_for(bank_id, key, ext), 'rb')
+        except OSError:
+            return None
+        target = handle.fileno() if os.utime in os.supports_fd else handle.name
+        try:
+            os.utime(target, (time.time(), os.fstat(handle.fileno()).st_mtime))
+        except OSError:
+            pass
+        return handle
+
+    def put(self, bank_id: int, key: str, ext: str, buffer) -> str:
+        """写入渲染结果并返回缓存文件路径，必要时淘汰最久未访问的文件"""
+        def copy_buffer(tmp_path):
+            buffer.seek(0)
+            with open(tmp_path, 'wb') as out:
+                shutil.copyfileobj(buffer, out, COPY_BUFFER_SIZE)
+
+        return self.write(bank_id, key, ext, copy_buffer)
+
+    def write(self, bank_id: int, key: str, ext: str, writer: Callable[[str], None]) -> str:
+        """由 writer 直接写入临时文件，完成后原子替换为缓存文件并返回路径"""
+        path = self.path_for(bank_id, key, ext)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        tmp_path = f'{path}.{uuid.uuid4().hex}.tmp'
+        try:
+            writer(tmp_path)
+            os.replace(tmp_path, path)
+        except Exception:
+            self._remove_quietly(tmp_path)
+            raise
+
+        self.evict(keep=path)
+        return path
+
+    def invalidate(self, bank_id: int):
+        """删除题库的全部缓存文件"""
+        shutil.rmtree(os.path.join(self.root, str(bank_id)), ignore_errors=True)
+
+    def evict(self, keep: Optional[str] = None) -> int:
+        """总大小超过上限时按访问时间从旧到新删除缓存文件，返回删除的文件数"""
+        entries = []
+        total = 0
+        for dirpath, _, filenames in os.walk(self.root):
+            for name in filenames:
+                if name.endswith('.tmp'):
+                    continue
+                path = os.path.join(dirpath, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((stat.st_atime, stat.st_size, path))
+                total += stat.st_size
+
+        removed = 0
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            if path == keep:
+                continue
+            self._remove_quietly(path)
+            total -= size
+            removed += 1
+        return removed
+
+    @staticmethod
+    def _remove_quietly(path: str):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+def render_bank_export(cache: ExportCache, bank, export_format: str, include_answers: bool, cache_key: str,
+                       progress: Optional[Callable[[int], None]] = None) -> str:
+    """
+    渲染导出文件并写入缓存，返回缓存文件路径
+    
+    progress 回调接收0-100的进度：读取题目占前50%，渲染完成为90%（XLSX和Parquet边读边写，按写入行数计算）
+    """
+    render_method, _, extension = RENDERED_EXPORT_FORMATS[export_format]
+    report = progress or (lambda percent: None)
+
+    total = count_bank_questions(bank.id)
+
+    if export_format in ('xlsx', 'parquet'):
+        # XLSX和Parquet按行流式写入临时文件，不在内存中保留题目列表
+        bank_info = build_bank_info(bank, None, total)
+        questions = iter_bank_questions(bank.id, include_answers=include_answers)
+        written_progress = lambda written: report(int(written * 90 / max(total, 1)))
+        if export_format == 'xlsx':
+            writer = lambda tmp_path: write_xlsx(bank_info, questions, tmp_path, progress=written_progress)
+        else:
+            writer = lambda tmp_path: write_questions_parquet(
+                bank_info, questions, tmp_path, include_answers=include_answers, progress=written_progress
+            )
+        return cache.write(bank.id, cache_key, extension, writer)
+
+    questions = []
+    for question in iter_bank_questions(bank.id, include_answers=include_answers):
+        questions.append(question)
+        if len(questions) % PROGRESS_INTERVAL == 0:
+            report(int(len(questions) * 50 / max(total, 1)))
+    report(50)
+
+    export_data = {
+        'bank_info': build_bank_info(bank, None, len(questions)),
+        'questions': questions
+    }
+    buffer = getattr(BankExporter(export_data), render_method)()
+    report(90)
+
+    return cache.put(bank.id, cache_key, extension, buffer)
+
+
+def send_export_file(handle, download_name: str, mimetype: str, etag: Optional[str] = None):
+    """
+    从已打开的文件句柄发送导出文件，支持Range和条件请求
+
+    按路径发送时文件可能在检查与打开之间被淘汰或失效删除；句柄在响应结束时关闭
+    """
+    stat = os.fstat(handle.fileno())
+    response = send_file(
+        handle,
+        as_attachment=True,
+        download_name=download_name,
+        mimetype=mimetype,
+        conditional=False,
+        etag=etag or False,
+        last_modified=stat.st_mtime
+    )
+    response.content_length = stat.st_size
+    return response.make_conditional(request, accept_ranges=True, complete_length=stat.st_size)
+
+
+def invalidate_bank_exports(bank_id: int):
+    """题库内容变化后清除其导出缓存，失败只记录日志"""
+    try:
+        ExportCache().invalidate(bank_id)
+    except Exception as e:
+        current_app.logger.warning(f"Failed to invalidate export cache for bank {bank_id}: {e}")
@@ -0,0 +1,264 @@
+"""
+异步导出任务服务
+PDF/DOCX等耗时格式在独立的进程池中渲染，不占用处理请求的Web工作线程；
+每个租户同时运行的任务数受 EXPORT_JOB_TENANT_CONCURRENCY 限制，超出的任务排队等待
+
+- 进程池以 spawn 方式启动，子进程自行创建应用，不继承Web进程中的线程锁和数据库连接
+- 提交任务的Web进程定期更新任务心跳，进程退出后心跳停止，任务在 EXPORT_JOB_STALE_SECONDS 后标记为失败
+- 认领任务时锁定租户行，计数和认领在同一事务中完成，多个Web进程合计也不超过租户并发上限
+- 心跳线程和任务状态查询都会清理失去心跳的任务并调度排队任务，不依赖新任务的提交
+- 完成的文件链接（或复制）到 EXPORT_JOB_FOLDER 中任务自己的路径，导出缓存淘汰后仍可下载
+"""
+import multiprocessing
+import os
+import shutil
+import threading
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+
+from flask import current_app
+from sqlalchemy import update
+
+from app import db
+from app.models import ExportJob, QuestionBank, Tenant, User
+from app.services.export_cache import ExportCache, RENDERED_EXPORT_FORMATS, render_bank_export
+from app.utils.db_routing import use_primary, use_replica
+from app.utils.export import warm_pdf_renderer
+
+_executor = None
+_executor_lock = threading.Lock()
+
+# 本进程已提交、尚未结束的任务ID，由心跳线程定期更新其 heartbeat_at
+_active_jobs = set()
+
+# 子进程中使用的应用实例
+_worker_app = None
+
+
+def _get_executor(app) -> ProcessPoolExecutor:
+    """获取（必要时创建）导出进程池，并启动本进程的任务心跳线程"""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ProcessPoolExecutor(
+                max_workers=app.config['EXPORT_JOB_WORKERS'],
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=_init_worker,
+                initargs=(app.config.get('CONFIG_NAME', 'default'),)
+            )
+            threading.Thread(
+                target=_heartbeat_loop, args=(app,), name='export-job-heartbeat', daemon=True
+            ).start()
+        return _executor
+
+
+def _init_worker(config_name: str):
+    """进程池子进程初始化：创建应用实例并预热PDF渲染"""
+    global _worker_app
+    from app import create_app
+    from config import config
+    # 渲染进程不处理请求，不需要预热接口缓存
+    config[config_name].CACHE_WARMUP_ON_START = False
+    _worker_app = create_app(config_name)
+    warm_pdf_renderer()
+
+
+def _heartbeat_loop(app):
+    """定期更新本进程已提交任务的心跳，并调度各租户排队的任务（其他进程退出后遗留的任务）"""
+    interval = app.config['EXPORT_JOB_HEARTBEAT_SECONDS']
+    while True:
+        time.sleep(interval)
+        with _executor_lock:
+            job_ids = list(_active_jobs)
+        try:
+            if job_ids:
+                with app.app_context(), db.engine.begin() as connection:
+                    connection.execute(
+                        update(ExportJob)
+                        .where(ExportJob.id.in_(job_ids), ExportJob.status == 'running')
+                        .values(heartbeat_at=datetime.utcnow())
+                    )
+            sweep_export_jobs(app)
+        except Exception as e:
+            app.logger.warning(f"Export job heartbeat failed: {e}")
+
+
+def sweep_export_jobs(app):
+    """将失去心跳的任务标记为失败，并在各租户的并发名额内调度排队的任务"""
+    with app.app_context():
+        fail_stale_jobs()
+        tenant_ids = [row[0] for row in db.session.query(ExportJob.tenant_id).filter_by(
+            status='pending'
+        ).distinct().all()]
+        db.session.remove()
+    for tenant_id in tenant_ids:
+        dispatch_pending_jobs(app, tenant_id)
+
+
+def fail_stale_jobs() -> int:
+    """将心跳超时的运行中任务（提交它的Web进程已退出）标记为失败，释放租户并发名额"""
+    now = datetime.utcnow()
+    cutoff = now - timedelta(seconds=current_app.config['EXPORT_JOB_STALE_SECONDS'])
+    with db.engine.begin() as connection:
+        return connection.execute(
+            update(ExportJob)
+            .where(ExportJob.status == 'running', ExportJob.heartbeat_at < cutoff)
+            .values(status='failed', error_message='导出进程已退出', completed_at=now)
+        ).rowcount
+
+
+def job_result_path(job_id: str, export_format: str) -> str:
+    folder = os.path.abspath(current_app.config['EXPORT_JOB_FOLDER'])
+    return os.path.join(folder, f'{job_id}.{RENDERED_EXPORT_FORMATS[export_format][2]}')
+
+
+def _store_job_result(job_id: str, export_format: str, source_path: str) -> str:
+    """把导出缓存中的文件链接（跨文件系统时复制）到任务自己的路径，缓存淘汰不影响下载"""
+    path = job_result_path(job_id, export_format)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f'{path}.{uuid.uuid4().hex}.tmp'
+    try:
+        try:
+            os.link(source_path, tmp_path)
+        except OSError:
+            shutil.copyfile(source_path, tmp_path)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return path
+
+
+def _set_job_fields(job_id: str, **values):
+    """使用独立连接更新任务状态，不影响当前会话中正在进行的查询"""
+    with db.engine.begin() as connection:
+        connection.execute(update(ExportJob).where(ExportJob.id == job_id).values(**values))
+
+
+def run_export_job(job_id: str):
+    """在子进程中执行导出任务"""
+    with _worker_app.app_context():
+        job = db.session.get(ExportJob, job_id)
+        if job is None:
+            return
+
+        _set_job_fields(job_id, started_at=datetime.utcnow(), progress=1)
+        try:
+            # 渲染只有读查询，配置了只读副本时读副本
+            with use_replica():
+                bank = db.session.get(QuestionBank, job.bank_id)
+                user = db.session.get(User, job.user_id)
+                if bank is None or user is None:
+                    raise ValueError('题库或用户不存在')
+
+                cache = ExportCache()
+                cache_key = cache.make_key(cache.bank_version(bank), job.format, job.include_answers)
+                path = cache.get(bank.id, cache_key, RENDERED_EXPORT_FORMATS[job.format][2])
+                if path is None:
+                    path = render_bank_export(
+                        cache, bank, job.format, job.include_answers, cache_key,
+                        progress=lambda percent: _set_job_fields(job_id, progress=max(1, percent))
+                    )
+
+            _set_job_fields(
+                job_id, status='completed', progress=100,
+                file_path=_store_job_result(job_id, job.format, path),
+                completed_at=datetime.utcnow()
+            )
+        except Exception as e:
+            _set_job_fields(
+                job_id, status='failed', error_message=str(e), completed_at=datetime.utcnow()
+            )
+        finally:
+            db.session.remove()
+
+
+def create_export_job(user, bank, export_format: str, include_answers: bool, download_name: str) -> ExportJob:
+    """创建导出任务；导出缓存命中时任务直接完成，否则按租户并发限制调度"""
+    job = ExportJob(
+        id=uuid.uuid4().hex,
+        user_id=user.id,
+        tenant_id=user.tenant_id or 'default',
+        bank_id=bank.id,
+        format=export_format,
+        include_answers=include_answers,
+        download_name=download_name
+    )
+
+    cache = ExportCache()
+    cache_key = cache.make_key(cache.bank_version(bank), export_format, include_answers)
+    cached_path = cache.get(bank.id, cache_key, RENDERED_EXPORT_FORMATS[export_format][2])
+    if cached_path:
+        job.status = 'completed'
+        job.progress = 100
+        job.file_path = _store_job_result(job.id, export_format, cached_path)
+        job.completed_at = datetime.utcnow()
+
+    db.session.add(job)
+    db.session.commit()
+
+    if job.status == 'pending':
+        dispatch_pending_jobs(current_app._get_current_object(), job.tenant_id)
+        db.session.refresh(job)
+    return job
+
+
+def dispatch_pending_jobs(app, tenant_id: str):
+    """在租户并发名额内将排队的任务提交到进程池"""
+    limit = app.config['EXPORT_JOB_TENANT_CONCURRENCY']
+    with app.app_context(), use_primary():
+        fail_stale_jobs()
+
+        # 锁定租户行，串行化同一租户的认领；计数和认领在同一事务中，多个Web进程合计不会超出上限
+        tenant = db.session.query(Tenant.id).filter_by(id=tenant_id).with_for_update().first()
+        running_query = db.session.query(ExportJob.id).filter_by(tenant_id=tenant_id, status='running')
+        if tenant is None:
+            # 没有租户记录时锁定该租户运行中的任务行
+            running_query = running_query.with_for_update()
+        running = len(running_query.all())
+
+        claimed_ids = []
+        if running < limit:
+            pending_ids = [row[0] for row in db.session.query(ExportJob.id).filter_by(
+                tenant_id=tenant_id, status='pending'
+            ).order_by(ExportJob.created_at).limit(limit - running).all()]
+            for job_id in pending_ids:
+                # 条件更新：任务可能已被清理命令标记为失败
+                if db.session.execute(
+                    update(ExportJob)
+                    .where(ExportJob.id == job_id, ExportJob.status == 'pending')
+                    .values(status='running', heartbeat_at=datetime.utcnow())
+                ).rowcount:
+                    claimed_ids.append(job_id)
+        db.session.commit()
+
+        for job_id in claimed_ids:
+            try:
+                executor = _get_executor(app)
+                with _executor_lock:
+                    _active_jobs.add(job_id)
+                future = executor.submit(run_export_job, job_id)
+            except Exception as e:
+                with _executor_lock:
+                    _active_jobs.discard(job_id)
+                _set_job_fields(job_id, status='failed', error_message=f'提交导出任务失败: {e}',
+                                completed_at=datetime.utcnow())
+                continue
+            future.add_done_callback(
+                lambda f, job_id=job_id: _on_job_done(app, tenant_id, job_id, f)
+            )
+
+
+def _on_job_done(app, tenant_id: str, job_id: str, future):
+    """任务结束后处理子进程异常，并调度该租户的下一个任务"""
+    with _executor_lock:
+        _active_jobs.discard(job_id)
+    with app.app_context():
+        error = future.exception()
+        if error is not None:
+            app.logger.error(f"Export job {job_id} crashed: {error}")
+            _set_job_fields(job_id, status='failed', error_message=f'导出进程异常退出: {error}',
+                            completed_at=datetime.utcnow())
+    dispatch_pending_jobs(app, tenant_id)
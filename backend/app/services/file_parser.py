@@ -1,16 +1,98 @@
 """
 文件解析服务
-支持PDF、DOCX、XLSX、JSON格式的题库文件解析
+支持PDF、DOCX、XLSX、JSON、Parquet格式的题库文件解析
 """
+import hashlib
 import json
 import re
-from typing import List, Dict, Any
+import zipfile
+from datetime import datetime
+from typing import List, Dict, Any, Iterable, Iterator, Optional
+
+from flask import current_app
+from sqlalchemy import insert, update, delete, func, select
 
 from app import db
-from app.models import Question
+from app.models import Question, UserAnswer, UserFavorite, ExamQuestion
+from app.services.docx_stream import (
+    iter_docx_blocks, BLOCK_PARAGRAPH, BLOCK_ROW, BLOCK_TABLE_START, BLOCK_TABLE_END
+)
+from app.services.json_stream import iter_json_array
+from app.utils.response_cache import mark_namespaces_changed
+
+# Excel/表格中的中文题型与题目类型的对应关系
+EXCEL_TYPE_MAPPING = {
+    '单选题': 'choice',
+    '多选题': 'choice',
+    '判断题': 'true_false',
+    '问答题': 'qa',
+    '填空题': 'qa',
+    '计算题': 'math',
+    '编程题': 'programming'
+}
+
+# Word表格中可识别的标签，统一映射为Excel导入使用的中文表头
+TABLE_LABEL_ALIASES = {
+    '题目': '题目', '题干': '题目', '问题': '题目', 'title': '题目', 'question': '题目',
+    '类型': '类型', '题型': '类型', 'type': '类型',
+    '答案': '答案', '正确答案': '答案', '参考答案': '答案', 'answer': '答案',
+    '解析': '解析', '答案解析': '解析', 'explanation': '解析',
+    '难度': '难度', 'difficulty': '难度',
+    '分值': '分值', '分数': '分值', 'points': '分值',
+}
+TABLE_LABELS = set(TABLE_LABEL_ALIASES.values())
+TABLE_OPTION_LABEL_PATTERN = re.compile(r'^(?:选项|option[ _]?)?([A-Fa-f])[.．、）)]?$', re.IGNORECASE)
+TRUE_FALSE_ANSWERS = {'对', '错', '正确', '错误', '是', '否', '√', '×', 'True', 'False', 'true', 'false'}
+
+# 题目内容哈希包含的字段（不含顺序），内容哈希相同视为同一道题
+QUESTION_HASH_FIELDS = ('type', 'title', 'content', 'answer', 'explanation', 'difficulty', 'tags', 'points')
+
+# 导入合并模式: append 追加；replace 清空题库后导入；sync 按差异增删改
+MERGE_MODES = ('append', 'replace', 'sync')
+
+# 引用题目的表，删除题目前需要先删除这些记录
+QUESTION_DEPENDENT_MODELS = (UserFavorite, UserAnswer, ExamQuestion)
+QUESTION_DEPENDENT_LABELS = {UserFavorite: '收藏', UserAnswer: '答题记录', ExamQuestion: '考试题目关联'}
+
+# Parquet题库文件中以JSON字符串存储的列
+PARQUET_JSON_COLUMNS = ('content', 'answer', 'tags')
+
+# 解析结果中保留明细的跳过行数量上限（计数不受限制）
+MAX_REPORTED_SKIPPED = 100
+
+# 每批写入数据库的题目数量
+IMPORT_BATCH_SIZE = 500
+
+# 导入时写入questions表的字段
+QUESTION_IMPORT_FIELDS = (
+    'type', 'title', 'content', 'answer', 'explanation',
+    'difficulty', 'tags', 'points', 'order_index'
+)
+
+class ImportRefusedError(ValueError):
+    """删除题目的导入（replace/sync）被拒绝，事务已回滚，题库保持不变"""
+
 
 class FileParserService:
-    """文件解析服务类"""
+    """
+    文件解析服务类
+    
+    解析时跳过的无效题目记录在 skipped_count / skipped_rows 中（流式解析在迭代结束后才完整）
+    """
+    
+    def __init__(self):
+        self.skipped_count = 0
+        self.skipped_rows: List[Dict[str, Any]] = []
+    
+    def _skip(self, row: Optional[int], message: str):
+        """记录一条因格式错误被跳过的题目（row 为文件中的题目序号，无法确定时为None）"""
+        self.skipped_count += 1
+        if len(self.skipped_rows) < MAX_REPORTED_SKIPPED:
+            self.skipped_rows.append({'row': row, 'message': message})
+            current_app.logger.warning(f"Skipped invalid question{f' {row}' if row else ''}: {message}")
+    
+    def skipped_report(self) -> Dict[str, Any]:
+        return {'skipped_count': self.skipped_count, 'skipped_rows': self.skipped_rows}
     
     def parse_file(self, file_path: str, file_type: str) -> List[Dict[str, Any]]:
         """
@@ -18,7 +100,7 @@ class FileParserService:
         
         Args:
             file_path: 文件路径
-            file_type: 文件类型 (pdf, docx, xlsx, json)
+            file_type: 文件类型 (pdf, docx, xlsx, json, parquet)
             
         Returns:
             题目数据列表
@@ -31,40 +113,75 @@ class FileParserService:
             return self._parse_docx(file_path)
         elif file_type == 'xlsx':
             return self._parse_xlsx(file_path)
+        elif file_type == 'parquet':
+            return list(self.iter_parquet_questions(file_path))
         else:
             raise ValueError(f"不支持的文件类型: {file_type}")
     
     def _parse_json(self, file_path: str) -> List[Dict[str, Any]]:
         """解析JSON格式题库文件"""
+        return list(self.iter_json_questions(file_path))
+    
+    def iter_json_questions(self, file_path: str) -> Iterator[Dict[str, Any]]:
+        """
+        逐题流式解析JSON格式题库文件
+        
+        支持题目数组或包含questions数组的对象（如 /banks/<id>/export 导出的文件），
+        边读取边验证，内存占用与文件大小无关
+        """
         try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-            
-            # 验证JSON格式
-            if isinstance(data, dict) and 'questions' in data:
-                questions = data['questions']
-            elif isinstance(data, list):
-                questions = data
-            else:
-                raise ValueError("JSON格式不正确，应包含questions数组")
-            
-            # 验证每个题目的格式
-            validated_questions = []
-            for i, question in enumerate(questions):
+            with open(file_path, 'r', encoding='utf-8-sig') as f:
+                for i, question in enumerate(iter_json_array(f, 'questions')):
+                    try:
+                        validated_question = self._validate_question_data(question)
+                    except Exception as e:
+                        self._skip(i + 1, str(e))
+                        continue
+                    validated_question['order_index'] = i
+                    yield validated_question
+        except ValueError:
+            raise
+        except Exception as e:
+            raise ValueError(f"解析JSON文件失败: {e}")
+    
+    def iter_parquet_questions(self, file_path: str,
+                               batch_size: int = IMPORT_BATCH_SIZE) -> Iterator[Dict[str, Any]]:
+        """
+        按批读取Parquet格式题库文件（/banks/<id>/export?format=parquet 导出的文件）
+        
+        只读取导入需要的列，content/answer/tags 列为JSON字符串
+        """
+        try:
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ValueError("缺少pyarrow库，无法解析Parquet文件")
+        
+        try:
+            parquet_file = pq.ParquetFile(file_path)
+        except Exception as e:
+            raise ValueError(f"解析Parquet文件失败: {e}")
+        
+        names = parquet_file.schema_arrow.names
+        missing = [field for field in ('type', 'title', 'content', 'answer') if field not in names]
+        if missing:
+            raise ValueError(f"Parquet文件缺少必需的列: {', '.join(missing)}")
+        
+        columns = [name for name in names if name in QUESTION_IMPORT_FIELDS]
+        index = 0
+        for batch in parquet_file.iter_batches(batch_size=batch_size, columns=columns):
+            for question in batch.to_pylist():
                 try:
+                    for column in PARQUET_JSON_COLUMNS:
+                        if isinstance(question.get(column), str):
+                            question[column] = json.loads(question[column])
                     validated_question = self._validate_question_data(question)
-                    validated_question['order_index'] = i
-                    validated_questions.append(validated_question)
                 except Exception as e:
-                    print(f"题目 {i+1} 格式错误: {e}")
+                    self._skip(index + 1, str(e))
+                    index += 1
                     continue
-            
-            return validated_questions
-            
-        except json.JSONDecodeError as e:
-            raise ValueError(f"JSON文件格式错误: {e}")
-        except Exception as e:
-            raise ValueError(f"解析JSON文件失败: {e}")
+                validated_question['order_index'] = index
+                index += 1
+                yield validated_question
     
     def _parse_pdf(self, file_path: str) -> List[Dict[str, Any]]:
         """解析PDF文件"""
@@ -89,25 +206,141 @@ class FileParserService:
             raise ValueError(f"解析PDF文件失败: {e}")
     
     def _parse_docx(self, file_path: str) -> List[Dict[str, Any]]:
-        """解析DOCX文件"""
+        """
+        解析DOCX文件
+        
+        直接流式读取 word/document.xml，按文档顺序处理段落和表格：
+        - 带表头的表格（题目/类型/选项A/答案...）按行转换为题目，与Excel导入规则一致
+        - 两列“标签-内容”表格（题目、A、B、答案、解析...）转换为题目
+        - 其他表格按行转换为文本，与段落一起交给文本解析
+        """
         try:
-            from docx import Document
+            questions = []
+            text_lines = []
+            table_rows = []
+            headers = None
             
-            doc = Document(file_path)
-            text = ""
+            def flush_text():
+                if text_lines:
+                    questions.extend(self._parse_text_content('\n'.join(text_lines)))
+                    text_lines.clear()
             
-            # 提取所有段落的文本
-            for paragraph in doc.paragraphs:
-                text += paragraph.text + "\n"
+            for kind, value in iter_docx_blocks(file_path):
+                if kind == BLOCK_PARAGRAPH:
+                    text_lines.append(value)
+                elif kind == BLOCK_TABLE_START:
+                    table_rows = []
+                    headers = None
+                elif kind == BLOCK_ROW:
+                    if headers is not None:
+                        # 表头表格逐行转换，不缓存整张表
+                        question = self._convert_table_row_to_question(dict(zip(headers, value)))
+                        if question:
+                            questions.append(question)
+                    elif not table_rows and self._is_table_header(value):
+                        flush_text()
+                        headers = [self._normalize_table_label(cell) for cell in value]
+                    else:
+                        table_rows.append(value)
+                elif kind == BLOCK_TABLE_END and headers is None:
+                    table_questions = self._convert_label_table(table_rows)
+                    if table_questions:
+                        flush_text()
+                        questions.extend(table_questions)
+                    else:
+                        text_lines.extend(self._table_rows_to_lines(table_rows))
+                    table_rows = []
             
-            # 使用正则表达式解析题目
-            return self._parse_text_content(text)
+            flush_text()
             
-        except ImportError:
-            raise ValueError("缺少python-docx库，无法解析DOCX文件")
+            for i, question in enumerate(questions):
+                question['order_index'] = i
+            return questions
+            
+        except (zipfile.BadZipFile, KeyError) as e:
+            raise ValueError(f"解析DOCX文件失败: 不是有效的Word文档 ({e})")
         except Exception as e:
             raise ValueError(f"解析DOCX文件失败: {e}")
     
+    def _normalize_table_label(self, cell: str) -> str:
+        """将表格标签统一为Excel导入使用的中文表头，无法识别时返回原文"""
+        label = (cell or '').strip().rstrip('：:').strip()
+        option_match = TABLE_OPTION_LABEL_PATTERN.match(label)
+        if option_match:
+            return f'选项{option_match.group(1).upper()}'
+        return TABLE_LABEL_ALIASES.get(label.lower(), label)
+    
+    def _is_known_table_label(self, label: str) -> bool:
+        return label in TABLE_LABELS or label.startswith('选项')
+    
+    def _is_table_header(self, cells: List[str]) -> bool:
+        """判断表格首行是否为表头（包含题目列及至少一个其他已知列）"""
+        labels = [self._normalize_table_label(cell) for cell in cells]
+        known = [label for label in labels if self._is_known_table_label(label)]
+        return len(cells) >= 2 and '题目' in labels and len(known) >= 2
+    
+    def _convert_table_row_to_question(self, row_data: Dict[str, Any]) -> Dict[str, Any]:
+        """将表格中的一道题转换为题目格式"""
+        if not row_data.get('题目'):
+            return None
+        
+        if not row_data.get('类型'):
+            has_options = any(key.startswith('选项') and value for key, value in row_data.items())
+            answer = str(row_data.get('答案') or '').strip()
+            if has_options:
+                row_data['类型'] = '单选题'
+            elif answer in TRUE_FALSE_ANSWERS:
+                row_data['类型'] = '判断题'
+            else:
+                row_data['类型'] = '问答题'
+        
+        try:
+            return self._convert_excel_row_to_question(row_data)
+        except (ValueError, TypeError) as e:
+            self._skip(None, f"表格题目“{str(row_data['题目'])[:50]}”格式错误: {e}")
+            return None
+    
+    def _convert_label_table(self, rows: List[List[str]]) -> List[Dict[str, Any]]:
+        """将“标签-内容”两列表格转换为题目，表格不是此格式时返回空列表"""
+        if not rows or any(len(row) < 2 for row in rows):
+            return []
+        
+        labels = [self._normalize_table_label(row[0]) for row in rows]
+        if '题目' not in labels or not all(self._is_known_table_label(label) for label in labels):
+            return []
+        
+        questions = []
+        row_data = {}
+        for label, row in zip(labels, rows):
+            # 再次出现题目标签表示下一道题
+            if label == '题目' and row_data:
+                question = self._convert_table_row_to_question(row_data)
+                if question:
+                    questions.append(question)
+                row_data = {}
+            row_data[label] = '\n'.join(cell for cell in row[1:] if cell)
+        
+        if row_data:
+            question = self._convert_table_row_to_question(row_data)
+            if question:
+                questions.append(question)
+        return questions
+    
+    def _table_rows_to_lines(self, rows: List[List[str]]) -> List[str]:
+        """将无法结构化识别的表格转换为文本行，选项和答案标签还原为文本格式"""
+        lines = []
+        for row in rows:
+            if len(row) == 2 and row[0]:
+                label = self._normalize_table_label(row[0])
+                if label.startswith('选项'):
+                    lines.append(f'{label[2:]}. {row[1]}')
+                    continue
+                if label in ('答案', '解析'):
+                    lines.append(f'{label}：{row[1]}')
+                    continue
+            lines.extend(cell for cell in row if cell)
+        return lines
+    
     def _parse_xlsx(self, file_path: str) -> List[Dict[str, Any]]:
         """解析XLSX文件"""
         try:
@@ -280,16 +513,7 @@ class FileParserService:
                              row_data.get('type') or 'choice')
 
         # 映射中文题型到英文
-        type_mapping = {
-            '单选题': 'choice',
-            '多选题': 'choice',
-            '判断题': 'true_false',
-            '问答题': 'qa',
-            '填空题': 'qa',
-            '计算题': 'math',
-            '编程题': 'programming'
-        }
-        question_type = type_mapping.get(question_type_raw, question_type_raw)
+        question_type = EXCEL_TYPE_MAPPING.get(question_type_raw, question_type_raw)
         difficulty = row_data.get('难度') or row_data.get('difficulty') or 'medium'
 
         if not title:
@@ -337,6 +561,9 @@ class FileParserService:
     
     def _validate_question_data(self, question: Dict[str, Any]) -> Dict[str, Any]:
         """验证题目数据格式"""
+        if not isinstance(question, dict):
+            raise ValueError("题目数据必须是对象")
+        
         required_fields = ['type', 'title', 'content', 'answer']
         
         for field in required_fields:
@@ -355,19 +582,223 @@ class FileParserService:
         
         return question
     
-    def import_questions(self, questions_data: List[Dict[str, Any]], bank_id: int) -> int:
-        """将题目数据导入到数据库"""
+    def import_questions(self, questions_data: Iterable[Dict[str, Any]], bank_id: int,
+                         batch_size: int = IMPORT_BATCH_SIZE) -> int:
+        """将题目数据分批写入数据库，内存占用只与批大小有关"""
+        imported_count = self._insert_all(questions_data, bank_id, batch_size)
+        
+        # 批量语句不触发ORM事件，显式使题库的接口缓存失效
+        mark_namespaces_changed([f'bank:{bank_id}'])
+        db.session.commit()
+        return imported_count
+    
+    def _insert_all(self, questions_data: Iterable[Dict[str, Any]], bank_id: int, batch_size: int) -> int:
+        """分批插入题目，不提交"""
         imported_count = 0
+        batch = []
         
         for question_data in questions_data:
-            try:
-                question_data['bank_id'] = bank_id
-                question = Question.create_from_dict(question_data)
-                db.session.add(question)
-                imported_count += 1
-            except Exception as e:
-                print(f"导入题目失败: {e}")
-                continue
+            batch.append(self._build_question_row(question_data, bank_id))
+            if len(batch) >= batch_size:
+                imported_count += self._insert_batch(batch)
+                batch = []
         
-        db.session.commit()
+        if batch:
+            imported_count += self._insert_batch(batch)
         return imported_count
+    
+    def merge_questions(self, questions_data: Iterable[Dict[str, Any]], bank_id: int,
+                        merge_mode: str = 'append', batch_size: int = IMPORT_BATCH_SIZE,
+                        delete_history: bool = False) -> Dict[str, int]:
+        """
+        按合并模式导入题目，所有改动在同一个事务中提交
+        
+        replace/sync 会删除题目，以下情况回滚并抛出 ImportRefusedError：
+        - 文件中没有有效题目，或有题目因格式错误被跳过（解析错误不能导致题目被删除）
+        - 将删除的题目有答题记录、收藏或考试关联，且未指定 delete_history
+        
+        返回各类操作的题目数量: total/inserted/updated/unchanged/deleted
+        """
+        if merge_mode == 'sync':
+            return self.sync_questions(questions_data, bank_id, batch_size, delete_history)
+        if merge_mode == 'replace':
+            return self.replace_questions(questions_data, bank_id, batch_size, delete_history)
+        if merge_mode != 'append':
+            raise ValueError(f"不支持的合并模式: {merge_mode}")
+        
+        inserted = self.import_questions(questions_data, bank_id, batch_size)
+        return {'total': inserted, 'inserted': inserted, 'updated': 0, 'unchanged': 0, 'deleted': 0}
+    
+    def replace_questions(self, questions_data: Iterable[Dict[str, Any]], bank_id: int,
+                          batch_size: int = IMPORT_BATCH_SIZE, delete_history: bool = False) -> Dict[str, int]:
+        """
+        清空题库后导入：一条语句删除题库内全部题目（delete_history 时连同其答题、收藏、考试关联记录），
+        再分批插入新题目，与插入在同一事务中提交
+        """
+        self._check_dependents(Question.bank_id == bank_id, delete_history)
+        deleted = self._delete_questions(Question.bank_id == bank_id)
+        inserted = self._insert_all(questions_data, bank_id, batch_size)
+        self._check_parsed(inserted, 'replace')
+        
+        mark_namespaces_changed([f'bank:{bank_id}'])
+        db.session.commit()
+        return {'total': inserted, 'inserted': inserted, 'updated': 0, 'unchanged': 0, 'deleted': deleted}
+    
+    def sync_questions(self, questions_data: Iterable[Dict[str, Any]], bank_id: int,
+                       batch_size: int = IMPORT_BATCH_SIZE, delete_history: bool = False) -> Dict[str, int]:
+        """
+        按差异同步题库，只改动变化的题目
+        
+        1. 内容哈希相同的题目保持不变（顺序变化时只更新order_index）
+        2. 其余题目按order_index与剩余的原有题目配对并更新
+        3. 仍未配对的新题目插入，未被配对的原有题目删除
+        
+        保留下来的题目ID不变，其答题记录和收藏不受影响；删除的题目有关联记录时需要 delete_history
+        """
+        # 原有题目只加载ID、顺序和内容哈希
+        existing_by_hash: Dict[str, List[tuple]] = {}
+        existing_order = {}
+        columns = [Question.id, Question.order_index] + [getattr(Question, f) for f in QUESTION_HASH_FIELDS]
+        rows = db.session.execute(
+            select(*columns).where(Question.bank_id == bank_id).order_by(Question.id)
+            .execution_options(yield_per=IMPORT_BATCH_SIZE)
+        )
+        for row in rows:
+            data = row._mapping
+            existing_by_hash.setdefault(self._question_hash(data), []).append((data['id'], data['order_index']))
+        
+        stats = {'total': 0, 'inserted': 0, 'updated': 0, 'unchanged': 0, 'deleted': 0}
+        updates = []
+        pending = []
+        
+        for question_data in questions_data:
+            stats['total'] += 1
+            row = self._build_question_row(question_data, bank_id)
+            matches = existing_by_hash.get(self._question_hash(row))
+            if matches:
+                question_id, order_index = matches.pop(0)
+                if order_index == row['order_index']:
+                    stats['unchanged'] += 1
+                else:
+                    updates.append({'id': question_id, 'order_index': row['order_index']})
+                    stats['updated'] += 1
+            else:
+                pending.append(row)
+            
+            if len(updates) >= batch_size:
+                self._update_batch(updates)
+                updates = []
+        
+        # 未按内容匹配的原有题目，按order_index配对
+        for matches in existing_by_hash.values():
+            for question_id, order_index in matches:
+                existing_order.setdefault(order_index, []).append(question_id)
+        
+        inserts = []
+        for row in pending:
+            candidates = existing_order.get(row['order_index'])
+            if candidates:
+                row['id'] = candidates.pop(0)
+                updates.append(row)
+                stats['updated'] += 1
+            else:
+                inserts.append(row)
+                stats['inserted'] += 1
+            
+            if len(updates) >= batch_size:
+                self._update_batch(updates)
+                updates = []
+            if len(inserts) >= batch_size:
+                self._insert_batch(inserts)
+                inserts = []
+        
+        if updates:
+            self._update_batch(updates)
+        if inserts:
+            self._insert_batch(inserts)
+        
+        self._check_parsed(stats['total'], 'sync')
+        stale_ids = [question_id for ids in existing_order.values() for question_id in ids]
+        for start in range(0, len(stale_ids), batch_size):
+            self._check_dependents(Question.id.in_(stale_ids[start:start + batch_size]), delete_history)
+        for start in range(0, len(stale_ids), batch_size):
+            stats['deleted'] += self._delete_questions(Question.id.in_(stale_ids[start:start + batch_size]))
+        
+        mark_namespaces_changed([f'bank:{bank_id}'])
+        db.session.commit()
+        return stats
+    
+    def _question_hash(self, data) -> str:
+        """计算题目内容哈希，空值统一处理以便与数据库中的记录比较"""
+        normalized = {field: data[field] for field in QUESTION_HASH_FIELDS}
+        normalized['tags'] = normalized['tags'] or []
+        normalized['explanation'] = normalized['explanation'] or None
+        normalized['difficulty'] = normalized['difficulty'] or 'medium'
+        normalized['points'] = normalized['points'] or 1
+        payload = json.dumps(normalized, sort_keys=True, ensure_ascii=False, default=str)
+        return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+    
+    def _update_batch(self, batch: List[Dict[str, Any]]):
+        """按主键批量更新一批题目"""
+        now = datetime.utcnow()
+        for row in batch:
+            row['updated_at'] = now
+        db.session.execute(update(Question), batch)
+    
+    def _refuse(self, message: str):
+        db.session.rollback()
+        raise ImportRefusedError(message)
+    
+    def _check_parsed(self, total: int, merge_mode: str):
+        """文件未解析出题目或有题目被跳过时拒绝删除题目"""
+        if total == 0:
+            self._refuse(f'文件中没有解析出有效的题目，已取消{merge_mode}导入，题库未修改')
+        if self.skipped_count:
+            self._refuse(
+                f'有 {self.skipped_count} 道题目因格式错误被跳过，已取消{merge_mode}导入，题库未修改；'
+                f'请修正文件后重新导入'
+            )
+    
+    def _check_dependents(self, condition, delete_history: bool):
+        """将删除的题目有答题记录、收藏或考试关联时，未确认则拒绝"""
+        if delete_history:
+            return
+        question_ids = select(Question.id).where(condition).scalar_subquery()
+        counts = []
+        for model in QUESTION_DEPENDENT_MODELS:
+            count = db.session.execute(
+                select(func.count()).select_from(model).where(model.question_id.in_(question_ids))
+            ).scalar()
+            if count:
+                counts.append(f'{count} 条{QUESTION_DEPENDENT_LABELS[model]}')
+        if counts:
+            self._refuse(
+                f'将删除的题目有{"、".join(counts)}，确认删除这些记录后重新导入（confirm_delete_history）'
+            )
+    
+    def _delete_questions(self, condition) -> int:
+        """按条件批量删除题目及引用它们的记录，不加载ORM对象"""
+        question_ids = select(Question.id).where(condition).scalar_subquery()
+        for model in QUESTION_DEPENDENT_MODELS:
+            db.session.execute(
+                delete(model).where(model.question_id.in_(question_ids))
+                .execution_options(synchronize_session=False)
+            )
+        result = db.session.execute(
+            delete(Question).where(condition).execution_options(synchronize_session=False)
+        )
+        return result.rowcount
+    
+    def _build_question_row(self, question_data: Dict[str, Any], bank_id: int) -> Dict[str, Any]:
+        """构造questions表的一行数据，忽略导出文件中的id等额外字段"""
+        row = {field: question_data.get(field) for field in QUESTION_IMPORT_FIELDS}
+        row['bank_id'] = bank_id
+        row['difficulty'] = row['difficulty'] or 'medium'
+        row['points'] = row['points'] or 1
+        row['order_index'] = row['order_index'] or 0
+        return row
+    
+    def _insert_batch(self, batch: List[Dict[str, Any]]) -> int:
+        """批量插入一批题目"""
+        db.session.execute(insert(Question), batch)
+        return len(batch)
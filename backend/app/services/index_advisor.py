@@ -0,0 +1,212 @@
+"""
+索引检查服务
+对一组代表性查询（热点接口的查询形态，以及从慢查询日志等处采集的SQL）执行 EXPLAIN，
+标记全表扫描、全索引扫描、filesort 和临时表，用于在上线前发现索引缺失或失效。
+
+MySQL 使用 EXPLAIN 的执行计划；SQLite（开发环境）使用 EXPLAIN QUERY PLAN
+"""
+import re
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from sqlalchemy import func, select, text
+
+from app import db
+from app.models import ExamAttempt, FileImport, Question, UserAnswer, UserSession
+
+# 检查项: 问题代码 -> 说明
+PROBLEM_DESCRIPTIONS = {
+    'full_scan': '全表扫描',
+    'full_index_scan': '全索引扫描',
+    'filesort': '使用filesort排序',
+    'temporary': '使用临时表',
+}
+
+
+class AdvisorQuery(NamedTuple):
+    """代表性查询"""
+    name: str
+    sql: str
+    allowed: frozenset = frozenset()  # 该查询形态无法避免、不视为问题的检查项
+
+
+def _sample_ids() -> Dict[str, int]:
+    """从现有数据中取参数值，使执行计划接近真实查询（没有数据时使用1）"""
+    answer = db.session.execute(
+        select(UserAnswer.user_id, UserAnswer.bank_id, UserAnswer.question_id).limit(1)
+    ).first()
+    exam_id = db.session.execute(select(ExamAttempt.exam_id).limit(1)).scalar()
+    return {
+        'user_id': answer.user_id if answer else 1,
+        'bank_id': answer.bank_id if answer else 1,
+        'question_id': answer.question_id if answer else 1,
+        'exam_id': exam_id or 1,
+    }
+
+
+def _hot_query_statements(ids: Dict[str, int]) -> List[tuple]:
+    """热点接口的查询形态: (名称, 语句, 允许的检查项)"""
+    since = datetime.utcnow() - timedelta(days=7)
+    return [
+        ('user_answers.by_user_bank',
+         select(UserAnswer).where(UserAnswer.user_id == ids['user_id'], UserAnswer.bank_id == ids['bank_id'])
+         .order_by(UserAnswer.answered_at.desc()).limit(50), ()),
+        ('user_answers.question_correct_count',
+         select(func.count()).select_from(UserAnswer)
+         .where(UserAnswer.question_id == ids['question_id'], UserAnswer.is_correct.is_(True)), ()),
+        ('user_answers.bank_correct_count',
+         select(func.count()).select_from(UserAnswer)
+         .where(UserAnswer.bank_id == ids['bank_id'], UserAnswer.is_correct.is_(True)), ()),
+        ('user_answers.hot_banks',
+         select(UserAnswer.bank_id, func.count(UserAnswer.id)).where(UserAnswer.answered_at >= since)
+         .group_by(UserAnswer.bank_id).order_by(func.count(UserAnswer.id).desc()).limit(20),
+         # 按聚合结果排序无法使用索引；按题库分组时优化器可能选择按 bank_id 开头的索引遍历
+         ('filesort', 'temporary', 'full_index_scan')),
+        ('questions.page',
+         select(Question.id, Question.updated_at).where(Question.bank_id == ids['bank_id'])
+         .order_by(Question.order_index, Question.id).limit(20), ()),
+        ('questions.by_type_difficulty',
+         select(Question.id, Question.updated_at)
+         .where(Question.bank_id == ids['bank_id'], Question.type == 'choice', Question.difficulty == 'medium')
+         .order_by(Question.order_index, Question.id).limit(20), ()),
+        ('exam_attempts.in_progress',
+         select(ExamAttempt).where(ExamAttempt.exam_id == ids['exam_id'], ExamAttempt.user_id == ids['user_id'],
+                                   ExamAttempt.status == 'in_progress').limit(1), ()),
+        ('file_imports.by_user_status',
+         select(FileImport).where(FileImport.user_id == ids['user_id'], FileImport.status == 'completed')
+         .order_by(FileImport.created_at.desc()).limit(20), ()),
+        ('user_sessions.revoked_since',
+         select(UserSession.access_token_jti, UserSession.refresh_token_jti, UserSession.updated_at)
+         .where(UserSession.is_active.is_(False), UserSession.updated_at > since), ()),
+    ]
+
+
+def hot_queries() -> List[AdvisorQuery]:
+    """按当前数据库方言编译的热点查询"""
+    dialect = db.engine.dialect
+    return [
+        AdvisorQuery(name, str(statement.compile(dialect=dialect, compile_kwargs={'literal_binds': True})),
+                     frozenset(allowed))
+        for name, statement, allowed in _hot_query_statements(_sample_ids())
+    ]
+
+
+def load_captured_queries(path: str) -> List[AdvisorQuery]:
+    """
+    读取采集的SQL文件：语句以分号结尾，-- 开头的行为注释；只检查 SELECT 语句
+
+    语句前一行的注释 "-- name: xxx" 作为该语句的名称
+    """
+    queries = []
+    name = None
+    lines = []
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            stripped = line.strip()
+            if stripped.startswith('--'):
+                match = re.match(r'--\s*name:\s*(\S+)', stripped)
+                if match and not lines:
+                    name = match.group(1)
+                continue
+            if not stripped:
+                continue
+            lines.append(stripped)
+            if stripped.endswith(';'):
+                sql = ' '.join(lines).rstrip(';').strip()
+                if sql.lower().startswith('select'):
+                    queries.append(AdvisorQuery(name or f'captured.{len(queries) + 1}', sql))
+                name = None
+                lines = []
+    if lines:
+        sql = ' '.join(lines).strip()
+        if sql.lower().startswith('select'):
+            queries.append(AdvisorQuery(name or f'captured.{len(queries) + 1}', sql))
+    return queries
+
+
+def _explain(prefix: str, sql: str) -> List[dict]:
+    # 冒号转义，避免SQL中的 :xxx 被当作绑定参数
+    escaped = sql.replace(':', '\\:')
+    return [dict(row._mapping) for row in db.session.execute(text(f'{prefix} {escaped}'))]
+
+
+def _explain_mysql(sql: str) -> Tuple[List[dict], List[str]]:
+    rows = _explain('EXPLAIN', sql)
+    problems = []
+    for row in rows:
+        access_type = (row.get('type') or '').upper()
+        extra = row.get('Extra') or ''
+        if access_type == 'ALL':
+            problems.append('full_scan')
+        elif access_type == 'INDEX':
+            problems.append('full_index_scan')
+        if 'Using filesort' in extra:
+            problems.append('filesort')
+        if 'Using temporary' in extra:
+            problems.append('temporary')
+    return rows, problems
+
+
+def _explain_sqlite(sql: str) -> Tuple[List[dict], List[str]]:
+    rows = _explain('EXPLAIN QUERY PLAN', sql)
+    problems = []
+    for row in rows:
+        detail = row.get('detail') or ''
+        if detail.startswith('SCAN '):
+            problems.append('full_index_scan' if ' USING ' in detail else 'full_scan')
+        if 'TEMP B-TREE FOR ORDER BY' in detail or 'TEMP B-TREE FOR RIGHT PART OF ORDER BY' in detail:
+            problems.append('filesort')
+        if 'TEMP B-TREE FOR GROUP BY' in detail or 'TEMP B-TREE FOR DISTINCT' in detail:
+            problems.append('temporary')
+    return rows, problems
+
+
+EXPLAINERS: Dict[str, Callable[[str], Tuple[List[dict], List[str]]]] = {
+    'mysql': _explain_mysql,
+    'sqlite': _explain_sqlite,
+}
+
+
+def analyze_queries(queries: Iterable[AdvisorQuery]) -> Dict:
+    """
+    对每条查询执行 EXPLAIN
+
+    返回 {'dialect', 'results': [{'name', 'sql', 'plan', 'problems', 'allowed', 'error'}], 'flagged'}
+    """
+    dialect = db.engine.dialect.name
+    explain = EXPLAINERS.get(dialect)
+    if explain is None:
+        raise ValueError(f'不支持的数据库: {dialect}，可选: {", ".join(EXPLAINERS)}')
+
+    results = []
+    for query in queries:
+        result = {'name': query.name, 'sql': query.sql, 'plan': [], 'problems': [], 'allowed': [], 'error': None}
+        try:
+            plan, problems = explain(query.sql)
+        except Exception as e:
+            db.session.rollback()
+            result['error'] = str(e)
+        else:
+            result['plan'] = plan
+            unique_problems = list(dict.fromkeys(problems))
+            result['problems'] = [problem for problem in unique_problems if problem not in query.allowed]
+            result['allowed'] = [problem for problem in unique_problems if problem in query.allowed]
+        results.append(result)
+
+    return {
+        'dialect': dialect,
+        'results': results,
+        'flagged': sum(1 for result in results if result['problems'] or result['error'])
+    }
+
+
+def describe_problems(problems: List[str]) -> str:
+    return '，'.join(PROBLEM_DESCRIPTIONS.get(problem, problem) for problem in problems)
+
+
+def run_index_advisor(captured_path: Optional[str] = None, include_hot: bool = True) -> Dict:
+    """检查热点查询和采集的查询"""
+    queries = hot_queries() if include_hot else []
+    if captured_path:
+        queries.extend(load_captured_queries(captured_path))
+    return analyze_queries(queries)
@@ -0,0 +1,135 @@
+"""
+增量JSON解析
+逐个读取JSON数组中的元素，内存占用只与单个元素的大小有关，与文件大小无关
+"""
+import json
+import re
+from typing import Any, Iterator, Optional, TextIO
+
+_WHITESPACE = re.compile(r'[ \t\r\n]*')
+
+
+class JsonArrayStreamReader:
+    """从文本流中逐个解析JSON数组元素
+
+    支持两种文件结构:
+        [ {...}, {...} ]                          顶层即为数组
+        { "bank_info": {...}, "questions": [...] } 顶层对象中指定键的数组
+
+    顶层对象中的其他键会被完整解码后丢弃，因此它们应当是较小的值（如导出文件中的bank_info）。
+    """
+
+    def __init__(self, fp: TextIO, read_size: int = 64 * 1024,
+                 max_item_size: int = 16 * 1024 * 1024):
+        self._fp = fp
+        self._read_size = read_size
+        self._max_item_size = max_item_size
+        self._decoder = json.JSONDecoder()
+        self._buf = ''
+        self._pos = 0
+        self._consumed = 0  # 已从缓冲区丢弃的字符数，用于报告错误位置
+        self._eof = False
+
+    def iter_items(self, key: Optional[str] = 'questions') -> Iterator[Any]:
+        """逐个产出目标数组中的元素"""
+        ch = self._peek_non_ws()
+        if ch == '[':
+            yield from self._iter_array()
+            return
+        if ch != '{' or key is None:
+            raise ValueError(f'JSON格式不正确，应包含{key or ""}数组')
+
+        self._pos += 1
+        while True:
+            ch = self._peek_non_ws()
+            if ch == '}':
+                break
+
+            name = self._decode_value()
+            if not isinstance(name, str):
+                raise ValueError(f'JSON格式错误: 位置 {self._offset()} 处应为对象键')
+            self._expect(':')
+
+            if name == key:
+                if self._peek_non_ws() != '[':
+                    raise ValueError(f'JSON格式不正确，{key}应为数组')
+                yield from self._iter_array()
+                return
+
+            # 跳过其他键的值
+            self._decode_value()
+            if self._peek_non_ws() == ',':
+                self._pos += 1
+
+        raise ValueError(f'JSON格式不正确，应包含{key}数组')
+
+    def _iter_array(self) -> Iterator[Any]:
+        self._pos += 1  # 跳过 '['
+        if self._peek_non_ws() == ']':
+            self._pos += 1
+            return
+
+        while True:
+            yield self._decode_value()
+            ch = self._peek_non_ws()
+            if ch == ',':
+                self._pos += 1
+            elif ch == ']':
+                self._pos += 1
+                return
+            else:
+                raise ValueError(f'JSON格式错误: 数组元素之间缺少逗号（位置 {self._offset()}）')
+
+    def _decode_value(self) -> Any:
+        """从当前位置解码一个完整的JSON值，数据不足时继续读取"""
+        self._peek_non_ws()
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(self._buf, self._pos)
+                # 数字可能被缓冲区边界截断，必须看到其后的字符才能确认完整
+                if end < len(self._buf) or self._eof:
+                    self._pos = end
+                    return value
+            except json.JSONDecodeError as e:
+                if self._eof:
+                    raise ValueError(f'JSON格式错误: {e.msg}（位置 {self._consumed + e.pos}）') from e
+
+            if len(self._buf) - self._pos > self._max_item_size:
+                raise ValueError(f'JSON元素超过大小限制: {self._max_item_size} 字符')
+            self._fill(max(self._read_size, len(self._buf) - self._pos))
+
+    def _peek_non_ws(self) -> str:
+        """跳过空白字符并返回下一个字符（文件结束时返回空串）"""
+        while True:
+            self._pos = _WHITESPACE.match(self._buf, self._pos).end()
+            if self._pos < len(self._buf):
+                return self._buf[self._pos]
+            if self._eof:
+                return ''
+            self._fill(self._read_size)
+
+    def _expect(self, char: str):
+        if self._peek_non_ws() != char:
+            raise ValueError(f'JSON格式错误: 位置 {self._offset()} 处应为 {char!r}')
+        self._pos += 1
+
+    def _offset(self) -> int:
+        return self._consumed + self._pos
+
+    def _fill(self, size: int):
+        """丢弃已消费的数据并读入更多内容"""
+        if self._pos:
+            self._consumed += self._pos
+            self._buf = self._buf[self._pos:]
+            self._pos = 0
+
+        data = self._fp.read(size)
+        if data:
+            self._buf += data
+        else:
+            self._eof = True
+
+
+def iter_json_array(fp: TextIO, key: Optional[str] = 'questions', **kwargs) -> Iterator[Any]:
+    """逐个产出JSON文件中指定数组的元素"""
+    return JsonArrayStreamReader(fp, **kwargs).iter_items(key)
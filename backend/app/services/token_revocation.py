@@ -0,0 +1,331 @@
+"""
+JWT撤销检查
+撤销记录保存在 user_sessions（is_active=False 的会话，其 access/refresh 令牌的 jti 视为已撤销）。
+每个工作进程在内存中维护布隆过滤器和最近撤销的精确集合，按间隔从数据库（或Redis）增量同步，
+验证令牌时绝大多数情况只需一次内存查找，不查询数据库
+"""
+import hashlib
+import math
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Iterable, List, Optional, Tuple
+
+from flask import current_app
+from sqlalchemy import event, or_, select
+from sqlalchemy.orm import Session
+
+from app import db
+from app.models import UserSession
+from app.utils.db_routing import use_primary
+
+try:
+    import redis
+    REDIS_AVAILABLE = True
+except ImportError:
+    REDIS_AVAILABLE = False
+
+# Redis中记录撤销jti的有序集合（score为撤销时间戳）
+REDIS_REVOKED_KEY = 'questionbank:revoked_jtis'
+
+# 增量同步时向前重叠的秒数，容忍数据库时间戳精度和并发提交的先后
+SYNC_OVERLAP_SECONDS = 2
+
+# 会话中已撤销、等待事务提交后发布的jti
+PENDING_REVOCATIONS_KEY = 'pending_token_revocations'
+
+# 布隆过滤器命中但精确集合未命中时（可能是误判），确认结果的缓存数量上限
+CONFIRMED_CACHE_SIZE = 10000
+
+
+class BloomFilter:
+    """定长位数组布隆过滤器，使用双重哈希生成k个位置"""
+
+    def __init__(self, capacity: int, error_rate: float):
+        self.capacity = capacity
+        self.size = max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.hash_count = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, key: str) -> Iterable[int]:
+        digest = hashlib.blake2b(key.encode('utf-8'), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return ((h1 + i * h2) % self.size for i in range(self.hash_count))
+
+    def add(self, key: str):
+        for position in self._positions(key):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, key: str) -> bool:
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(key))
+
+    @property
+    def saturated(self) -> bool:
+        return self.count > self.capacity
+
+
+class RevocationFilter:
+    """
+    进程内的撤销过滤器
+
+    - recent: 最近 REVOCATION_RECENT_WINDOW 内撤销的jti（精确）
+    - bloom: 所有未过期的已撤销jti；命中但不在 recent 中时查询数据库确认并缓存结果
+    超出布隆过滤器容量时从数据库全量重建
+    """
+
+    def __init__(self, capacity: int, error_rate: float, refresh_interval: float, recent_window: float):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.refresh_interval = refresh_interval
+        self.recent_window = recent_window
+        self.lock = threading.Lock()
+        self.bloom: Optional[BloomFilter] = None
+        self.recent = {}
+        self.confirmed = {}
+        self.watermark: Optional[float] = None
+        self.next_refresh = 0.0
+
+    # 同步
+
+    def _rebuild(self, source: 'RevocationSource'):
+        now = time.time()
+        entries = source.fetch_all()
+        capacity = max(self.capacity, len(entries) * 2)
+        bloom = BloomFilter(capacity, self.error_rate)
+        recent = {}
+        for jti, revoked_at in entries:
+            bloom.add(jti)
+            if revoked_at >= now - self.recent_window:
+                recent[jti] = revoked_at
+        self.bloom = bloom
+        self.recent = recent
+        self.confirmed = {}
+        self.watermark = max((revoked_at for _, revoked_at in entries), default=now)
+
+    def _sync(self, source: 'RevocationSource'):
+        now = time.time()
+        entries = source.fetch_since(self.watermark - SYNC_OVERLAP_SECONDS)
+        for jti, revoked_at in entries:
+            self._add(jti, revoked_at)
+            self.watermark = max(self.watermark, revoked_at)
+
+        horizon = now - self.recent_window
+        if any(revoked_at < horizon for revoked_at in self.recent.values()):
+            self.recent = {jti: revoked_at for jti, revoked_at in self.recent.items() if revoked_at >= horizon}
+
+    def _add(self, jti: str, revoked_at: float):
+        if jti not in self.recent:
+            self.bloom.add(jti)
+        self.recent[jti] = revoked_at
+        self.confirmed.pop(jti, None)
+
+    def refresh(self, source: 'RevocationSource', force: bool = False):
+        """到达同步间隔时增量同步（首次或布隆过滤器饱和时全量重建）"""
+        now = time.monotonic()
+        if not force and now < self.next_refresh:
+            return
+        with self.lock:
+            if not force and now < self.next_refresh:
+                return
+            if self.bloom is None or self.bloom.saturated:
+                self._rebuild(source)
+            else:
+                self._sync(source)
+            self.next_refresh = now + self.refresh_interval
+
+    # 查询
+
+    def add(self, jtis: Iterable[str]):
+        """本进程撤销令牌后立即加入过滤器，不等待下次同步"""
+        revoked_at = time.time()
+        with self.lock:
+            if self.bloom is None:
+                return  # 尚未初始化，首次同步时会从数据源全量加载
+            for jti in jtis:
+                self._add(jti, revoked_at)
+
+    def is_revoked(self, jti: str, source: 'RevocationSource') -> bool:
+        self.refresh(source)
+        if jti in self.recent:
+            return True
+        if jti not in self.bloom:
+            return False
+
+        # 布隆过滤器命中：较早撤销的令牌或误判，查询一次后缓存结论
+        revoked = self.confirmed.get(jti)
+        if revoked is None:
+            revoked = source.contains(jti)
+            with self.lock:
+                if len(self.confirmed) >= CONFIRMED_CACHE_SIZE:
+                    self.confirmed.clear()
+                self.confirmed[jti] = revoked
+        return revoked
+
+
+class RevocationSource:
+    """从 user_sessions 读取撤销记录"""
+
+    def _revoked_sessions(self):
+        return select(UserSession.access_token_jti, UserSession.refresh_token_jti, UserSession.updated_at).where(
+            UserSession.is_active == False,  # noqa: E712
+            or_(UserSession.expires_at.is_(None), UserSession.expires_at > datetime.utcnow())
+        )
+
+    @staticmethod
+    def _entries(rows) -> List[Tuple[str, float]]:
+        entries = []
+        for access_jti, refresh_jti, updated_at in rows:
+            revoked_at = _timestamp(updated_at)
+            for jti in (access_jti, refresh_jti):
+                if jti:
+                    entries.append((jti, revoked_at))
+        return entries
+
+    # 撤销记录读主库：副本的复制延迟会让刚撤销的令牌在其他进程中仍然有效
+
+    def fetch_all(self) -> List[Tuple[str, float]]:
+        with use_primary():
+            return self._entries(db.session.execute(self._revoked_sessions()))
+
+    def fetch_since(self, since: float) -> List[Tuple[str, float]]:
+        with use_primary():
+            return self._entries(db.session.execute(
+                self._revoked_sessions().where(UserSession.updated_at >= datetime.utcfromtimestamp(since))
+            ))
+
+    def contains(self, jti: str) -> bool:
+        with use_primary():
+            return db.session.execute(
+                select(UserSession.id).where(
+                    UserSession.is_active == False,  # noqa: E712
+                    or_(UserSession.access_token_jti == jti, UserSession.refresh_token_jti == jti)
+                ).limit(1)
+            ).first() is not None
+
+    def publish(self, jtis: List[str]):
+        """撤销记录已随会话写入数据库，无需额外发布"""
+
+
+class RedisRevocationSource(RevocationSource):
+    """
+    撤销的jti同时写入Redis有序集合，各进程从Redis增量同步，不再定期查询数据库；
+    首次加载、确认布隆过滤器命中仍以数据库为准
+    """
+
+    def __init__(self, client):
+        self.client = client
+
+    def fetch_since(self, since: float) -> List[Tuple[str, float]]:
+        members = self.client.zrangebyscore(REDIS_REVOKED_KEY, since, '+inf', withscores=True)
+        return [(jti.decode('utf-8') if isinstance(jti, bytes) else jti, score) for jti, score in members]
+
+    def publish(self, jtis: List[str]):
+        now = time.time()
+        max_age = _session_lifetime().total_seconds()
+        pipeline = self.client.pipeline()
+        pipeline.zadd(REDIS_REVOKED_KEY, {jti: now for jti in jtis})
+        pipeline.zremrangebyscore(REDIS_REVOKED_KEY, '-inf', now - max_age)
+        pipeline.execute()
+
+
+def _timestamp(value: Optional[datetime]) -> float:
+    """数据库中的UTC时间转换为时间戳"""
+    if value is None:
+        return time.time()
+    return (value - datetime(1970, 1, 1)).total_seconds()
+
+
+def _session_lifetime() -> timedelta:
+    config = current_app.config
+    return max(config['JWT_ACCESS_TOKEN_EXPIRES'], config['JWT_REFRESH_TOKEN_EXPIRES'])
+
+
+_filter: Optional[RevocationFilter] = None
+_source: Optional[RevocationSource] = None
+_init_lock = threading.Lock()
+
+
+def _get_filter() -> Tuple[RevocationFilter, RevocationSource]:
+    global _filter, _source
+    if _filter is None:
+        with _init_lock:
+            if _filter is None:
+                config = current_app.config
+                source = RevocationSource()
+                redis_url = config.get('TOKEN_REVOCATION_REDIS_URL')
+                if redis_url and REDIS_AVAILABLE:
+                    source = RedisRevocationSource(redis.Redis.from_url(redis_url))
+                _source = source
+                _filter = RevocationFilter(
+                    capacity=config['TOKEN_REVOCATION_BLOOM_CAPACITY'],
+                    error_rate=config['TOKEN_REVOCATION_BLOOM_ERROR_RATE'],
+                    refresh_interval=config['TOKEN_REVOCATION_REFRESH_SECONDS'],
+                    recent_window=config['TOKEN_REVOCATION_RECENT_WINDOW'].total_seconds()
+                )
+    return _filter, _source
+
+
+def is_token_revoked(jwt_payload: dict) -> bool:
+    """JWT token_in_blocklist_loader：令牌的jti已被撤销时返回True"""
+    jti = jwt_payload.get('jti')
+    if not jti:
+        return False
+    revocation_filter, source = _get_filter()
+    try:
+        return revocation_filter.is_revoked(jti, source)
+    except Exception as e:
+        # 撤销数据不可用时默认拒绝令牌（TOKEN_REVOCATION_FAIL_OPEN 时放行），下次检查时重试同步
+        fail_open = current_app.config.get('TOKEN_REVOCATION_FAIL_OPEN', False)
+        current_app.logger.error(
+            f"Token revocation check failed, {'accepting' if fail_open else 'rejecting'} token: {e}"
+        )
+        return not fail_open
+
+
+def revoke_sessions(sessions: List[UserSession]) -> int:
+    """
+    撤销会话（调用方负责提交事务）：会话标记为不活跃，事务提交后其令牌的jti在本进程立即生效，
+    其他进程在下次同步（TOKEN_REVOCATION_REFRESH_SECONDS）后生效；事务回滚时不撤销
+    """
+    jtis = []
+    now = datetime.utcnow()
+    for session in sessions:
+        session.is_active = False
+        session.updated_at = now
+        jtis.extend(jti for jti in (session.access_token_jti, session.refresh_token_jti) if jti)
+
+    if jtis:
+        db.session.info.setdefault(PENDING_REVOCATIONS_KEY, []).extend(jtis)
+    return len(sessions)
+
+
+def _publish_revocations(jtis: List[str]):
+    revocation_filter, source = _get_filter()
+    revocation_filter.add(jtis)
+    try:
+        source.publish(jtis)
+    except Exception as e:
+        current_app.logger.warning(f"Failed to publish token revocation: {e}")
+
+
+@event.listens_for(Session, 'after_commit')
+def _publish_committed_revocations(session):
+    jtis = session.info.pop(PENDING_REVOCATIONS_KEY, None)
+    if jtis:
+        _publish_revocations(jtis)
+
+
+@event.listens_for(Session, 'after_transaction_end')
+def _discard_rolled_back_revocations(session, transaction):
+    # 提交时已在 after_commit 中发布；外层事务结束时仍未发布的是被回滚的撤销
+    if transaction.parent is None:
+        session.info.pop(PENDING_REVOCATIONS_KEY, None)
+
+
+def revoke_user_sessions(user_id: int) -> int:
+    """撤销用户全部活跃会话（修改密码、禁用账户时使用），调用方负责提交事务"""
+    sessions = UserSession.query.filter_by(user_id=user_id, is_active=True).all()
+    return revoke_sessions(sessions)
@@ -0,0 +1,223 @@
+"""
+上传文件存储服务
+按内容SHA-256寻址保存上传文件，支持分片上传、断点续传和解析结果复用
+"""
+import hashlib
+import json
+import os
+import shutil
+import time
+import uuid
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from flask import current_app
+
+# 流式读写的缓冲区大小
+STREAM_BUFFER_SIZE = 64 * 1024
+
+# 解析结果缓存格式版本，解析逻辑变化时递增以使旧缓存失效
+PARSE_CACHE_VERSION = 2
+
+
+class UploadStore:
+    """内容寻址的上传文件存储
+
+    目录结构:
+        <UPLOAD_FOLDER>/objects/ab/<sha256>.<ext>              文件内容
+        <UPLOAD_FOLDER>/objects/ab/<sha256>.<ext>.parsed.json  解析结果缓存
+        <UPLOAD_FOLDER>/chunks/<upload_id>/<index>.part        未完成上传的分片
+    """
+
+    def __init__(self, root: Optional[str] = None):
+        self.root = os.path.abspath(root or current_app.config['UPLOAD_FOLDER'])
+        self.objects_root = os.path.join(self.root, 'objects')
+        self.chunks_root = os.path.join(self.root, 'chunks')
+        self.tmp_root = os.path.join(self.root, 'tmp')
+
+    # ---- 内容寻址对象 ----
+
+    def object_path(self, digest: str, ext: str) -> str:
+        """获取内容对象的存储路径"""
+        return os.path.join(self.objects_root, digest[:2], f'{digest}.{ext}')
+
+    def find_object(self, digest: str, ext: str) -> Optional[str]:
+        """查找已存储的内容对象"""
+        path = self.object_path(digest, ext)
+        return path if os.path.exists(path) else None
+
+    def save_stream(self, stream, ext: str) -> Tuple[str, str, int]:
+        """边写入边计算哈希地保存文件流，返回 (sha256, 存储路径, 文件大小)"""
+        tmp_path = self._new_tmp_path()
+        hasher = hashlib.sha256()
+        size = 0
+        try:
+            with open(tmp_path, 'wb') as out:
+                while True:
+                    block = stream.read(STREAM_BUFFER_SIZE)
+                    if not block:
+                        break
+                    hasher.update(block)
+                    out.write(block)
+                    size += len(block)
+        except Exception:
+            self._remove_quietly(tmp_path)
+            raise
+
+        digest = hasher.hexdigest()
+        return digest, self._promote(tmp_path, digest, ext), size
+
+    def _promote(self, tmp_path: str, digest: str, ext: str) -> str:
+        """将临时文件移动到内容地址；相同内容已存在时直接丢弃临时文件"""
+        path = self.object_path(digest, ext)
+        if os.path.exists(path):
+            self._remove_quietly(tmp_path)
+            return path
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        os.replace(tmp_path, path)
+        return path
+
+    def _new_tmp_path(self) -> str:
+        os.makedirs(self.tmp_root, exist_ok=True)
+        return os.path.join(self.tmp_root, uuid.uuid4().hex)
+
+    # ---- 分片上传 ----
+
+    def chunk_dir(self, upload_id: str) -> str:
+        """获取上传会话的分片目录"""
+        return os.path.join(self.chunks_root, upload_id)
+
+    def write_chunk(self, upload_id: str, index: int, stream, max_size: int) -> Tuple[int, str]:
+        """流式写入单个分片，返回 (分片大小, 分片sha256)
+
+        分片先写入临时文件，完整接收后再原子重命名，
+        因此中断的请求不会留下看似完整的分片。
+        """
+        chunk_dir = self.chunk_dir(upload_id)
+        os.makedirs(chunk_dir, exist_ok=True)
+        final_path = os.path.join(chunk_dir, f'{index}.part')
+        tmp_path = f'{final_path}.{uuid.uuid4().hex}.tmp'
+
+        hasher = hashlib.sha256()
+        size = 0
+        try:
+            with open(tmp_path, 'wb') as out:
+                while True:
+                    block = stream.read(STREAM_BUFFER_SIZE)
+                    if not block:
+                        break
+                    size += len(block)
+                    if size > max_size:
+                        raise ValueError(f'分片大小超过限制: {max_size} 字节')
+                    hasher.update(block)
+                    out.write(block)
+            os.replace(tmp_path, final_path)
+        except Exception:
+            self._remove_quietly(tmp_path)
+            raise
+
+        return size, hasher.hexdigest()
+
+    def received_chunks(self, upload_id: str) -> List[int]:
+        """获取已完整接收的分片序号"""
+        chunk_dir = self.chunk_dir(upload_id)
+        if not os.path.isdir(chunk_dir):
+            return []
+
+        indexes = []
+        for name in os.listdir(chunk_dir):
+            if name.endswith('.part'):
+                try:
+                    indexes.append(int(name[:-5]))
+                except ValueError:
+                    continue
+        return sorted(indexes)
+
+    def assemble(self, upload_id: str, total_chunks: int, ext: str) -> Tuple[str, str, int]:
+        """按顺序合并分片并计算整体哈希，返回 (sha256, 存储路径, 文件大小)"""
+        chunk_dir = self.chunk_dir(upload_id)
+        tmp_path = self._new_tmp_path()
+        hasher = hashlib.sha256()
+        size = 0
+        try:
+            with open(tmp_path, 'wb') as out:
+                for index in range(total_chunks):
+                    with open(os.path.join(chunk_dir, f'{index}.part'), 'rb') as part:
+                        while True:
+                            block = part.read(STREAM_BUFFER_SIZE)
+                            if not block:
+                                break
+                            hasher.update(block)
+                            out.write(block)
+                            size += len(block)
+        except Exception:
+            self._remove_quietly(tmp_path)
+            raise
+
+        digest = hasher.hexdigest()
+        return digest, self._promote(tmp_path, digest, ext), size
+
+    def discard_chunks(self, upload_id: str):
+        """删除上传会话的全部分片"""
+        shutil.rmtree(self.chunk_dir(upload_id), ignore_errors=True)
+
+    def collect_orphan_chunks(self, active_upload_ids: Iterable[str], max_age_seconds: float) -> int:
+        """清理不属于任何活动上传会话、且超过指定时间未修改的分片目录和临时文件"""
+        active = set(active_upload_ids)
+        cutoff = time.time() - max_age_seconds
+        removed = 0
+
+        if os.path.isdir(self.chunks_root):
+            for name in os.listdir(self.chunks_root):
+                path = os.path.join(self.chunks_root, name)
+                if name in active or not os.path.isdir(path):
+                    continue
+                if os.path.getmtime(path) < cutoff:
+                    shutil.rmtree(path, ignore_errors=True)
+                    removed += 1
+
+        if os.path.isdir(self.tmp_root):
+            for name in os.listdir(self.tmp_root):
+                path = os.path.join(self.tmp_root, name)
+                if os.path.getmtime(path) < cutoff:
+                    self._remove_quietly(path)
+                    removed += 1
+
+        return removed
+
+    # ---- 解析结果缓存 ----
+
+    def load_parse_result(self, digest: str, ext: str) -> Optional[Tuple[List[Dict[str, Any]], Dict[str, Any]]]:
+        """读取相同内容文件之前的解析结果，返回 (题目列表, 跳过行报告)"""
+        path = self.object_path(digest, ext) + '.parsed.json'
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                cached = json.load(f)
+        except (OSError, ValueError):
+            return None
+
+        if cached.get('version') != PARSE_CACHE_VERSION:
+            return None
+        return cached.get('questions'), cached.get('skipped') or {'skipped_count': 0, 'skipped_rows': []}
+
+    def save_parse_result(self, digest: str, ext: str, questions: List[Dict[str, Any]],
+                          skipped: Optional[Dict[str, Any]] = None):
+        """保存解析结果和跳过行报告，供相同内容的文件再次导入时复用"""
+        path = self.object_path(digest, ext) + '.parsed.json'
+        tmp_path = self._new_tmp_path()
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({'version': PARSE_CACHE_VERSION, 'questions': questions, 'skipped': skipped},
+                          f, ensure_ascii=False)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            os.replace(tmp_path, path)
+        except (OSError, TypeError, ValueError) as e:
+            self._remove_quietly(tmp_path)
+            current_app.logger.warning(f"Failed to cache parse result for {digest}: {e}")
+
+    @staticmethod
+    def _remove_quietly(path: str):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
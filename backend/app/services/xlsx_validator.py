@@ -0,0 +1,187 @@
+"""
+XLSX导入预检
+以DataFrame按列校验整张表格，在写入数据库之前生成带行号的错误报告
+"""
+from typing import Any, Dict, List, Optional
+
+from app.services.file_parser import EXCEL_TYPE_MAPPING, TRUE_FALSE_ANSWERS
+
+# 标准字段与表头别名，别名顺序与导入时的取值优先级一致
+COLUMN_ALIASES = {
+    'title': ('题目', '题干', 'title', 'question'),
+    'type': ('类型', '题型', 'type'),
+    'difficulty': ('难度', 'difficulty'),
+    'points': ('分值', 'points'),
+    'answer': ('答案', '正确答案', 'answer'),
+    'explanation': ('解析', 'explanation'),
+}
+OPTION_KEYS = ('A', 'B', 'C', 'D', 'E', 'F')
+for _key in OPTION_KEYS:
+    COLUMN_ALIASES[f'option_{_key}'] = (f'选项{_key}', f'option_{_key}', f'Option {_key}')
+
+VALID_TYPES = ('choice', 'true_false', 'qa', 'math', 'programming')
+VALID_DIFFICULTIES = ('easy', 'medium', 'hard')
+
+# 报告中最多列出的错误条数（统计数字不受此限制）
+MAX_REPORTED_ERRORS = 500
+
+# 数据从Excel第2行开始，DataFrame索引0对应第2行
+FIRST_DATA_ROW = 2
+
+
+def resolve_columns(headers: List[Any]) -> Dict[str, List[str]]:
+    """一次性解析表头别名，返回 {标准字段: [匹配到的原始表头, ...]}"""
+    present = {str(header).strip(): header for header in headers if header is not None}
+    resolved = {}
+    for field, aliases in COLUMN_ALIASES.items():
+        matched = [present[alias] for alias in aliases if alias in present]
+        if matched:
+            resolved[field] = matched
+    return resolved
+
+
+def validate_xlsx(file_path: str, max_errors: int = MAX_REPORTED_ERRORS) -> Dict[str, Any]:
+    """
+    预检XLSX题库文件，不写入数据库
+
+    返回的报告包含行数统计、题型分布、表头识别结果以及带Excel行号的错误列表
+    """
+    try:
+        import pandas as pd
+    except ImportError:
+        raise ValueError("缺少pandas库，无法预检XLSX文件")
+
+    try:
+        df = pd.read_excel(file_path, dtype=object, engine='openpyxl')
+    except Exception as e:
+        raise ValueError(f"读取XLSX文件失败: {e}")
+
+    return XlsxValidator(df, max_errors).run()
+
+
+class XlsxValidator:
+    """按列校验题目表格"""
+
+    def __init__(self, df, max_errors: int = MAX_REPORTED_ERRORS):
+        import pandas as pd
+
+        self.pd = pd
+        self.max_errors = max_errors
+        self.columns = resolve_columns(list(df.columns))
+        self.unrecognized_columns = [
+            str(column) for column in df.columns
+            if not any(column in matched for matched in self.columns.values())
+        ]
+
+        # 单元格统一为去除首尾空白的字符串，空串视为缺失
+        cells = df.apply(lambda column: column.astype('string').str.strip())
+        cells = cells.mask(cells == '')
+        self.blank_rows = cells.isna().all(axis=1)
+        self.cells = cells
+        self.fields = {field: self._coalesce(matched) for field, matched in self.columns.items()}
+        self.error_masks: List[tuple] = []
+
+    def _coalesce(self, matched: List[str]):
+        """多个别名列按优先级合并为一列（取第一个非空值）"""
+        if len(matched) == 1:
+            return self.cells[matched[0]]
+        return self.cells[matched].bfill(axis=1).iloc[:, 0]
+
+    def _field(self, field: str):
+        column = self.fields.get(field)
+        if column is None:
+            return self.pd.Series(self.pd.NA, index=self.cells.index, dtype='string')
+        return column
+
+    def _header(self, field: str) -> Optional[str]:
+        matched = self.columns.get(field)
+        return str(matched[0]) if matched else None
+
+    def _add(self, mask, field: str, message: str):
+        mask = mask.fillna(False).astype(bool) & ~self.blank_rows
+        if mask.any():
+            self.error_masks.append((mask, self._header(field) or field, message))
+
+    def run(self) -> Dict[str, Any]:
+        pd = self.pd
+
+        title = self._field('title')
+        type_raw = self._field('type')
+        answer = self._field('answer')
+
+        if 'title' not in self.columns:
+            return self._report(
+                types=None,
+                fatal='未找到题目列（支持的表头: ' + '/'.join(COLUMN_ALIASES['title']) + '）'
+            )
+
+        self._add(title.isna(), 'title', '缺少题目，该行将被跳过')
+        has_title = title.notna()
+
+        # 题型：与导入时一致，未填写时默认为选择题
+        types = type_raw.fillna('choice').map(lambda value: EXCEL_TYPE_MAPPING.get(value, value))
+        self._add(has_title & ~types.isin(VALID_TYPES), 'type',
+                  '无法识别的题型（支持: ' + '/'.join(list(EXCEL_TYPE_MAPPING) + list(VALID_TYPES)) + '）')
+
+        difficulty = self._field('difficulty')
+        self._add(has_title & difficulty.notna() & ~difficulty.isin(VALID_DIFFICULTIES), 'difficulty',
+                  '难度必须是 ' + '/'.join(VALID_DIFFICULTIES))
+
+        points_raw = self._field('points')
+        points = pd.to_numeric(points_raw, errors='coerce')
+        self._add(has_title & points_raw.notna() & (points.isna() | (points <= 0) | (points % 1 != 0)),
+                  'points', '分值必须是正整数')
+
+        # 选择题：至少两个选项，答案由已填写选项的字母组成
+        is_choice = has_title & (types == 'choice')
+        option_present = pd.DataFrame({key: self._field(f'option_{key}').notna() for key in OPTION_KEYS})
+        self._add(is_choice & (option_present.sum(axis=1) < 2), 'option_A', '选择题至少需要两个选项')
+
+        choice_answer = answer.str.upper().str.replace(r'[\s,，、;；]', '', regex=True)
+        self._add(is_choice & answer.isna(), 'answer', '选择题缺少答案')
+        self._add(is_choice & answer.notna() & ~choice_answer.str.fullmatch(r'[A-F]+').fillna(False),
+                  'answer', '选择题答案必须是选项字母（A-F）')
+        for key in OPTION_KEYS:
+            self._add(is_choice & choice_answer.str.contains(key, regex=False) & ~option_present[key],
+                      'answer', f'答案包含选项{key}，但选项{key}为空')
+
+        is_true_false = has_title & (types == 'true_false')
+        self._add(is_true_false & ~answer.isin(TRUE_FALSE_ANSWERS), 'answer',
+                  '判断题答案必须是 ' + '/'.join(sorted(TRUE_FALSE_ANSWERS)))
+
+        return self._report(types=types.where(has_title))
+
+    def _report(self, types, fatal: Optional[str] = None) -> Dict[str, Any]:
+        pd = self.pd
+        data_rows = ~self.blank_rows
+        invalid = pd.Series(False, index=self.cells.index)
+
+        errors = []
+        for mask, column, message in self.error_masks:
+            invalid |= mask
+            for index in mask[mask].index:
+                errors.append({'row': int(index) + FIRST_DATA_ROW, 'column': column, 'message': message})
+        errors.sort(key=lambda error: error['row'])
+
+        if fatal:
+            errors.insert(0, {'row': 1, 'column': None, 'message': fatal})
+
+        total_rows = int(data_rows.sum())
+        invalid_rows = total_rows if fatal else int((invalid & data_rows).sum())
+        type_counts = {}
+        if types is not None:
+            type_counts = {str(key): int(value) for key, value in types[data_rows & ~invalid].value_counts().items()}
+
+        return {
+            'file_type': 'xlsx',
+            'valid': not errors,
+            'total_rows': total_rows,
+            'valid_rows': total_rows - invalid_rows,
+            'invalid_rows': invalid_rows,
+            'error_count': len(errors),
+            'type_counts': type_counts,
+            'columns': {field: [str(header) for header in matched] for field, matched in self.columns.items()},
+            'unrecognized_columns': self.unrecognized_columns,
+            'errors': errors[:self.max_errors],
+            'errors_truncated': len(errors) > self.max_errors
+        }
@@ -0,0 +1,214 @@
+"""
+数据库连接池配置和监控
+
+连接池参数按 DB_POOL_PROFILE 从 app/config/optimization.py 的环境配置中选取，
+DB_POOL_SIZE / DB_MAX_OVERFLOW / DB_POOL_TIMEOUT 可单独覆盖。
+
+连接池使用 MonitoredQueuePool，记录取连接的等待时间分布、超时次数，
+池满（已取出的连接达到 pool_size + max_overflow）和取连接超时时记录日志
+"""
+import bisect
+import logging
+import threading
+import time
+from typing import Dict, Optional
+
+from sqlalchemy import exc as sa_exc
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import QueuePool
+
+logger = logging.getLogger(__name__)
+
+# 从环境配置中取用的连接池参数
+POOL_OPTION_KEYS = ('pool_size', 'max_overflow', 'pool_timeout', 'pool_recycle', 'pool_pre_ping')
+
+# 可单独覆盖的参数: 配置项 -> 引擎参数
+POOL_OVERRIDES = {
+    'DB_POOL_SIZE': 'pool_size',
+    'DB_MAX_OVERFLOW': 'max_overflow',
+    'DB_POOL_TIMEOUT': 'pool_timeout',
+}
+
+# 等待时间直方图的桶上限（秒）
+WAIT_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0, 30.0)
+
+
+def pool_profiles() -> Dict[str, type]:
+    from app.config.optimization import (
+        DevelopmentOptimizationConfig, ProductionOptimizationConfig, TestingOptimizationConfig
+    )
+    return {
+        'development': DevelopmentOptimizationConfig,
+        'production': ProductionOptimizationConfig,
+        'testing': TestingOptimizationConfig,
+    }
+
+
+def _uses_queue_pool(url) -> bool:
+    """内存SQLite由Flask-SQLAlchemy固定使用StaticPool，不支持连接池参数"""
+    return not (url.get_backend_name() == 'sqlite' and url.database in (None, '', ':memory:'))
+
+
+def configure_engine_options(app):
+    """
+    合并连接池环境配置、单独覆盖的参数和监控连接池类到 SQLALCHEMY_ENGINE_OPTIONS，需在 db.init_app 之前调用
+
+    只取环境配置中的连接池参数；connect_args 是 PyMySQL 的参数，只用于MySQL
+    """
+    options = dict(app.config.get('SQLALCHEMY_ENGINE_OPTIONS') or {})
+    url = make_url(app.config['SQLALCHEMY_DATABASE_URI'])
+
+    profile_name = app.config.get('DB_POOL_PROFILE')
+    if profile_name:
+        profiles = pool_profiles()
+        if profile_name not in profiles:
+            raise ValueError(f'未知的连接池配置 DB_POOL_PROFILE={profile_name}，可选: {", ".join(profiles)}')
+        profile = profiles[profile_name].SQLALCHEMY_ENGINE_OPTIONS
+        options.update({key: profile[key] for key in POOL_OPTION_KEYS if key in profile})
+        if url.get_backend_name() == 'mysql' and 'connect_args' in profile:
+            options['connect_args'] = {**profile['connect_args'], **options.get('connect_args', {})}
+
+    for config_key, option in POOL_OVERRIDES.items():
+        if app.config.get(config_key) is not None:
+            options[option] = app.config[config_key]
+
+    if _uses_queue_pool(url):
+        options.setdefault('poolclass', MonitoredQueuePool)
+    else:
+        for key in ('pool_size', 'max_overflow', 'pool_timeout'):
+            options.pop(key, None)
+
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = options
+
+
+class PoolMetrics:
+    """单个连接池的取连接统计"""
+
+    def __init__(self, name: str = 'default'):
+        self.name = name
+        self.saturation_log_seconds = 60
+        self._lock = threading.Lock()
+        self._buckets = [0] * (len(WAIT_BUCKETS) + 1)
+        self.checkouts = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+        self.timeouts = 0
+        self.saturations = 0
+        self._last_saturation_log = 0.0
+
+    def record_wait(self, seconds: float):
+        with self._lock:
+            self._buckets[bisect.bisect_left(WAIT_BUCKETS, seconds)] += 1
+            self.checkouts += 1
+            self.wait_seconds_total += seconds
+            self.wait_seconds_max = max(self.wait_seconds_max, seconds)
+
+    def record_timeout(self):
+        with self._lock:
+            self.timeouts += 1
+
+    def record_saturation(self) -> bool:
+        """记录一次池满，返回是否需要记录日志（每 saturation_log_seconds 秒最多一次）"""
+        now = time.monotonic()
+        with self._lock:
+            self.saturations += 1
+            if now - self._last_saturation_log < self.saturation_log_seconds:
+                return False
+            self._last_saturation_log = now
+            return True
+
+    def histogram(self) -> Dict[str, int]:
+        """累计直方图: 桶上限 -> 等待时间不超过该值的取连接次数"""
+        with self._lock:
+            counts = list(self._buckets)
+        histogram = {}
+        total = 0
+        for bound, count in zip(WAIT_BUCKETS + (None,), counts):
+            total += count
+            histogram['+Inf' if bound is None else f'{bound:g}'] = total
+        return histogram
+
+    def to_dict(self):
+        return {
+            'checkouts': self.checkouts,
+            'wait_seconds_total': round(self.wait_seconds_total, 6),
+            'wait_seconds_max': round(self.wait_seconds_max, 6),
+            'wait_histogram': self.histogram(),
+            'timeouts': self.timeouts,
+            'saturations': self.saturations
+        }
+
+
+class MonitoredQueuePool(QueuePool):
+    """记录取连接等待时间、超时和池满的 QueuePool（等待时间包括新建连接的耗时）"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.metrics = PoolMetrics()
+
+    def recreate(self):
+        # engine.dispose() 会新建连接池，统计沿用
+        pool = super().recreate()
+        pool.metrics = self.metrics
+        return pool
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except sa_exc.TimeoutError:
+            self.metrics.record_wait(time.perf_counter() - start)
+            self.metrics.record_timeout()
+            logger.error(
+                f"Database pool '{self.metrics.name}' checkout timed out after {self._timeout}s: "
+                f"{self.status()}"
+            )
+            raise
+        self.metrics.record_wait(time.perf_counter() - start)
+        if self._max_overflow >= 0 and self.checkedout() >= self.size() + self._max_overflow:
+            if self.metrics.record_saturation():
+                logger.warning(
+                    f"Database pool '{self.metrics.name}' saturated: {self.status()}; "
+                    f"further checkouts wait up to {self._timeout}s"
+                )
+        return connection
+
+
+# 绑定名 -> 引擎
+_engines: Dict[str, object] = {}
+
+
+def init_pool_metrics(app):
+    """登记各数据库引擎的连接池统计，需在 db.init_app 之后调用"""
+    from app import db
+
+    with app.app_context():
+        for key, engine in db.engines.items():
+            name = key or 'default'
+            _engines[name] = engine
+            metrics: Optional[PoolMetrics] = getattr(engine.pool, 'metrics', None)
+            if metrics is not None:
+                metrics.name = name
+                metrics.saturation_log_seconds = app.config.get('DB_POOL_SATURATION_LOG_SECONDS', 60)
+
+
+def pool_stats() -> Dict[str, dict]:
+    """各连接池的当前状态和取连接统计"""
+    stats = {}
+    for name, engine in _engines.items():
+        pool = engine.pool
+        entry = {'pool_class': type(pool).__name__}
+        if isinstance(pool, QueuePool):
+            entry.update({
+                'size': pool.size(),
+                'max_overflow': pool._max_overflow,
+                'timeout': pool._timeout,
+                'checked_in': pool.checkedin(),
+                'checked_out': pool.checkedout(),
+                'overflow': max(pool.overflow(), 0),
+            })
+        metrics = getattr(pool, 'metrics', None)
+        if metrics is not None:
+            entry.update(metrics.to_dict())
+        stats[name] = entry
+    return stats
@@ -0,0 +1,288 @@
+"""
+读写分离
+配置 SQLALCHEMY_REPLICA_URIS 后，只读请求（GET/HEAD）中的 SELECT 路由到只读副本，其他请求、写入和刷新走主库：
+
+- 会话内发生写入后，本请求后续的查询都走主库
+- 用户提交写入后的 READ_YOUR_WRITES_SECONDS 内，该用户的请求都走主库（标记保存在响应缓存后端中，
+  CACHE_BACKEND 为 redis 时对所有进程生效）
+- 副本复制延迟超过 REPLICA_MAX_LAG_SECONDS 或无法连接时回退到主库，每 REPLICA_LAG_CHECK_SECONDS 重新检查
+
+请求之外（报表、导出任务、CLI）默认走主库，可用 use_replica() 显式指定；
+必须读到最新数据的代码段用 use_primary()
+"""
+import random
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Optional
+
+from flask import current_app, g, has_request_context, request
+from flask_jwt_extended import get_jwt, verify_jwt_in_request
+from flask_sqlalchemy.session import Session as FlaskSession
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+# 副本在 SQLALCHEMY_BINDS 中的键前缀
+REPLICA_BIND_PREFIX = 'replica_'
+
+# 可以读副本的请求方法
+READ_METHODS = ('GET', 'HEAD')
+
+# 进程内读己之写标记的数量上限，超出时清理已过期的
+MAX_LOCAL_WRITERS = 10000
+
+# 会话中已发生写入的标记
+SESSION_WROTE_KEY = 'db_routing_wrote'
+SESSION_REPLICA_KEY = 'db_routing_replica'
+
+_route_override: ContextVar[Optional[str]] = ContextVar('db_route_override', default=None)
+
+
+@contextmanager
+def use_primary():
+    """代码段内的查询都走主库"""
+    token = _route_override.set('primary')
+    try:
+        yield
+    finally:
+        _route_override.reset(token)
+
+
+@contextmanager
+def use_replica():
+    """代码段内的只读查询走副本（副本不可用时仍回退到主库）"""
+    token = _route_override.set('replica')
+    try:
+        yield
+    finally:
+        _route_override.reset(token)
+
+
+def init_db_routing(app):
+    """把 SQLALCHEMY_REPLICA_URIS 注册为 SQLALCHEMY_BINDS 中的副本，需在 db.init_app 之前调用"""
+    uris = app.config.get('SQLALCHEMY_REPLICA_URIS') or []
+    if isinstance(uris, str):
+        uris = [uri.strip() for uri in uris.split(',') if uri.strip()]
+    if not uris:
+        return
+    binds = dict(app.config.get('SQLALCHEMY_BINDS') or {})
+    binds.update({f'{REPLICA_BIND_PREFIX}{index}': uri for index, uri in enumerate(uris)})
+    app.config['SQLALCHEMY_BINDS'] = binds
+
+
+def replica_lag(connection) -> Optional[float]:
+    """
+    副本的复制延迟（秒），复制中断时返回None
+
+    非MySQL（如本地测试用的SQLite文件）和未配置复制的MySQL实例视为无延迟
+    """
+    if connection.dialect.name != 'mysql':
+        return 0.0
+    error = None
+    for statement in ('SHOW REPLICA STATUS', 'SHOW SLAVE STATUS'):
+        try:
+            row = connection.exec_driver_sql(statement).mappings().first()
+        except Exception as e:
+            error = e
+            continue
+        if row is None:
+            return 0.0
+        lag = row.get('Seconds_Behind_Source', row.get('Seconds_Behind_Master'))
+        return None if lag is None else float(lag)
+    raise error
+
+
+class ReplicaRouter:
+    """副本健康状态（按间隔检查复制延迟）和路由计数"""
+
+    def __init__(self):
+        self._health: Dict[str, tuple] = {}  # 键 -> (是否可用, 延迟, 检查时间)
+        self._lock = threading.Lock()
+        self.counters = {'primary': 0, 'replica': 0, 'fallback': 0}
+
+    @staticmethod
+    def replica_keys(engines) -> list:
+        return [key for key in engines if isinstance(key, str) and key.startswith(REPLICA_BIND_PREFIX)]
+
+    def _check(self, key: str, engine) -> bool:
+        config = current_app.config
+        try:
+            with engine.connect() as connection:
+                lag = replica_lag(connection)
+        except Exception as e:
+            current_app.logger.warning(f"Replica {key} unavailable, reading from primary: {e}")
+            lag = None
+        healthy = lag is not None and lag <= config.get('REPLICA_MAX_LAG_SECONDS', 5)
+        if not healthy and lag is not None:
+            current_app.logger.warning(f"Replica {key} is {lag:.0f}s behind, reading from primary")
+        self._health[key] = (healthy, lag, time.monotonic())
+        return healthy
+
+    def is_healthy(self, key: str, engine) -> bool:
+        interval = current_app.config.get('REPLICA_LAG_CHECK_SECONDS', 5)
+        state = self._health.get(key)
+        if state is not None and time.monotonic() - state[2] < interval:
+            return state[0]
+        # 只由一个线程检查，其他线程使用上次的结果（首次检查前视为不可用）
+        if not self._lock.acquire(blocking=False):
+            return state[0] if state is not None else False
+        try:
+            return self._check(key, engine)
+        finally:
+            self._lock.release()
+
+    def choose(self, engines) -> Optional[str]:
+        """随机选择一个可用的副本"""
+        keys = self.replica_keys(engines)
+        random.shuffle(keys)
+        return next((key for key in keys if self.is_healthy(key, engines[key])), None)
+
+    def count(self, route: str):
+        self.counters[route] += 1
+
+    def stats(self) -> dict:
+        return {
+            'routes': dict(self.counters),
+            'replicas': {
+                key: {'healthy': healthy, 'lag_seconds': lag}
+                for key, (healthy, lag, _) in self._health.items()
+            }
+        }
+
+
+replica_router = ReplicaRouter()
+
+
+# 读己之写
+
+_recent_writers: Dict[str, float] = {}
+
+
+def _writer_key(subject: str) -> str:
+    return f'ryw:{subject}'
+
+
+def _shared_cache():
+    from app.utils.response_cache import cache
+    if cache is None or current_app.config.get('CACHE_BACKEND') == 'null':
+        return None
+    return cache
+
+
+def _verified_subject() -> Optional[str]:
+    """本请求已验证的JWT中的用户ID，尚未验证时为None（不查询数据库）"""
+    try:
+        return (get_jwt() or {}).get('sub')
+    except RuntimeError:
+        return None
+
+
+def _request_subject() -> Optional[str]:
+    """当前请求的用户ID（JWT sub），必要时验证请求中的JWT；匿名时为None"""
+    if '_db_routing_subject' not in g:
+        g._db_routing_subject = _verified_subject()
+        if g._db_routing_subject is None:
+            try:
+                verify_jwt_in_request(optional=True)
+                g._db_routing_subject = _verified_subject()
+            except Exception:
+                pass
+    return g._db_routing_subject
+
+
+def remember_writer(subject: str):
+    """记录用户刚提交过写入，窗口期内该用户的读请求走主库"""
+    window = current_app.config.get('READ_YOUR_WRITES_SECONDS', 5)
+    if window <= 0:
+        return
+    shared = _shared_cache()
+    if shared is not None:
+        try:
+            shared.set(_writer_key(subject), 1, timeout=window)
+            return
+        except Exception as e:
+            current_app.logger.warning(f"Failed to record read-your-writes window: {e}")
+    now = time.monotonic()
+    if len(_recent_writers) >= MAX_LOCAL_WRITERS:
+        for expired in [key for key, until in _recent_writers.items() if until <= now]:
+            _recent_writers.pop(expired, None)
+    _recent_writers[subject] = now + window
+
+
+def is_recent_writer(subject: str) -> bool:
+    shared = _shared_cache()
+    if shared is not None:
+        try:
+            return shared.get(_writer_key(subject)) is not None
+        except Exception:
+            pass
+    return _recent_writers.get(subject, 0) > time.monotonic()
+
+
+def _request_reads_primary() -> bool:
+    """当前请求是否必须读主库（非只读方法，或用户在读己之写窗口内）"""
+    if request.method not in READ_METHODS:
+        return True
+    if '_db_routing_primary' not in g:
+        g._db_routing_primary = True  # 验证JWT期间的查询走主库
+        subject = _request_subject()
+        g._db_routing_primary = subject is not None and is_recent_writer(subject)
+    return g._db_routing_primary
+
+
+class RoutingSession(FlaskSession):
+    """按请求类型、会话写入状态和副本健康状态在主库和副本之间选择连接"""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        engine = super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+        engines = self._db.engines
+        # 显式绑定或使用其他 bind_key 的模型不参与路由
+        if bind is not None or engine is not engines.get(None) or not replica_router.replica_keys(engines):
+            return engine
+
+        if not self._wants_replica(clause):
+            replica_router.count('primary')
+            return engine
+
+        # 同一会话（请求）内固定使用同一个副本，查询结果相互一致
+        key = self.info.get(SESSION_REPLICA_KEY)
+        if key is None:
+            key = replica_router.choose(engines)
+            if key is None:
+                replica_router.count('fallback')
+                return engine
+            self.info[SESSION_REPLICA_KEY] = key
+        replica_router.count('replica')
+        return engines[key]
+
+    def _wants_replica(self, clause) -> bool:
+        override = _route_override.get()
+        if override == 'primary' or self._flushing or self.info.get(SESSION_WROTE_KEY):
+            return False
+        if clause is None or not getattr(clause, 'is_select', False):
+            return False
+        if override == 'replica':
+            return True
+        return has_request_context() and not _request_reads_primary()
+
+
+@event.listens_for(Session, 'after_flush')
+def _mark_session_wrote(session, flush_context):
+    session.info[SESSION_WROTE_KEY] = True
+
+
+@event.listens_for(Session, 'do_orm_execute')
+def _mark_bulk_write(orm_execute_state):
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        orm_execute_state.session.info[SESSION_WROTE_KEY] = True
+
+
+@event.listens_for(Session, 'after_commit')
+def _remember_committed_writer(session):
+    if not session.info.get(SESSION_WROTE_KEY) or not has_request_context():
+        return
+    # 提交后的会话不能再执行SQL，只使用已验证的JWT
+    subject = _verified_subject()
+    if subject is not None:
+        remember_writer(subject)
@@ -4,17 +4,18 @@
 from functools import wraps
 from flask import current_app, request
 from flask_jwt_extended import jwt_required, get_jwt_identity, get_jwt, verify_jwt_in_request
-from app.models import User
+from app.utils.identity import current_identity, get_auth_identity
+from app.utils.rate_limit import check_rate_limit
+from app.utils.tenants import get_tenant, tenant_disabled, tenant_feature_enabled
 
 def admin_required(f):
     """管理员权限装饰器"""
     @wraps(f)
     @jwt_required()
     def decorated_function(*args, **kwargs):
-        current_user_id = get_jwt_identity()
-        user = User.query.get(current_user_id)
+        identity = current_identity()
         
-        if not user or not user.is_admin():
+        if not identity or not identity.is_admin():
             return {'message': '需要管理员权限'}, 403
         
         return f(*args, **kwargs)
@@ -25,31 +26,46 @@ def tenant_required(f):
     @wraps(f)
     @jwt_required()
     def decorated_function(*args, **kwargs):
-        current_user_id = get_jwt_identity()
-        user = User.query.get(current_user_id)
+        user = current_identity()
         
         if not user:
             return {'message': '用户不存在'}, 404
+
+        # 租户信息来自进程内的租户注册表，不查询数据库
+        if tenant_disabled(user.tenant_id):
+            return {'message': '租户已被停用'}, 403
         
-        # 将当前用户的租户ID添加到请求上下文
+        # 将当前用户的身份和租户ID添加到请求上下文
         request.current_tenant_id = user.tenant_id
+        request.current_tenant = get_tenant(user.tenant_id)
         request.current_user = user
         
         return f(*args, **kwargs)
     return decorated_function
 
+def tenant_feature_required(feature, default=False):
+    """租户功能开关装饰器 - 当前用户所在租户的 settings.features 未开启该功能时返回403"""
+    def decorator(f):
+        @wraps(f)
+        @tenant_required
+        def decorated_function(*args, **kwargs):
+            if not tenant_feature_enabled(request.current_tenant_id, feature, default):
+                return {'message': '当前租户未开启该功能'}, 403
+            return f(*args, **kwargs)
+        return decorated_function
+    return decorator
+
 def active_user_required(f):
     """活跃用户装饰器 - 确保用户账户处于活跃状态"""
     @wraps(f)
     @jwt_required()
     def decorated_function(*args, **kwargs):
-        current_user_id = get_jwt_identity()
-        user = User.query.get(current_user_id)
+        identity = get_auth_identity(get_jwt_identity())
         
-        if not user:
+        if not identity:
             return {'message': '用户不存在'}, 404
         
-        if not user.is_active:
+        if not identity.is_active:
             return {'message': '账户已被禁用'}, 403
         
         return f(*args, **kwargs)
@@ -61,13 +77,12 @@ def role_required(*roles):
         @wraps(f)
         @jwt_required()
         def decorated_function(*args, **kwargs):
-            current_user_id = get_jwt_identity()
-            user = User.query.get(current_user_id)
+            identity = current_identity()
             
-            if not user:
+            if not identity:
                 return {'message': '用户不存在'}, 404
             
-            if user.role not in roles:
+            if identity.role not in roles:
                 return {'message': f'需要以下角色之一: {", ".join(roles)}'}, 403
             
             return f(*args, **kwargs)
@@ -80,25 +95,29 @@ def optional_jwt(f):
     def decorated_function(*args, **kwargs):
         try:
             verify_jwt_in_request(optional=True)
-            current_user_id = get_jwt_identity()
-            if current_user_id:
-                user = User.query.get(current_user_id)
-                request.current_user = user
-            else:
-                request.current_user = None
+            request.current_user = current_identity()
         except Exception:
             request.current_user = None
         
         return f(*args, **kwargs)
     return decorated_function
 
-def rate_limit(max_requests=100, window=3600):
-    """简单的速率限制装饰器"""
+def rate_limit(max_requests=100, window=3600, scope=None, config_key=None):
+    """
+    速率限制装饰器，超出限额返回429并带 Retry-After 头
+
+    config_key 指定的配置项（如 "5 per minute"）优先于 max_requests/window；
+    同一 scope 的接口共享额度，默认每个接口单独计数。放在 jwt_required 之后以便按用户计数
+    """
     def decorator(f):
+        limit_scope = scope or f.__qualname__
+
         @wraps(f)
         def decorated_function(*args, **kwargs):
-            # 这里可以实现基于Redis的速率限制
-            # 暂时跳过实现
+            rate = current_app.config.get(config_key) if config_key else None
+            limited = check_rate_limit(limit_scope, rate or (max_requests, window))
+            if limited:
+                return limited
             return f(*args, **kwargs)
         return decorated_function
     return decorator
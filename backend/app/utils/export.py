@@ -1,11 +1,15 @@
 """
 题库导出工具
-支持多种格式导出：JSON, Markdown, DOCX, PDF, XLSX
+支持多种格式导出：JSON, Markdown, DOCX, PDF, XLSX, Parquet
+JSON和JSON Lines的流式导出见 export_stream
 """
 import io
 import json
+import os
+import platform
+import threading
 from datetime import datetime
-from typing import Dict, List, Any
+from typing import Any, Callable, Dict, Iterable, List, Optional
 
 try:
     from docx import Document
@@ -29,11 +33,149 @@ except ImportError:
 
 try:
     from openpyxl import Workbook
+    from openpyxl.cell import WriteOnlyCell
     from openpyxl.styles import Font, Alignment, PatternFill
     XLSX_AVAILABLE = True
 except ImportError:
     XLSX_AVAILABLE = False
 
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    PARQUET_AVAILABLE = True
+except ImportError:
+    PARQUET_AVAILABLE = False
+
+# PDF中文字体名称；找不到中文字体时退回reportlab内置字体
+PDF_FONT_NAME = 'SimSun'
+PDF_FALLBACK_FONT_NAME = 'Helvetica'
+
+# 常见的中文字体路径，按优先级排列
+CJK_FONT_PATHS = {
+    'Windows': [
+        "C:/Windows/Fonts/simsun.ttc",
+        "C:/Windows/Fonts/simhei.ttf",
+        "C:/Windows/Fonts/msyh.ttc"
+    ],
+    'Darwin': [
+        "/System/Library/Fonts/PingFang.ttc",
+        "/System/Library/Fonts/STHeiti Light.ttc",
+        "/Library/Fonts/Arial Unicode MS.ttf"
+    ],
+    'Linux': [
+        "/usr/share/fonts/truetype/wqy/wqy-microhei.ttc",
+        "/usr/share/fonts/truetype/wqy/wqy-zenhei.ttc",
+        "/usr/share/fonts/opentype/noto/NotoSansCJK-Regular.ttc",
+        "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf",
+        "/usr/share/fonts/truetype/liberation/LiberationSans-Regular.ttf"
+    ]
+}
+
+# 题目类型显示名称
+QUESTION_TYPE_TEXT = {
+    'choice': '选择题',
+    'true_false': '判断题',
+    'qa': '问答题',
+    'math': '数学题',
+    'programming': '编程题',
+    'fill_blank': '填空题'
+}
+
+# Excel题目列表的表头和列宽
+XLSX_QUESTION_HEADERS = ['序号', '类型', '题目', '答案', '解析', '难度', '分值']
+XLSX_QUESTION_COLUMN_WIDTHS = {'A': 8, 'B': 12, 'C': 50, 'D': 30, 'E': 40, 'F': 10, 'G': 8}
+
+
+def register_chinese_fonts() -> str:
+    """注册第一个可用的中文字体，返回PDF中使用的字体名称"""
+    if PDF_FONT_NAME in pdfmetrics.getRegisteredFontNames():
+        return PDF_FONT_NAME
+
+    font_paths = CJK_FONT_PATHS.get(platform.system(), CJK_FONT_PATHS['Linux'])
+    for font_path in font_paths:
+        if os.path.exists(font_path):
+            try:
+                pdfmetrics.registerFont(TTFont(PDF_FONT_NAME, font_path))
+                # 注册字体族
+                addMapping(PDF_FONT_NAME, 0, 0, PDF_FONT_NAME)  # normal
+                addMapping(PDF_FONT_NAME, 1, 0, PDF_FONT_NAME)  # bold
+                addMapping(PDF_FONT_NAME, 0, 1, PDF_FONT_NAME)  # italic
+                addMapping(PDF_FONT_NAME, 1, 1, PDF_FONT_NAME)  # bold-italic
+                return PDF_FONT_NAME
+            except Exception:
+                continue
+
+    # 没有找到中文字体时使用内置字体，中文可能显示为方块，但不会报错
+    return PDF_FALLBACK_FONT_NAME
+
+
+class PdfRenderContext:
+    """进程级PDF渲染上下文
+
+    注册中文TTC字体需要解析整个字体文件，是小题库PDF导出的主要开销；
+    字体、段落样式和表格样式在每个进程中只初始化一次，之后所有导出共享。
+    """
+
+    _instance = None
+    _lock = threading.Lock()
+
+    def __init__(self):
+        if not PDF_AVAILABLE:
+            raise ImportError("reportlab 库未安装，无法导出PDF格式")
+
+        self.font_name = register_chinese_fonts()
+
+        styles = getSampleStyleSheet()
+        self.title_style = ParagraphStyle(
+            'ChineseTitle',
+            parent=styles['Heading1'],
+            fontName=self.font_name,
+            fontSize=18,
+            spaceAfter=30,
+            alignment=1  # 居中
+        )
+        self.heading_style = ParagraphStyle(
+            'ChineseHeading',
+            parent=styles['Heading2'],
+            fontName=self.font_name,
+            fontSize=14,
+            spaceAfter=6
+        )
+        self.normal_style = ParagraphStyle(
+            'ChineseNormal',
+            parent=styles['Normal'],
+            fontName=self.font_name,
+            fontSize=10,
+            leading=14
+        )
+        self.info_table_style = TableStyle([
+            ('BACKGROUND', (0, 0), (-1, -1), colors.lightgrey),
+            ('TEXTCOLOR', (0, 0), (-1, -1), colors.black),
+            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+            ('FONTNAME', (0, 0), (-1, -1), self.font_name),
+            ('FONTSIZE', (0, 0), (-1, -1), 10),
+            ('BOTTOMPADDING', (0, 0), (-1, -1), 12),
+            ('BACKGROUND', (0, 0), (0, -1), colors.grey),
+            ('GRID', (0, 0), (-1, -1), 1, colors.black)
+        ])
+
+    @classmethod
+    def get(cls) -> 'PdfRenderContext':
+        """获取当前进程的渲染上下文，首次调用时初始化"""
+        if cls._instance is None:
+            with cls._lock:
+                if cls._instance is None:
+                    cls._instance = cls()
+        return cls._instance
+
+
+def warm_pdf_renderer() -> bool:
+    """预热PDF渲染上下文（工作进程启动时调用），reportlab不可用时返回False"""
+    if not PDF_AVAILABLE:
+        return False
+    PdfRenderContext.get()
+    return True
+
 
 class BankExporter:
     """题库导出器"""
@@ -44,61 +186,9 @@ class BankExporter:
         self.questions = bank_data.get('questions', [])
 
     def _register_chinese_fonts(self):
-        """注册中文字体"""
-        if not PDF_AVAILABLE:
-            return
-
-        try:
-            # 尝试注册系统中的中文字体
-            import os
-            import platform
-
-            # 常见的中文字体路径
-            font_paths = []
-            system = platform.system()
-
-            if system == "Windows":
-                font_paths = [
-                    "C:/Windows/Fonts/simsun.ttc",
-                    "C:/Windows/Fonts/simhei.ttf",
-                    "C:/Windows/Fonts/msyh.ttc"
-                ]
-            elif system == "Darwin":  # macOS
-                font_paths = [
-                    "/System/Library/Fonts/PingFang.ttc",
-                    "/System/Library/Fonts/STHeiti Light.ttc",
-                    "/Library/Fonts/Arial Unicode MS.ttf"
-                ]
-            else:  # Linux
-                font_paths = [
-                    "/usr/share/fonts/truetype/wqy/wqy-microhei.ttc",
-                    "/usr/share/fonts/truetype/wqy/wqy-zenhei.ttc",
-                    "/usr/share/fonts/opentype/noto/NotoSansCJK-Regular.ttc",
-                    "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf",
-                    "/usr/share/fonts/truetype/liberation/LiberationSans-Regular.ttf"
-                ]
-
-            # 尝试注册第一个可用的字体
-            for font_path in font_paths:
-                if os.path.exists(font_path):
-                    try:
-                        pdfmetrics.registerFont(TTFont('SimSun', font_path))
-                        # 注册字体族
-                        addMapping('SimSun', 0, 0, 'SimSun')  # normal
-                        addMapping('SimSun', 1, 0, 'SimSun')  # bold
-                        addMapping('SimSun', 0, 1, 'SimSun')  # italic
-                        addMapping('SimSun', 1, 1, 'SimSun')  # bold-italic
-                        return
-                    except Exception:
-                        continue
-
-            # 如果没有找到中文字体，使用默认字体
-            # 这种情况下中文可能显示为方块，但不会报错
-            pass
-
-        except Exception:
-            # 如果字体注册失败，使用默认字体
-            pass
+        """注册中文字体（进程内只注册一次）"""
+        if PDF_AVAILABLE:
+            PdfRenderContext.get()
     
     def export_json(self) -> io.BytesIO:
         """导出为JSON格式"""
@@ -134,9 +224,10 @@ class BankExporter:
             ('分类', self.bank_info.get('category') or '未分类'),
             ('难度', self.bank_info.get('difficulty') or '未设置'),
             ('题目数量', str(self.bank_info.get('question_count', 0))),
-            ('导出时间', self.bank_info.get('exported_at') or ''),
-            ('导出人', self.bank_info.get('exported_by') or '')
+            ('导出时间', self.bank_info.get('exported_at') or '')
         ]
+        if self.bank_info.get('exported_by'):
+            info_items.append(('导出人', self.bank_info['exported_by']))
 
         for key, value in info_items:
             row = info_table.add_row()
@@ -187,38 +278,14 @@ class BankExporter:
         if not PDF_AVAILABLE:
             raise ImportError("reportlab 库未安装，无法导出PDF格式")
 
-        # 注册中文字体
-        self._register_chinese_fonts()
+        # 字体、段落样式和表格样式在进程内只初始化一次
+        context = PdfRenderContext.get()
+        title_style = context.title_style
+        heading_style = context.heading_style
+        normal_style = context.normal_style
 
         buffer = io.BytesIO()
         doc = SimpleDocTemplate(buffer, pagesize=A4)
-
-        # 样式 - 使用中文字体
-        styles = getSampleStyleSheet()
-        title_style = ParagraphStyle(
-            'ChineseTitle',
-            parent=styles['Heading1'],
-            fontName='SimSun',
-            fontSize=18,
-            spaceAfter=30,
-            alignment=1  # 居中
-        )
-
-        heading_style = ParagraphStyle(
-            'ChineseHeading',
-            parent=styles['Heading2'],
-            fontName='SimSun',
-            fontSize=14,
-            spaceAfter=6
-        )
-
-        normal_style = ParagraphStyle(
-            'ChineseNormal',
-            parent=styles['Normal'],
-            fontName='SimSun',
-            fontSize=10,
-            leading=14
-        )
         
         story = []
         
@@ -232,21 +299,13 @@ class BankExporter:
             ['分类', self.bank_info.get('category', '未分类')],
             ['难度', self.bank_info.get('difficulty', '未设置')],
             ['题目数量', str(self.bank_info.get('question_count', 0))],
-            ['导出时间', self.bank_info.get('exported_at', '')],
-            ['导出人', self.bank_info.get('exported_by', '')]
+            ['导出时间', self.bank_info.get('exported_at', '')]
         ]
+        if self.bank_info.get('exported_by'):
+            info_data.append(['导出人', self.bank_info['exported_by']])
         
         info_table = Table(info_data, colWidths=[2*inch, 4*inch])
-        info_table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (-1, -1), colors.lightgrey),
-            ('TEXTCOLOR', (0, 0), (-1, -1), colors.black),
-            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-            ('FONTNAME', (0, 0), (-1, -1), 'SimSun'),
-            ('FONTSIZE', (0, 0), (-1, -1), 10),
-            ('BOTTOMPADDING', (0, 0), (-1, -1), 12),
-            ('BACKGROUND', (0, 0), (0, -1), colors.grey),
-            ('GRID', (0, 0), (-1, -1), 1, colors.black)
-        ]))
+        info_table.setStyle(context.info_table_style)
         
         story.append(info_table)
         story.append(Spacer(1, 20))
@@ -288,72 +347,15 @@ class BankExporter:
     
     def export_xlsx(self) -> io.BytesIO:
         """导出为XLSX格式"""
-        if not XLSX_AVAILABLE:
-            raise ImportError("openpyxl 库未安装，无法导出XLSX格式")
-        
-        wb = Workbook()
-        
-        # 题库信息工作表
-        info_ws = wb.active
-        info_ws.title = "题库信息"
-        
-        # 设置标题样式
-        title_font = Font(size=16, bold=True)
-        header_font = Font(bold=True)
-        header_fill = PatternFill(start_color="CCCCCC", end_color="CCCCCC", fill_type="solid")
-        
-        # 题库信息
-        info_ws['A1'] = self.bank_info.get('name', '题库')
-        info_ws['A1'].font = title_font
-        info_ws.merge_cells('A1:B1')
-        
-        info_data = [
-            ('描述', self.bank_info.get('description', '无')),
-            ('分类', self.bank_info.get('category', '未分类')),
-            ('难度', self.bank_info.get('difficulty', '未设置')),
-            ('题目数量', str(self.bank_info.get('question_count', 0))),
-            ('导出时间', self.bank_info.get('exported_at', '')),
-            ('导出人', self.bank_info.get('exported_by', ''))
-        ]
-        
-        for i, (key, value) in enumerate(info_data, 3):
-            info_ws[f'A{i}'] = key
-            info_ws[f'B{i}'] = value
-            info_ws[f'A{i}'].font = header_font
-            info_ws[f'A{i}'].fill = header_fill
-        
-        # 题目列表工作表
-        questions_ws = wb.create_sheet("题目列表")
-        
-        # 表头
-        headers = ['序号', '类型', '题目', '答案', '解析', '难度', '分值']
-        for i, header in enumerate(headers, 1):
-            cell = questions_ws.cell(row=1, column=i, value=header)
-            cell.font = header_font
-            cell.fill = header_fill
-        
-        # 题目数据
-        for i, question in enumerate(self.questions, 2):
-            questions_ws.cell(row=i, column=1, value=i-1)  # 序号
-            questions_ws.cell(row=i, column=2, value=self._get_type_text(question['type']))  # 类型
-            questions_ws.cell(row=i, column=3, value=self._format_question_content_for_excel(question))  # 题目
-            questions_ws.cell(row=i, column=4, value=self._format_answer_text(question))  # 答案
-            questions_ws.cell(row=i, column=5, value=question.get('explanation', ''))  # 解析
-            questions_ws.cell(row=i, column=6, value=question.get('difficulty', '未设置'))  # 难度
-            questions_ws.cell(row=i, column=7, value=question.get('points', 1))  # 分值
-        
-        # 调整列宽
-        questions_ws.column_dimensions['A'].width = 8
-        questions_ws.column_dimensions['B'].width = 12
-        questions_ws.column_dimensions['C'].width = 50
-        questions_ws.column_dimensions['D'].width = 30
-        questions_ws.column_dimensions['E'].width = 40
-        questions_ws.column_dimensions['F'].width = 10
-        questions_ws.column_dimensions['G'].width = 8
-        
-        # 保存到内存
         buffer = io.BytesIO()
-        wb.save(buffer)
+        write_xlsx(self.bank_info, self.questions, buffer)
+        buffer.seek(0)
+        return buffer
+
+    def export_parquet(self) -> io.BytesIO:
+        """导出为Parquet格式"""
+        buffer = io.BytesIO()
+        write_questions_parquet(self.bank_info, self.questions, buffer)
         buffer.seek(0)
         return buffer
     
@@ -373,7 +375,8 @@ class BankExporter:
         md_lines.append(f"**难度**: {self.bank_info.get('difficulty', '未设置')}")
         md_lines.append(f"**题目数量**: {self.bank_info.get('question_count', 0)}")
         md_lines.append(f"**导出时间**: {self.bank_info.get('exported_at', '')}")
-        md_lines.append(f"**导出人**: {self.bank_info.get('exported_by', '')}")
+        if self.bank_info.get('exported_by'):
+            md_lines.append(f"**导出人**: {self.bank_info['exported_by']}")
         md_lines.append("")
         md_lines.append("---")
         md_lines.append("")
@@ -411,37 +414,11 @@ class BankExporter:
 
     def _get_type_text(self, question_type: str) -> str:
         """获取题目类型文本"""
-        type_map = {
-            'choice': '选择题',
-            'true_false': '判断题',
-            'qa': '问答题',
-            'math': '数学题',
-            'programming': '编程题',
-            'fill_blank': '填空题'
-        }
-        return type_map.get(question_type, question_type)
+        return QUESTION_TYPE_TEXT.get(question_type, question_type)
 
     def _format_answer_text(self, question: Dict[str, Any]) -> str:
         """格式化答案文本"""
-        answer = question.get('answer')
-        if not answer:
-            return '无'
-
-        question_type = question.get('type')
-
-        if question_type == 'choice':
-            if isinstance(answer, dict):
-                if answer.get('correct_options'):
-                    return f"正确选项: {', '.join(answer['correct_options'])}"
-                elif answer.get('correct_option'):
-                    return f"正确选项: {answer['correct_option']}"
-        elif question_type == 'true_false':
-            if isinstance(answer, dict) and 'answer' in answer:
-                return '正确' if answer['answer'] else '错误'
-            elif isinstance(answer, bool):
-                return '正确' if answer else '错误'
-
-        return str(answer)
+        return format_answer_text(question)
 
     def _format_question_content_for_markdown(self, question: Dict[str, Any]) -> str:
         """为Markdown格式化题目内容"""
@@ -482,41 +459,7 @@ class BankExporter:
 
     def _format_question_content_for_excel(self, question: Dict[str, Any]) -> str:
         """为Excel格式化题目内容"""
-        content = question.get('content', '')
-        question_type = question.get('type')
-
-        if question_type == 'choice':
-            if isinstance(content, dict):
-                parts = []
-                # 处理题干 - 可能在title中或content.question中
-                question_text = content.get('question') or question.get('title', '')
-                if question_text:
-                    parts.append(question_text)
-
-                options = content.get('options')
-                if options and isinstance(options, list):
-                    options_text = []
-                    for option in options:
-                        if isinstance(option, dict) and option.get('key') and option.get('text'):
-                            options_text.append(f"{option['key']}.{option['text']}")
-                    if options_text:
-                        parts.append(" | ".join(options_text))
-
-                return " | ".join(parts) if parts else question.get('title', '无题目内容')
-
-        elif question_type == 'true_false':
-            if isinstance(content, dict) and content.get('question'):
-                return content['question']
-            elif isinstance(content, str):
-                return content
-
-        else:
-            if isinstance(content, dict) and content.get('question'):
-                return content['question']
-            elif isinstance(content, str):
-                return content
-
-        return str(content) if content else "无题目内容"
+        return format_excel_content(question)
 
     def _format_question_content_for_pdf(self, question: Dict[str, Any]) -> str:
         """为PDF格式化题目内容"""
@@ -603,9 +546,228 @@ class BankExporter:
                 p.add_run('无题目内容')
 
 
+def format_answer_text(question: Dict[str, Any]) -> str:
+    """格式化答案文本"""
+    answer = question.get('answer')
+    if not answer:
+        return '无'
+
+    question_type = question.get('type')
+
+    if question_type == 'choice':
+        if isinstance(answer, dict):
+            if answer.get('correct_options'):
+                return f"正确选项: {', '.join(answer['correct_options'])}"
+            elif answer.get('correct_option'):
+                return f"正确选项: {answer['correct_option']}"
+    elif question_type == 'true_false':
+        if isinstance(answer, dict) and 'answer' in answer:
+            return '正确' if answer['answer'] else '错误'
+        elif isinstance(answer, bool):
+            return '正确' if answer else '错误'
+
+    return str(answer)
+
+
+def _excel_choice_content(question: Dict[str, Any], content: Any) -> Optional[str]:
+    """选择题：题干与选项以 | 连接"""
+    if not isinstance(content, dict):
+        return None
+
+    parts = []
+    # 处理题干 - 可能在title中或content.question中
+    question_text = content.get('question') or question.get('title', '')
+    if question_text:
+        parts.append(question_text)
+
+    options = content.get('options')
+    if options and isinstance(options, list):
+        options_text = [
+            f"{option['key']}.{option['text']}" for option in options
+            if isinstance(option, dict) and option.get('key') and option.get('text')
+        ]
+        if options_text:
+            parts.append(" | ".join(options_text))
+
+    return " | ".join(parts) if parts else question.get('title', '无题目内容')
+
+
+def _excel_question_text(question: Dict[str, Any], content: Any) -> Optional[str]:
+    """其他题型：content.question 或字符串内容"""
+    if isinstance(content, dict) and content.get('question'):
+        return content['question']
+    elif isinstance(content, str):
+        return content
+    return None
+
+
+# 按题型分派的Excel内容格式化函数
+_EXCEL_CONTENT_FORMATTERS: Dict[str, Callable[[Dict[str, Any], Any], Optional[str]]] = {
+    'choice': _excel_choice_content
+}
+
+
+def format_excel_content(question: Dict[str, Any]) -> str:
+    """为Excel格式化题目内容"""
+    content = question.get('content', '')
+    formatter = _EXCEL_CONTENT_FORMATTERS.get(question.get('type'), _excel_question_text)
+    text = formatter(question, content)
+    if text is None:
+        return str(content) if content else "无题目内容"
+    return text
+
+
+def write_xlsx(bank_info: Dict[str, Any], questions: Iterable[Dict[str, Any]], target,
+               progress: Optional[Callable[[int], None]] = None) -> int:
+    """
+    使用openpyxl只写模式导出XLSX，题目逐行写入，不在内存中保留整张工作表
+
+    target 可以是文件路径或二进制文件对象；progress 每写入一批题目时以已写入题数回调。
+    返回写入的题目数量
+    """
+    if not XLSX_AVAILABLE:
+        raise ImportError("openpyxl 库未安装，无法导出XLSX格式")
+
+    wb = Workbook(write_only=True)
+    header_font = Font(bold=True)
+    header_fill = PatternFill(start_color="CCCCCC", end_color="CCCCCC", fill_type="solid")
+
+    def header_cell(ws, value):
+        cell = WriteOnlyCell(ws, value=value)
+        cell.font = header_font
+        cell.fill = header_fill
+        return cell
+
+    # 题库信息工作表
+    info_ws = wb.create_sheet("题库信息")
+    title_cell = WriteOnlyCell(info_ws, value=bank_info.get('name', '题库'))
+    title_cell.font = Font(size=16, bold=True)
+    info_ws.append([title_cell])
+    info_ws.merged_cells.add('A1:B1')
+    info_ws.append([])
+
+    info_data = [
+        ('描述', bank_info.get('description', '无')),
+        ('分类', bank_info.get('category', '未分类')),
+        ('难度', bank_info.get('difficulty', '未设置')),
+        ('题目数量', str(bank_info.get('question_count', 0))),
+        ('导出时间', bank_info.get('exported_at', ''))
+    ]
+    if bank_info.get('exported_by'):
+        info_data.append(('导出人', bank_info['exported_by']))
+    for key, value in info_data:
+        info_ws.append([header_cell(info_ws, key), value])
+
+    # 题目列表工作表：列宽需在写入行之前设置
+    questions_ws = wb.create_sheet("题目列表")
+    for column, width in XLSX_QUESTION_COLUMN_WIDTHS.items():
+        questions_ws.column_dimensions[column].width = width
+    questions_ws.append([header_cell(questions_ws, header) for header in XLSX_QUESTION_HEADERS])
+
+    type_text = QUESTION_TYPE_TEXT.get
+    count = 0
+    for count, question in enumerate(questions, 1):
+        question_type = question['type']
+        questions_ws.append((
+            count,
+            type_text(question_type, question_type),
+            format_excel_content(question),
+            format_answer_text(question),
+            question.get('explanation', ''),
+            question.get('difficulty', '未设置'),
+            question.get('points', 1)
+        ))
+        if progress and count % 1000 == 0:
+            progress(count)
+
+    wb.save(target)
+    return count
+
+
+# Parquet题目表的列及类型；content/answer/tags 以JSON字符串存储
+PARQUET_QUESTION_COLUMNS = (
+    ('id', 'int64'), ('type', 'string'), ('title', 'string'), ('content', 'json'),
+    ('answer', 'json'), ('explanation', 'string'), ('difficulty', 'string'),
+    ('tags', 'json'), ('points', 'int32'), ('order_index', 'int32')
+)
+
+# Parquet答题记录表的列及类型
+PARQUET_ANSWER_COLUMNS = (
+    ('id', 'int64'), ('user_id', 'int64'), ('question_id', 'int64'), ('bank_id', 'int64'),
+    ('user_answer', 'json'), ('is_correct', 'bool'), ('score', 'int32'),
+    ('time_spent', 'int32'), ('answered_at', 'timestamp')
+)
+
+# 不含答案的导出省略的列
+PARQUET_ANSWER_ONLY_COLUMNS = ('answer', 'explanation')
+
+# 每个行组的行数，写入时内存中只保留一个行组
+PARQUET_ROW_GROUP_SIZE = 10000
+
+PARQUET_COMPRESSION = 'zstd'
+
+
+def write_parquet(rows: Iterable[Dict[str, Any]], columns, target, metadata: Optional[Dict[str, Any]] = None,
+                  progress: Optional[Callable[[int], None]] = None) -> int:
+    """
+    按行组写入Parquet文件
+
+    columns 为 (列名, 类型) 序列，类型为 int64/int32/bool/string/json/timestamp，json列写入JSON字符串；
+    metadata 以JSON写入文件级元数据。target 可以是文件路径或二进制文件对象，返回写入的行数
+    """
+    if not PARQUET_AVAILABLE:
+        raise ImportError("pyarrow 库未安装，无法导出Parquet格式")
+
+    arrow_types = {
+        'int64': pa.int64(), 'int32': pa.int32(), 'bool': pa.bool_(),
+        'string': pa.string(), 'json': pa.string(), 'timestamp': pa.timestamp('us')
+    }
+    schema = pa.schema(
+        [(name, arrow_types[kind]) for name, kind in columns],
+        metadata={key: json.dumps(value, ensure_ascii=False, default=str) for key, value in (metadata or {}).items()}
+    )
+    json_columns = {name for name, kind in columns if kind == 'json'}
+    buffers = {name: [] for name, _ in columns}
+
+    def flush():
+        writer.write_table(pa.Table.from_pydict(buffers, schema=schema))
+        for values in buffers.values():
+            values.clear()
+
+    count = 0
+    writer = pq.ParquetWriter(target, schema, compression=PARQUET_COMPRESSION)
+    try:
+        for count, row in enumerate(rows, 1):
+            for name, values in buffers.items():
+                value = row.get(name)
+                if name in json_columns and value is not None:
+                    value = json.dumps(value, ensure_ascii=False)
+                values.append(value)
+            if count % PARQUET_ROW_GROUP_SIZE == 0:
+                flush()
+                if progress:
+                    progress(count)
+        if count % PARQUET_ROW_GROUP_SIZE:
+            flush()
+    finally:
+        writer.close()
+    return count
+
+
+def write_questions_parquet(bank_info: Dict[str, Any], questions: Iterable[Dict[str, Any]], target,
+                            include_answers: bool = True,
+                            progress: Optional[Callable[[int], None]] = None) -> int:
+    """导出题目为Parquet，题库信息写入文件元数据 bank_info"""
+    columns = [
+        column for column in PARQUET_QUESTION_COLUMNS
+        if include_answers or column[0] not in PARQUET_ANSWER_ONLY_COLUMNS
+    ]
+    return write_parquet(questions, columns, target, metadata={'bank_info': bank_info}, progress=progress)
+
+
 def get_available_formats() -> List[str]:
     """获取可用的导出格式"""
-    formats = ['json', 'markdown']
+    formats = ['json', 'jsonl', 'markdown']
 
     if DOCX_AVAILABLE:
         formats.append('docx')
@@ -616,4 +778,7 @@ def get_available_formats() -> List[str]:
     if XLSX_AVAILABLE:
         formats.append('xlsx')
 
+    if PARQUET_AVAILABLE:
+        formats.append('parquet')
+
     return formats
@@ -0,0 +1,189 @@
+"""
+多题库ZIP归档导出
+各题库的JSONL/XLSX在生成的同时写入ZIP条目，ZIP本身也边写边输出：
+不在内存中缓冲整个归档，也不为单个题库生成临时文件
+"""
+import json
+import queue
+import re
+import threading
+import zipfile
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional
+
+from app import db
+from app.models import QuestionBank
+from app.utils.export import write_xlsx
+from app.utils.export_stream import (
+    STREAM_CHUNK_SIZE, build_bank_info, count_bank_questions, iter_bank_questions, stream_jsonl
+)
+
+# 归档中每个题库的文件格式
+ARCHIVE_FORMATS = ('jsonl', 'xlsx')
+
+# 归档末尾的清单文件，记录每个题库的信息和对应的条目
+ARCHIVE_MANIFEST_NAME = 'manifest.json'
+
+# 生产线程与响应之间最多积压的数据块数量，超出时生产线程阻塞等待
+ARCHIVE_QUEUE_SIZE = 16
+
+_INVALID_NAME_CHARS = re.compile(r'[\\/:*?"<>|\s]+')
+
+
+def archive_bank_ids(user, bank_ids: Optional[List[int]] = None, tenant_id: Optional[str] = None,
+                     category: Optional[str] = None, start_after: Optional[int] = None,
+                     unrestricted: bool = False) -> List[int]:
+    """
+    按ID升序列出要归档的题库
+
+    非管理员只能归档自己在本租户创建的题库（与 can_edit 一致）；只有命令行显式传入 unrestricted=True 时不做权限过滤，
+    缺少用户身份不视为不受限。start_after 用于续传：只返回ID大于该值的题库
+    """
+    if user is None and not unrestricted:
+        raise ValueError('缺少用户身份，无法确定可归档的题库')
+
+    query = db.session.query(QuestionBank.id)
+    if not unrestricted and not user.is_admin():
+        query = query.filter(QuestionBank.tenant_id == user.tenant_id,
+                             QuestionBank.creator_id == user.id)
+    if bank_ids:
+        query = query.filter(QuestionBank.id.in_(bank_ids))
+    if tenant_id:
+        query = query.filter(QuestionBank.tenant_id == tenant_id)
+    if category:
+        query = query.filter(QuestionBank.category == category)
+    if start_after:
+        query = query.filter(QuestionBank.id > start_after)
+    return [row[0] for row in query.order_by(QuestionBank.id).all()]
+
+
+def bank_entry_name(bank, export_format: str) -> str:
+    """归档条目名：以补零的题库ID开头，条目按ID顺序排列，便于确定续传位置"""
+    safe_name = _INVALID_NAME_CHARS.sub('_', bank.name or '').strip('_') or 'bank'
+    return f'{bank.id:08d}_{safe_name}.{export_format}'
+
+
+def write_bank_archive(target, bank_ids: Iterable[int], exported_by: str, export_format: str = 'jsonl',
+                       include_answers: bool = True,
+                       on_bank_done: Optional[Callable[[Dict[str, Any]], None]] = None) -> List[Dict[str, Any]]:
+    """
+    将题库逐个写入ZIP归档，返回清单记录列表
+
+    target 为可写的二进制文件对象，不要求支持seek（条目使用数据描述符记录长度）。
+    每个题库写完后以其清单记录回调 on_bank_done
+    """
+    manifest = []
+    with zipfile.ZipFile(target, 'w', compression=zipfile.ZIP_DEFLATED, allowZip64=True) as archive:
+        for bank_id in bank_ids:
+            bank = db.session.get(QuestionBank, bank_id)
+            if bank is None:
+                continue
+
+            record = build_bank_info(bank, exported_by, count_bank_questions(bank.id))
+            record['bank_id'] = bank.id
+            record['file'] = bank_entry_name(bank, export_format)
+
+            info = zipfile.ZipInfo(record['file'], date_time=datetime.now().timetuple()[:6])
+            info.compress_type = zipfile.ZIP_DEFLATED
+            questions = iter_bank_questions(bank.id, include_answers=include_answers)
+            with archive.open(info, 'w', force_zip64=True) as entry:
+                if export_format == 'xlsx':
+                    write_xlsx(record, questions, entry)
+                else:
+                    for chunk in stream_jsonl(questions):
+                        entry.write(chunk)
+
+            manifest.append(record)
+            if on_bank_done:
+                on_bank_done(record)
+            # 已写完的题库对象不再需要，避免会话随题库数量增长
+            db.session.expunge(bank)
+
+        archive.writestr(ARCHIVE_MANIFEST_NAME, json.dumps({
+            'format': export_format,
+            'include_answers': include_answers,
+            'exported_at': datetime.now().isoformat(),
+            'exported_by': exported_by,
+            'banks': manifest
+        }, ensure_ascii=False, indent=2))
+    return manifest
+
+
+class ArchiveCancelled(Exception):
+    """客户端断开连接，归档生成被取消"""
+
+
+class _QueueWriter:
+    """ZIP输出目标：合并小块写入后放入有界队列，由响应生成器取出；队列满时写入方阻塞（背压）"""
+
+    _DONE = object()
+
+    def __init__(self, chunks: queue.Queue, cancelled: threading.Event):
+        self.chunks = chunks
+        self.cancelled = cancelled
+        self.buffer = bytearray()
+
+    def write(self, data) -> int:
+        self.buffer += data
+        if len(self.buffer) >= STREAM_CHUNK_SIZE:
+            self.flush()
+        return len(data)
+
+    def flush(self):
+        if self.buffer:
+            self.put(bytes(self.buffer))
+            self.buffer = bytearray()
+
+    def put(self, item):
+        while True:
+            if self.cancelled.is_set():
+                raise ArchiveCancelled()
+            try:
+                self.chunks.put(item, timeout=0.5)
+                return
+            except queue.Full:
+                continue
+
+
+def stream_bank_archive(app, bank_ids: List[int], exported_by: str, export_format: str = 'jsonl',
+                        include_answers: bool = True) -> Iterator[bytes]:
+    """
+    以生成器流式输出ZIP归档
+
+    归档在后台线程中生成（拥有独立的应用上下文和数据库会话），通过有界队列交给响应；
+    响应被关闭（客户端断开）时通知生产线程停止
+    """
+    chunks = queue.Queue(maxsize=ARCHIVE_QUEUE_SIZE)
+    cancelled = threading.Event()
+    writer = _QueueWriter(chunks, cancelled)
+
+    def produce():
+        with app.app_context():
+            try:
+                write_bank_archive(writer, bank_ids, exported_by, export_format, include_answers)
+                writer.flush()
+                writer.put(_QueueWriter._DONE)
+            except ArchiveCancelled:
+                pass
+            except Exception as e:
+                app.logger.error(f"Bank archive export failed: {e}")
+                try:
+                    writer.put(e)
+                except ArchiveCancelled:
+                    pass
+            finally:
+                db.session.remove()
+
+    producer = threading.Thread(target=produce, name='bank-archive-export', daemon=True)
+    producer.start()
+    try:
+        while True:
+            item = chunks.get()
+            if item is _QueueWriter._DONE:
+                break
+            if isinstance(item, Exception):
+                # 响应已开始，无法再返回错误状态码；截断的归档可通过 start_after 续传
+                break
+            yield item
+    finally:
+        cancelled.set()
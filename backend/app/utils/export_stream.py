@@ -0,0 +1,144 @@
+"""
+题库流式导出
+按批从数据库读取题目并逐段生成JSON / JSON Lines，内存占用与题库大小无关
+"""
+import json
+import zlib
+from datetime import datetime
+from typing import Any, Dict, Iterable, Iterator, Optional
+from urllib.parse import quote
+
+from sqlalchemy import select
+
+from app import db
+from app.models import Question, UserAnswer
+
+# 导出的题目字段
+EXPORT_QUESTION_FIELDS = (
+    'id', 'type', 'title', 'content', 'answer', 'explanation',
+    'difficulty', 'tags', 'points', 'order_index'
+)
+
+# 不含答案的导出（如学生练习卷）省略的字段
+ANSWER_FIELDS = ('answer', 'explanation')
+
+# 导出的答题记录字段
+EXPORT_ANSWER_LOG_FIELDS = (
+    'id', 'user_id', 'question_id', 'bank_id', 'user_answer',
+    'is_correct', 'score', 'time_spent', 'answered_at'
+)
+
+# 每批从数据库读取的题目数量
+EXPORT_BATCH_SIZE = 1000
+
+# 响应分块大小，避免逐题产生过小的写入
+STREAM_CHUNK_SIZE = 64 * 1024
+
+
+def build_bank_info(bank, exported_by: Optional[str], question_count: int) -> Dict[str, Any]:
+    """构建导出文件中的题库信息；exported_by 为空时导出文件中不写导出人（缓存的导出文件由所有用户共享）"""
+    return {
+        'name': bank.name,
+        'description': bank.description,
+        'category': bank.category,
+        'difficulty': bank.difficulty,
+        'tags': bank.tags,
+        'question_count': question_count,
+        'exported_at': datetime.now().isoformat(),
+        'exported_by': exported_by
+    }
+
+
+def count_bank_questions(bank_id: int) -> int:
+    """统计题库题目数量"""
+    return db.session.query(Question.id).filter(Question.bank_id == bank_id).count()
+
+
+def iter_bank_questions(bank_id: int, batch_size: int = EXPORT_BATCH_SIZE,
+                        include_answers: bool = True) -> Iterator[Dict[str, Any]]:
+    """按导出顺序逐个产出题目字典，只查询导出需要的列，不构建ORM对象"""
+    fields = EXPORT_QUESTION_FIELDS if include_answers else [
+        field for field in EXPORT_QUESTION_FIELDS if field not in ANSWER_FIELDS
+    ]
+    columns = [getattr(Question, field) for field in fields]
+    result = db.session.execute(
+        select(*columns)
+        .where(Question.bank_id == bank_id)
+        .order_by(Question.order_index, Question.id)
+        .execution_options(yield_per=batch_size)
+    )
+    for row in result:
+        yield dict(row._mapping)
+
+
+def iter_bank_answers(bank_id: int, batch_size: int = EXPORT_BATCH_SIZE) -> Iterator[Dict[str, Any]]:
+    """按答题时间逐条产出题库的答题记录"""
+    columns = [getattr(UserAnswer, field) for field in EXPORT_ANSWER_LOG_FIELDS]
+    result = db.session.execute(
+        select(*columns)
+        .where(UserAnswer.bank_id == bank_id)
+        .order_by(UserAnswer.answered_at, UserAnswer.id)
+        .execution_options(yield_per=batch_size)
+    )
+    for row in result:
+        yield dict(row._mapping)
+
+
+def _buffered(pieces: Iterable[str], chunk_size: int = STREAM_CHUNK_SIZE) -> Iterator[bytes]:
+    """将小段文本合并为较大的UTF-8字节块"""
+    buffer = []
+    size = 0
+    for piece in pieces:
+        buffer.append(piece)
+        size += len(piece)
+        if size >= chunk_size:
+            yield ''.join(buffer).encode('utf-8')
+            buffer = []
+            size = 0
+    if buffer:
+        yield ''.join(buffer).encode('utf-8')
+
+
+def stream_json(bank_info: Dict[str, Any], questions: Iterable[Dict[str, Any]]) -> Iterator[bytes]:
+    """
+    流式生成与 BankExporter.export_json 结构相同的JSON文档
+    {"bank_info": {...}, "questions": [...]}，每道题占一行
+    """
+    def pieces():
+        yield '{\n"bank_info": '
+        yield json.dumps(bank_info, ensure_ascii=False)
+        yield ',\n"questions": ['
+        separator = '\n'
+        for question in questions:
+            yield separator
+            yield json.dumps(question, ensure_ascii=False)
+            separator = ',\n'
+        yield '\n]\n}\n'
+
+    return _buffered(pieces())
+
+
+def stream_jsonl(questions: Iterable[Dict[str, Any]]) -> Iterator[bytes]:
+    """流式生成JSON Lines，每行一道题"""
+    return _buffered(json.dumps(question, ensure_ascii=False) + '\n' for question in questions)
+
+
+def gzip_stream(chunks: Iterable[bytes], level: int = 6) -> Iterator[bytes]:
+    """对字节流进行gzip压缩，边压缩边输出"""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)  # wbits=31 生成gzip格式
+    for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+
+def attachment_headers(filename: str) -> Dict[str, str]:
+    """生成下载响应头，文件名按RFC 5987编码以支持中文"""
+    ascii_name = filename.encode('ascii', 'ignore').decode('ascii').strip() or 'export'
+    return {
+        'Content-Disposition': (
+            f'attachment; filename="{ascii_name}"; filename*=UTF-8\'\'{quote(filename)}'
+        ),
+        'X-Accel-Buffering': 'no'  # 禁止反向代理缓冲整个响应
+    }
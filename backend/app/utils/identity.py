@@ -0,0 +1,264 @@
+"""
+身份解析
+当前用户在每个请求内只查询一次（缓存在 g 中）；权限检查需要的字段（ID、角色、租户、是否激活）
+另有进程内的TTL缓存，跨请求复用，用户被修改或删除后在事务提交时失效。
+
+AUTHZ_MODE 为 claims 时，只读请求（GET/HEAD/OPTIONS）直接信任访问令牌中签名的 role/tenant_id/username 声明，
+不查询数据库；修改类请求以及签发后用户权限发生过变化的令牌仍使用数据库中的身份
+"""
+import threading
+import time
+from collections import OrderedDict
+from typing import NamedTuple, Optional
+
+from flask import current_app, g, has_app_context, request
+from flask_jwt_extended import get_jwt, get_jwt_identity
+from sqlalchemy import event, inspect, select
+from sqlalchemy.orm import Session, object_session
+
+from app import db
+from app.models import User
+
+# 缓存未配置时的默认值
+DEFAULT_AUTH_CACHE_TTL = 60
+DEFAULT_AUTH_CACHE_SIZE = 10000
+
+# 授权模式: database 每次从数据库（经TTL缓存）读取身份；claims 只读请求信任令牌声明
+AUTHZ_MODES = ('database', 'claims')
+
+# 可以使用令牌声明授权的只读请求方法
+CLAIMS_SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+# 令牌中授权所需的声明
+AUTH_CLAIMS = ('role', 'tenant_id', 'username')
+
+# 权限变化记录的保留时间，应不短于访问令牌的最长有效期（记住登录时为30天）
+AUTH_CHANGE_RETENTION_SECONDS = 30 * 24 * 3600
+
+
+class AuthIdentity(NamedTuple):
+    """权限检查使用的用户字段"""
+    id: int
+    username: str
+    role: str
+    tenant_id: str
+    is_active: bool
+
+    def is_admin(self) -> bool:
+        return self.role == 'admin'
+
+    @classmethod
+    def from_user(cls, user) -> 'AuthIdentity':
+        return cls(user.id, user.username, user.role, user.tenant_id, bool(user.is_active))
+
+
+class AuthIdentityCache:
+    """线程安全的TTL + LRU缓存：user_id -> AuthIdentity"""
+
+    def __init__(self):
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, user_id: int) -> Optional[AuthIdentity]:
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None:
+                return None
+            expires_at, identity = entry
+            if expires_at < time.monotonic():
+                del self._entries[user_id]
+                return None
+            self._entries.move_to_end(user_id)
+            return identity
+
+    def set(self, identity: AuthIdentity, ttl: float, max_size: int):
+        if ttl <= 0:
+            return
+        with self._lock:
+            self._entries[identity.id] = (time.monotonic() + ttl, identity)
+            self._entries.move_to_end(identity.id)
+            while len(self._entries) > max_size:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, user_id: int):
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+auth_identity_cache = AuthIdentityCache()
+
+# 本进程观察到的用户权限变化时间（Unix时间戳），早于该时间签发的令牌不再信任其声明
+_auth_changed_at = {}
+_auth_changed_lock = threading.Lock()
+
+
+def _parse_user_id(identity) -> Optional[int]:
+    try:
+        return int(identity)
+    except (TypeError, ValueError):
+        return None
+
+
+def load_user(user_id) -> Optional[User]:
+    """按ID加载用户，同一请求内只查询一次"""
+    user_id = _parse_user_id(user_id)
+    if user_id is None:
+        return None
+
+    users = g.setdefault('_identity_users', {})
+    if user_id not in users:
+        user = db.session.get(User, user_id)
+        users[user_id] = user
+        if user is not None:
+            _cache_identity(AuthIdentity.from_user(user))
+    return users[user_id]
+
+
+def get_current_user() -> Optional[User]:
+    """当前请求JWT对应的用户（需已验证JWT）；未登录时返回None"""
+    return load_user(get_jwt_identity())
+
+
+def get_auth_identity(user_id) -> Optional[AuthIdentity]:
+    """
+    获取权限检查所需的用户字段
+
+    依次使用：本请求已加载的用户对象、跨请求TTL缓存、只查询这几列的主键查询
+    """
+    user_id = _parse_user_id(user_id)
+    if user_id is None:
+        return None
+
+    user = g.get('_identity_users', {}).get(user_id)
+    if user is not None:
+        return AuthIdentity.from_user(user)
+
+    identity = auth_identity_cache.get(user_id)
+    if identity is not None:
+        return identity
+
+    row = db.session.execute(
+        select(User.id, User.username, User.role, User.tenant_id, User.is_active).where(User.id == user_id)
+    ).first()
+    if row is None:
+        return None
+
+    identity = AuthIdentity(row.id, row.username, row.role, row.tenant_id, bool(row.is_active))
+    _cache_identity(identity)
+    return identity
+
+
+def claims_identity(claims: Optional[dict] = None) -> Optional[AuthIdentity]:
+    """
+    由访问令牌声明构造身份，不查询数据库
+
+    令牌缺少授权声明（旧令牌），或签发后本进程观察到该用户权限发生过变化时返回None
+    """
+    if claims is None:
+        claims = get_jwt()
+    user_id = _parse_user_id(claims.get('sub'))
+    if user_id is None or any(claim not in claims for claim in AUTH_CLAIMS):
+        return None
+
+    with _auth_changed_lock:
+        changed_at = _auth_changed_at.get(user_id)
+    if changed_at is not None and claims.get('iat', 0) <= changed_at:
+        return None
+
+    return AuthIdentity(user_id, claims['username'], claims['role'], claims['tenant_id'], True)
+
+
+def current_identity() -> Optional[AuthIdentity]:
+    """
+    当前请求用于权限检查的身份（需已验证JWT）；未登录或账户已被禁用时返回None
+
+    claims 模式下的只读请求使用令牌声明，其他情况使用 get_auth_identity
+    """
+    user_id = get_jwt_identity()
+    if not user_id:
+        return None
+
+    if _claims_allowed():
+        identity = claims_identity()
+        if identity is not None:
+            return identity
+
+    identity = get_auth_identity(user_id)
+    if identity is None or not identity.is_active:
+        return None
+    return identity
+
+
+def lookup_token_user(jwt_data: dict):
+    """
+    JWT user_lookup_loader 的实现：验证令牌时确认用户存在
+
+    claims 模式的只读请求直接返回令牌声明构造的身份，不查询数据库
+    """
+    if _claims_allowed() and jwt_data.get('type') == 'access':
+        identity = claims_identity(jwt_data)
+        if identity is not None:
+            return identity
+    return load_user(jwt_data.get('sub'))
+
+
+def _claims_allowed() -> bool:
+    return current_app.config.get('AUTHZ_MODE') == 'claims' and request.method in CLAIMS_SAFE_METHODS
+
+
+def _cache_identity(identity: AuthIdentity):
+    config = current_app.config
+    auth_identity_cache.set(
+        identity,
+        config.get('AUTH_IDENTITY_CACHE_TTL', DEFAULT_AUTH_CACHE_TTL),
+        config.get('AUTH_IDENTITY_CACHE_SIZE', DEFAULT_AUTH_CACHE_SIZE)
+    )
+
+
+def invalidate_user_identity(user_id: int):
+    """使用户的身份缓存失效（当前请求和跨请求缓存），并不再信任之前签发的令牌声明"""
+    auth_identity_cache.invalidate(user_id)
+    _record_auth_change(user_id, int(time.time()))
+    if has_app_context():
+        g.get('_identity_users', {}).pop(user_id, None)
+
+
+def _record_auth_change(user_id: int, changed_at: int):
+    with _auth_changed_lock:
+        _auth_changed_at[user_id] = changed_at
+        # 早于最长令牌有效期的记录不再需要
+        if len(_auth_changed_at) > DEFAULT_AUTH_CACHE_SIZE:
+            horizon = changed_at - AUTH_CHANGE_RETENTION_SECONDS
+            for stale_id in [key for key, value in _auth_changed_at.items() if value < horizon]:
+                del _auth_changed_at[stale_id]
+
+
+# ORM修改或删除用户时记录其ID，事务提交后使缓存失效；
+# 其他进程中的缓存最迟在 AUTH_IDENTITY_CACHE_TTL 秒后过期，令牌声明最迟在令牌过期后失效
+@event.listens_for(User, 'after_update')
+@event.listens_for(User, 'after_delete')
+def _mark_user_changed(mapper, connection, target):
+    state = inspect(target)
+    if not state.deleted and not any(state.attrs[field].history.has_changes() for field in AuthIdentity._fields):
+        return  # 只更新了登录时间等无关字段
+    session = object_session(target)
+    if session is not None:
+        session.info.setdefault('changed_user_ids', set()).add(target.id)
+    auth_identity_cache.invalidate(target.id)
+
+
+@event.listens_for(Session, 'after_commit')
+def _invalidate_changed_users(session):
+    changed_at = int(time.time())
+    for user_id in session.info.pop('changed_user_ids', ()):
+        auth_identity_cache.invalidate(user_id)
+        _record_auth_change(user_id, changed_at)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_changed_users(session):
+    session.info.pop('changed_user_ids', None)
@@ -2,14 +2,23 @@
 系统监控和健康检查模块
 """
 import time
-import psutil
 import logging
 from datetime import datetime, timedelta
 from functools import wraps
 from flask import request, current_app, g
 from sqlalchemy import text
 
+try:
+    import psutil
+    PSUTIL_AVAILABLE = True
+except ImportError:
+    PSUTIL_AVAILABLE = False
+
 from app import db
+from app.utils.db_pool import pool_stats
+from app.utils.db_routing import replica_router
+from app.utils.decorators import admin_required
+from app.utils.response_cache import response_cache_stats
 
 logger = logging.getLogger(__name__)
 
@@ -18,7 +27,9 @@ class SystemMonitor:
     
     @staticmethod
     def get_system_info():
-        """获取系统信息"""
+        """获取系统信息（未安装psutil时为None）"""
+        if not PSUTIL_AVAILABLE:
+            return None
         try:
             cpu_percent = psutil.cpu_percent(interval=1)
             memory = psutil.virtual_memory()
@@ -86,9 +97,7 @@ class SystemMonitor:
             return {
                 'connected': True,
                 'response_time': db_response_time,
-                'pool_size': db.engine.pool.size(),
-                'pool_checked_in': db.engine.pool.checkedin(),
-                'pool_checked_out': db.engine.pool.checkedout(),
+                'pools': pool_stats(),
                 'table_stats': table_stats,
                 'timestamp': datetime.utcnow().isoformat()
             }
@@ -129,6 +138,8 @@ class SystemMonitor:
                     'active_users_7d': recent_users,
                     'new_banks_7d': recent_banks
                 },
+                'response_cache': response_cache_stats(),
+                'db_routing': replica_router.stats(),
                 'version': current_app.config.get('VERSION', '1.0.0'),
                 'environment': current_app.config.get('ENV', 'development'),
                 'timestamp': datetime.utcnow().isoformat()
@@ -191,6 +202,8 @@ class HealthChecker:
     @staticmethod
     def check_disk_space():
         """检查磁盘空间"""
+        if not PSUTIL_AVAILABLE:
+            return {'status': 'unknown', 'message': 'psutil not installed'}
         try:
             disk = psutil.disk_usage('/')
             usage_percent = (disk.used / disk.total) * 100
@@ -218,6 +231,8 @@ class HealthChecker:
     @staticmethod
     def check_memory():
         """检查内存使用"""
+        if not PSUTIL_AVAILABLE:
+            return {'status': 'unknown', 'message': 'psutil not installed'}
         try:
             memory = psutil.virtual_memory()
             
@@ -324,20 +339,22 @@ def log_response_info(response):
     return response
 
 def init_monitoring(app):
-    """初始化监控"""
+    """初始化监控：注册健康检查和指标端点；REQUEST_LOGGING_ENABLED 开启时记录每个请求和响应"""
     
-    @app.before_request
-    def before_request():
-        g.start_time = time.time()
-        g.performance_metrics = []
-        log_request_info()
-    
-    @app.after_request
-    def after_request(response):
-        return log_response_info(response)
+    if app.config.get('REQUEST_LOGGING_ENABLED'):
+        @app.before_request
+        def before_request():
+            g.start_time = time.time()
+            g.performance_metrics = []
+            log_request_info()
+
+        @app.after_request
+        def after_request(response):
+            return log_response_info(response)
     
-    @app.route('/health')
-    def health_check():
+    # /health 是应用工厂注册的简单存活检查
+    @app.route('/health/detailed')
+    def detailed_health_check():
         """健康检查端点"""
         health_status = HealthChecker.get_health_status()
         
@@ -350,6 +367,7 @@ def init_monitoring(app):
         return health_status, status_code
     
     @app.route('/metrics')
+    @admin_required
     def metrics():
         """系统指标端点"""
         return {
@@ -0,0 +1,126 @@
+"""
+题目JSON片段缓存
+每道题目按输出形式预先编码为JSON字节串，以 (题目ID, updated_at) 校验后复用；
+列表接口先只查询当页题目的ID和更新时间，只为缓存中没有的题目加载完整记录，
+响应体由缓存的片段直接拼接，不再逐题执行 to_dict、日期格式化和 marshal
+"""
+import json
+import math
+import uuid
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from flask import Response, current_app
+from sqlalchemy import event, func, select
+
+from app import db
+from app.models import Question
+from app.utils.tiered_cache import LocalLRUCache
+
+# 题目列表接口（question_model）输出的字段，顺序与 marshal 结果一致
+LIST_FIELDS = (
+    'id', 'bank_id', 'type', 'title', 'content', 'explanation', 'difficulty',
+    'tags', 'points', 'order_index', 'created_at'
+)
+
+# 输出形式: list 列表字段；detail 完整字段（不含答案）；answer 完整字段并包含答案
+PAYLOAD_VARIANTS = ('list', 'detail', 'answer')
+
+# 未配置时片段缓存的总大小
+DEFAULT_PAYLOAD_CACHE_BYTES = 128 * 1024 * 1024
+MAX_FRAGMENT_BYTES = 4 * 1024 * 1024
+
+_fragments: Optional[LocalLRUCache] = None
+
+
+def _cache() -> LocalLRUCache:
+    global _fragments
+    if _fragments is None:
+        max_bytes = current_app.config.get('QUESTION_PAYLOAD_CACHE_BYTES', DEFAULT_PAYLOAD_CACHE_BYTES)
+        _fragments = LocalLRUCache(max_bytes, MAX_FRAGMENT_BYTES)
+    return _fragments
+
+
+def _dumps(data) -> bytes:
+    return json.dumps(data, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def encode_question(question: Question, variant: str) -> bytes:
+    """按输出形式编码单道题目"""
+    if variant == 'list':
+        data = question.to_dict()
+        return _dumps({field: data[field] for field in LIST_FIELDS})
+    return _dumps(question.to_dict(include_answer=variant == 'answer'))
+
+
+def question_fragments(rows: Sequence[Tuple[int, object]], variant: str) -> List[bytes]:
+    """
+    按 rows（题目ID, updated_at）的顺序返回题目片段
+
+    缓存中没有或 updated_at 已变化的题目一次查询加载并编码
+    """
+    if variant not in PAYLOAD_VARIANTS:
+        raise ValueError(f'不支持的输出形式: {variant}')
+
+    cache = _cache()
+    fragments: Dict[int, bytes] = {}
+    missing = []
+    for question_id, updated_at in rows:
+        entry = cache.get(f'{variant}:{question_id}')
+        if entry is not None and entry[0] == updated_at:
+            fragments[question_id] = entry[1]
+        else:
+            missing.append(question_id)
+
+    if missing:
+        for question in Question.query.filter(Question.id.in_(missing)):
+            fragment = encode_question(question, variant)
+            fragments[question.id] = fragment
+            cache.set(f'{variant}:{question.id}', (question.updated_at, fragment), len(fragment), math.inf)
+
+    return [fragments[question_id] for question_id, _ in rows if question_id in fragments]
+
+
+def with_extra_fields(fragment: bytes, extra: dict) -> bytes:
+    """在对象片段末尾追加字段（如当前用户是否收藏）"""
+    if not extra:
+        return fragment
+    return fragment[:-1] + b',' + _dumps(extra)[1:]
+
+
+def page_rows(query, page: int, per_page: int) -> Tuple[List[Tuple[int, object]], int]:
+    """
+    分页查询当页题目的 (ID, updated_at) 和总数
+
+    query 是只选择了 Question.id 和 Question.updated_at 的 select
+    """
+    total = db.session.execute(select(func.count()).select_from(query.order_by(None).subquery())).scalar()
+    rows = db.session.execute(query.limit(per_page).offset((page - 1) * per_page)).all()
+    return [(row[0], row[1]) for row in rows], total
+
+
+def json_response(envelope: dict, key: str, fragments: List[bytes], status: int = 200) -> Response:
+    """把片段列表拼接到 envelope[key] 的位置，返回JSON响应"""
+    placeholder = f'__fragments_{uuid.uuid4().hex}__'
+    body = _dumps(dict(envelope, **{key: placeholder})).replace(
+        _dumps(placeholder), b'[' + b','.join(fragments) + b']', 1
+    )
+    return Response(body, status=status, mimetype='application/json')
+
+
+def pages_count(total: int, per_page: int) -> int:
+    return int(math.ceil(total / per_page)) if per_page else 0
+
+
+def discard_question(question_id: int):
+    """丢弃题目的全部片段"""
+    if _fragments is None:
+        return
+    for variant in PAYLOAD_VARIANTS:
+        _fragments.delete(f'{variant}:{question_id}')
+
+
+# 本进程通过ORM修改、删除题目时立即丢弃片段，不依赖 updated_at 的精度（同一秒内多次修改）
+@event.listens_for(Question, 'after_update')
+@event.listens_for(Question, 'after_delete')
+def _question_changed(mapper, connection, target):
+    discard_question(target.id)
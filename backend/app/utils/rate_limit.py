@@ -0,0 +1,239 @@
+"""
+请求速率限制
+每个工作进程为每个限流键维护令牌桶，超限请求直接在本地拒绝，不访问任何外部存储；
+配置 RATELIMIT_STORAGE_URL 时，本地放行的请求再经Redis滑动窗口计数，使限制在所有进程间生效。
+
+限流键：已登录请求按用户、租户（额度为单用户的 RATELIMIT_TENANT_MULTIPLIER 倍）
+和客户端IP（额度为单用户的 RATELIMIT_IP_MULTIPLIER 倍），匿名请求按客户端IP。
+一个请求的所有键都放行时才扣减额度，被任一键拒绝的请求不消耗其他键的额度
+"""
+import math
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import List, Optional, Tuple
+
+from flask import current_app, request
+from flask_jwt_extended import get_jwt, verify_jwt_in_request
+
+try:
+    import redis
+    REDIS_AVAILABLE = True
+except ImportError:
+    REDIS_AVAILABLE = False
+
+# 限额字符串，如 "5 per minute"、"100/hour"
+RATE_PATTERN = re.compile(r'^\s*(\d+)\s*(?:per|/)\s*(\d+)?\s*(second|minute|hour|day)s?\s*$', re.IGNORECASE)
+RATE_UNITS = {'second': 1, 'minute': 60, 'hour': 3600, 'day': 86400}
+
+# 每个进程最多保留的令牌桶数量，超出时淘汰最久未使用的
+MAX_LOCAL_BUCKETS = 100000
+
+# Redis不可用后暂停访问的秒数，期间只使用本地令牌桶
+REDIS_RETRY_SECONDS = 30
+
+REDIS_KEY_PREFIX = 'questionbank:ratelimit'
+
+
+def parse_rate(rate) -> Tuple[int, int]:
+    """解析限额，返回 (请求数, 窗口秒数)；也接受 (请求数, 窗口秒数) 元组"""
+    if isinstance(rate, (tuple, list)):
+        return int(rate[0]), int(rate[1])
+    match = RATE_PATTERN.match(rate or '')
+    if not match:
+        raise ValueError(f'无效的速率限制: {rate}')
+    count, multiplier, unit = match.groups()
+    return int(count), int(multiplier or 1) * RATE_UNITS[unit.lower()]
+
+
+class TokenBucketLimiter:
+    """线程安全的本地令牌桶集合：key -> (剩余令牌, 上次补充时间)"""
+
+    def __init__(self, max_buckets: int = MAX_LOCAL_BUCKETS):
+        self.max_buckets = max_buckets
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def acquire(self, keys: List[Tuple[str, int, int]]) -> float:
+        """
+        每个 (key, limit, window) 都有令牌时各取一个并返回0；
+        否则不取任何令牌，返回需要等待的最长秒数
+        """
+        now = time.monotonic()
+        with self._lock:
+            refilled = []
+            wait = 0.0
+            for key, limit, window in keys:
+                tokens, updated_at = self._buckets.get(key, (limit, now))
+                tokens = min(limit, tokens + (now - updated_at) * limit / window)
+                refilled.append((key, tokens))
+                if tokens < 1:
+                    wait = max(wait, (1 - tokens) * window / limit)
+
+            for key, tokens in refilled:
+                self._buckets[key] = (tokens if wait > 0 else tokens - 1, now)
+                self._buckets.move_to_end(key)
+            while len(self._buckets) > self.max_buckets:
+                self._buckets.popitem(last=False)
+        return wait
+
+    def refund(self, keys: List[Tuple[str, int, int]]):
+        """退还 acquire 取走的令牌（远端限流拒绝时）"""
+        with self._lock:
+            for key, limit, _ in keys:
+                if key in self._buckets:
+                    tokens, updated_at = self._buckets[key]
+                    self._buckets[key] = (min(limit, tokens + 1), updated_at)
+
+    def clear(self):
+        with self._lock:
+            self._buckets.clear()
+
+
+class SlidingWindowLimiter:
+    """
+    Redis滑动窗口计数器：每个固定窗口一个计数键，
+    当前估计值 = 上一窗口计数 × 上一窗口仍在滑动窗口内的比例 + 当前窗口计数
+    """
+
+    def __init__(self, client):
+        self.client = client
+
+    def acquire(self, keys: List[Tuple[str, int, int]]) -> float:
+        """所有键都未超限时计数并返回0，否则撤销本次计数，返回需要等待的最长秒数"""
+        now = time.time()
+        windows = []
+        pipeline = self.client.pipeline()
+        for key, limit, window in keys:
+            index = int(now // window)
+            current_key = f'{REDIS_KEY_PREFIX}:{key}:{window}:{index}'
+            pipeline.incr(current_key)
+            pipeline.expire(current_key, window * 2)
+            pipeline.get(f'{REDIS_KEY_PREFIX}:{key}:{window}:{index - 1}')
+            windows.append((current_key, limit, window, (now % window) / window))
+        results = pipeline.execute()
+
+        wait = 0.0
+        for i, (_, limit, window, elapsed) in enumerate(windows):
+            current, previous = results[i * 3], int(results[i * 3 + 2] or 0)
+            if previous * (1 - elapsed) + current > limit:
+                wait = max(wait, self._retry_after(previous, current - 1, limit, window, elapsed))
+        if wait <= 0:
+            return 0.0
+
+        # 被拒绝的请求不计入任何窗口，避免持续重试的客户端耗尽其他键的额度或永远无法恢复
+        pipeline = self.client.pipeline()
+        for current_key, _, _, _ in windows:
+            pipeline.decr(current_key)
+        pipeline.execute()
+        return wait
+
+    @staticmethod
+    def _retry_after(previous: int, current: int, limit: int, window: int, elapsed: float) -> float:
+        # 本窗口内等待上一窗口的权重衰减
+        if previous and current + 1 <= limit:
+            needed = 1 - (limit - current - 1) / previous
+            if needed <= 1:
+                return (needed - elapsed) * window
+        # 等到下一窗口，本窗口计数成为“上一窗口”后逐渐衰减
+        needed = 1 - (limit - 1) / current if current else 0
+        return (1 - elapsed) * window + max(0.0, needed) * window
+
+
+class RateLimiter:
+    """本地令牌桶 + 可选的Redis滑动窗口"""
+
+    def __init__(self):
+        self.local = TokenBucketLimiter()
+        self.remote: Optional[SlidingWindowLimiter] = None
+        self.remote_url = None
+        self.remote_disabled_until = 0.0
+        self._lock = threading.Lock()
+
+    def _remote(self) -> Optional[SlidingWindowLimiter]:
+        url = current_app.config.get('RATELIMIT_STORAGE_URL')
+        if not url or not REDIS_AVAILABLE or time.monotonic() < self.remote_disabled_until:
+            return None
+        if self.remote is None or self.remote_url != url:
+            with self._lock:
+                if self.remote is None or self.remote_url != url:
+                    client = redis.Redis.from_url(url, socket_timeout=0.2, socket_connect_timeout=0.2)
+                    self.remote = SlidingWindowLimiter(client)
+                    self.remote_url = url
+        return self.remote
+
+    def hit(self, keys: List[Tuple[str, int, int]]) -> float:
+        """
+        检查 (key, limit, window)，全部放行时扣减额度并返回0，否则不扣减，返回最长的等待秒数
+        """
+        wait = self.local.acquire(keys)
+        if wait > 0:
+            return wait
+
+        remote = self._remote()
+        if remote is None:
+            return 0.0
+        try:
+            wait = remote.acquire(keys)
+        except Exception as e:
+            # Redis故障时降级为仅本地限流
+            self.remote_disabled_until = time.monotonic() + REDIS_RETRY_SECONDS
+            current_app.logger.warning(f"Rate limit storage unavailable, using local buckets only: {e}")
+            return 0.0
+        if wait > 0:
+            self.local.refund(keys)
+        return wait
+
+
+rate_limiter = RateLimiter()
+
+
+def _request_claims() -> Optional[dict]:
+    """当前请求已验证（或可验证）的JWT声明；匿名或令牌无效时返回None"""
+    try:
+        verify_jwt_in_request(optional=True)
+        claims = get_jwt()
+    except Exception:
+        return None
+    return claims or None
+
+
+def rate_limit_keys(scope: str, limit: int, window: int) -> List[Tuple[str, int, int]]:
+    """当前请求在 scope 下的限流键"""
+    # 反向代理之后由 ProxyFix（PROXY_FIX_HOPS）还原为客户端地址
+    ip = request.remote_addr or 'unknown'
+    claims = _request_claims()
+    if claims and claims.get('sub'):
+        keys = [(f'{scope}:user:{claims["sub"]}', limit, window)]
+        tenant_id = claims.get('tenant_id')
+        if tenant_id:
+            multiplier = current_app.config.get('RATELIMIT_TENANT_MULTIPLIER', 20)
+            keys.append((f'{scope}:tenant:{tenant_id}', limit * multiplier, window))
+        # 同一IP上的多个账号（如脚本批量注册）共享额度；与匿名请求的IP桶分开，避免额度不同的两种请求互相干扰
+        multiplier = current_app.config.get('RATELIMIT_IP_MULTIPLIER', 10)
+        keys.append((f'{scope}:user-ip:{ip}', limit * multiplier, window))
+        return keys
+    return [(f'{scope}:ip:{ip}', limit, window)]
+
+
+def check_rate_limit(scope: str, rate) -> Optional[tuple]:
+    """
+    检查当前请求是否超出限额
+
+    未超出返回None，超出时返回429响应（含 Retry-After 头）
+    """
+    if not current_app.config.get('RATELIMIT_ENABLED', True):
+        return None
+
+    limit, window = parse_rate(rate)
+    wait = rate_limiter.hit(rate_limit_keys(scope, limit, window))
+    if wait <= 0:
+        return None
+
+    retry_after = max(1, math.ceil(wait))
+    return (
+        {'message': '请求过于频繁，请稍后再试', 'retry_after': retry_after},
+        429,
+        {'Retry-After': str(retry_after)}
+    )
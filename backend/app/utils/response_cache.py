@@ -0,0 +1,350 @@
+"""
+接口响应缓存
+基于Flask-Caching，后端由 CACHE_BACKEND 选择（simple 进程内 / filesystem 本机共享 / redis 多机共享 / null 关闭）。
+
+缓存键由请求路径、查询参数和可见性范围（用户、租户+角色或公开）确定，条目中记录计算时各失效命名空间的版本号；
+ORM修改相关模型时记录受影响的命名空间，事务提交后更换其版本号，版本不一致的条目不再作为新值命中。
+条目存放在两级缓存中（进程内LRU + 共享后端），同一进程内同一条目的并发重算合并为一次：
+
+- banks          任一题库的增删改（题库列表、分类）
+- bank:<id>      题库本身或其题目的增删改（题库详情、题目分页）
+- progress:<uid> 用户答题进度变化（带个人进度的题库列表和详情）
+- user:<uid>     用户角色、租户、激活状态变化（该用户的全部缓存条目）
+"""
+import hashlib
+import time
+import uuid
+from functools import wraps
+from typing import Any, Callable, Iterable, List, NamedTuple, Optional, Tuple, Union
+
+from flask import Response, current_app, has_app_context, request
+from flask_jwt_extended import get_jwt, verify_jwt_in_request
+from flask_restx.utils import unpack
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session, object_session
+
+from app import db
+from app.models import Question, QuestionBank, User, UserProgress
+from app.utils.db_routing import use_primary
+from app.utils.tiered_cache import TwoTierCache
+
+try:
+    from flask_caching import Cache
+    FLASK_CACHING_AVAILABLE = True
+except ImportError:
+    FLASK_CACHING_AVAILABLE = False
+
+# CACHE_BACKEND 与 Flask-Caching 后端类型的对应关系
+CACHE_BACKENDS = {
+    'simple': 'SimpleCache',
+    'filesystem': 'FileSystemCache',
+    'redis': 'RedisCache',
+    'null': 'NullCache',
+}
+
+# 缓存键的可见性范围
+CACHE_VARY_OPTIONS = ('user', 'tenant', 'public')
+
+# 会话中待失效命名空间的键
+SESSION_NAMESPACES_KEY = 'response_cache_namespaces'
+
+# 进程内缓存层的默认大小
+DEFAULT_LOCAL_MAX_BYTES = 64 * 1024 * 1024
+DEFAULT_LOCAL_MAX_ITEM_BYTES = 1024 * 1024
+
+# 用户表中影响可见性的字段
+USER_VISIBILITY_FIELDS = ('role', 'tenant_id', 'is_active')
+
+cache = Cache() if FLASK_CACHING_AVAILABLE else None
+
+
+def init_cache(app):
+    """按 CACHE_BACKEND 初始化缓存后端"""
+    backend = app.config.get('CACHE_BACKEND', 'simple')
+    if backend not in CACHE_BACKENDS:
+        raise ValueError(f"不支持的缓存后端: {backend}，可选: {', '.join(CACHE_BACKENDS)}")
+    if cache is None:
+        app.logger.warning('Flask-Caching is not installed, response cache disabled')
+        return
+    app.config['CACHE_TYPE'] = CACHE_BACKENDS[backend]
+    cache.init_app(app)
+    _configure_store(app)
+
+
+def cache_enabled() -> bool:
+    config = current_app.config
+    return cache is not None and config.get('RESPONSE_CACHE_ENABLED', True) and config.get('CACHE_BACKEND') != 'null'
+
+
+# 命名空间版本
+
+def _generation_key(namespace: str) -> str:
+    return f'gen:{namespace}'
+
+
+def _new_generation() -> str:
+    return uuid.uuid4().hex[:12]
+
+
+def namespace_generations(namespaces: List[str]) -> List[str]:
+    """
+    命名空间的当前版本号
+
+    版本号是随机值而不是计数器：版本键被淘汰后重新生成一个新值，不会与淘汰前的旧条目重合
+    """
+    if not namespaces:
+        return []
+    keys = [_generation_key(namespace) for namespace in namespaces]
+    generations = cache.get_many(*keys)
+    for index, generation in enumerate(generations):
+        if generation is None:
+            cache.add(keys[index], _new_generation(), timeout=0)
+            generations[index] = cache.get(keys[index])
+    return [str(generation) for generation in generations]
+
+
+def invalidate_namespaces(namespaces: Iterable[str]):
+    """立即使命名空间下的所有缓存条目失效"""
+    namespaces = set(namespaces)
+    if not namespaces or not has_app_context() or not cache_enabled():
+        return
+    try:
+        cache.set_many({_generation_key(namespace): _new_generation() for namespace in namespaces}, timeout=0)
+    except Exception as e:
+        current_app.logger.warning(f"Failed to invalidate response cache {sorted(namespaces)}: {e}")
+
+
+def mark_namespaces_changed(namespaces: Iterable[str], session=None):
+    """
+    记录当前事务影响的命名空间，提交后失效
+
+    ORM对象的修改会自动记录；批量 insert/update/delete 语句不触发ORM事件，需要调用方显式记录
+    """
+    session = session or db.session()
+    session.info.setdefault(SESSION_NAMESPACES_KEY, set()).update(namespaces)
+
+
+# 响应缓存装饰器
+
+class CachedResponse(NamedTuple):
+    """缓存条目：响应数据及其计算时各命名空间的版本"""
+    data: Any
+    generations: Tuple[str, ...]
+    stored_at: float
+    expires_at: float  # 超过该时间即使允许旧值也不再使用
+
+
+class RawBody(NamedTuple):
+    """视图直接返回 Response（如拼接好的JSON）时缓存的响应体"""
+    body: bytes
+    mimetype: str
+
+
+def _cacheable(result) -> Tuple[Any, int, dict]:
+    """把视图返回值转换为可缓存的 (数据, 状态码, 响应头)"""
+    data, code, headers = unpack(result)
+    if isinstance(data, Response):
+        headers = dict(data.headers.items(), **dict(headers or {}))
+        headers.pop('Content-Type', None)
+        headers.pop('Content-Length', None)
+        return RawBody(data.get_data(), data.mimetype), data.status_code, headers
+    return data, code, headers
+
+
+def _respond(data, code: int, headers: Optional[dict], x_cache: Optional[str]):
+    headers = dict(headers or {}, **({'X-Cache': x_cache} if x_cache else {}))
+    if isinstance(data, RawBody):
+        return Response(data.body, status=code, headers=headers, mimetype=data.mimetype)
+    return data, code, headers
+
+
+response_store = TwoTierCache(lambda: cache)
+
+
+def _configure_store(app):
+    config = app.config
+    response_store.configure(
+        # 共享后端本身就在进程内时不需要再加一层
+        local_enabled=config.get('CACHE_BACKEND') not in ('simple', 'null'),
+        max_bytes=config.get('CACHE_LOCAL_MAX_BYTES', DEFAULT_LOCAL_MAX_BYTES),
+        max_item_bytes=config.get('CACHE_LOCAL_MAX_ITEM_BYTES', DEFAULT_LOCAL_MAX_ITEM_BYTES)
+    )
+
+
+def response_cache_stats() -> dict:
+    """本进程响应缓存的命中、未命中、合并计数"""
+    return response_store.stats()
+
+
+def _request_claims() -> Optional[dict]:
+    try:
+        verify_jwt_in_request(optional=True)
+        claims = get_jwt()
+    except Exception:
+        return None
+    return claims if claims and claims.get('sub') else None
+
+
+def _visibility_scope(vary: str, claims: Optional[dict]) -> str:
+    if vary == 'public':
+        return 'public'
+    if claims is None:
+        return 'anon'
+    if vary == 'user':
+        return f"u{claims['sub']}"
+    visibility = 'admin' if claims.get('role') == 'admin' else 'member'
+    return f"t{claims.get('tenant_id')}:{visibility}"
+
+
+def response_cache_key(scope: str, path: Optional[str] = None, args=None) -> str:
+    """请求路径、查询参数和可见性范围确定的缓存键（不含命名空间版本，版本记录在条目中）"""
+    path = request.path if path is None else path
+    args = request.args if args is None else args
+    query = '&'.join(f'{key}={value}' for key, value in sorted(args.items(multi=True)))
+    raw = f'{path}?{query}|{scope}'
+    return 'resp:' + hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+
+def _can_serve_stale(names: List[str], entry: CachedResponse, generations: Tuple[str, ...], now: float) -> bool:
+    """旧条目在硬过期前可以先返回，但用户权限变化后（user:<uid> 版本不同）不再使用"""
+    if now >= entry.expires_at or len(entry.generations) != len(generations):
+        return False
+    return all(
+        cached == current
+        for name, cached, current in zip(names, entry.generations, generations)
+        if name.startswith('user:')
+    )
+
+
+def cached_response(namespaces: Union[Iterable[str], Callable[..., Iterable[str]]] = (), vary: str = 'user',
+                    timeout: Optional[int] = None, user_progress: bool = False,
+                    stale_while_revalidate: bool = False):
+    """
+    缓存GET接口的成功响应（状态码200）
+
+    namespaces: 失效命名空间，或接收视图参数返回命名空间的函数
+    vary: user 按用户缓存；tenant 按租户和是否管理员缓存；public 所有人共享
+    user_progress: 响应包含当前用户的答题进度，进度变化时失效
+    stale_while_revalidate: 条目过期或失效后，在 CACHE_STALE_TTL 内由一个请求重新计算，
+        同时到达的其他请求直接使用旧值；未开启时其他请求等待该计算结果
+    放在 marshal_with 之上可以同时跳过序列化；视图也可以直接返回 Response，缓存其响应体；
+    响应头 X-Cache 为 HIT/MISS/STALE/COALESCED
+    """
+    if vary not in CACHE_VARY_OPTIONS:
+        raise ValueError(f'vary 必须是 {CACHE_VARY_OPTIONS} 之一')
+
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            if request.method != 'GET' or not cache_enabled():
+                return f(*args, **kwargs)
+
+            config = current_app.config
+            ttl = timeout or config.get('CACHE_DEFAULT_TIMEOUT', 300)
+            stale_ttl = config.get('CACHE_STALE_TTL', 0) if stale_while_revalidate else 0
+
+            claims = _request_claims() if vary != 'public' else None
+            names = list(namespaces(**kwargs) if callable(namespaces) else namespaces)
+            if claims is not None:
+                if vary == 'user':
+                    names.append(f"user:{claims['sub']}")
+                if user_progress:
+                    names.append(f"progress:{claims['sub']}")
+
+            try:
+                key = response_cache_key(_visibility_scope(vary, claims))
+                generations = tuple(namespace_generations(names))
+                entry, tier = response_store.get(key)
+            except Exception as e:
+                response_store.counters.incr('errors')
+                current_app.logger.warning(f"Response cache unavailable: {e}")
+                return f(*args, **kwargs)
+
+            now = time.time()
+            if entry is not None and entry.generations == generations and now < entry.stored_at + ttl:
+                response_store.counters.incr(f'{tier}_hits')
+                return _respond(entry.data, 200, None, 'HIT')
+
+            stale = entry if entry is not None and stale_ttl and _can_serve_stale(names, entry, generations, now) else None
+            flight_key = f"{key}|{'.'.join(generations)}"
+            flight, leader = response_store.flights.begin(flight_key)
+
+            if not leader:
+                if stale is not None:
+                    response_store.counters.incr('stale_served')
+                    return _respond(stale.data, 200, None, 'STALE')
+                if flight.event.wait(config.get('CACHE_SINGLE_FLIGHT_TIMEOUT', 10)) and not flight.failed:
+                    response_store.counters.incr('coalesced')
+                    data, code, headers = flight.result
+                    return _respond(data, code, headers, 'COALESCED')
+                # 计算超时或失败，自行计算
+                return f(*args, **kwargs)
+
+            response_store.counters.incr('misses')
+            try:
+                # 重新计算的结果会以新版本号缓存，读主库，避免把副本上的旧数据缓存一个TTL
+                with use_primary():
+                    data, code, headers = _cacheable(f(*args, **kwargs))
+            except BaseException:
+                response_store.flights.finish(flight_key, flight, failed=True)
+                raise
+
+            if code == 200:
+                try:
+                    response_store.set(key, CachedResponse(data, generations, now, now + ttl + stale_ttl), ttl + stale_ttl)
+                except Exception as e:
+                    response_store.counters.incr('errors')
+                    current_app.logger.warning(f"Failed to store response cache: {e}")
+            response_store.flights.finish(flight_key, flight, result=(data, code, headers))
+            return _respond(data, code, headers, 'MISS' if code == 200 else None)
+        return decorated_function
+    return decorator
+
+
+# ORM事件：记录受影响的命名空间，事务提交后失效
+
+def _record(target, namespaces: List[str]):
+    session = object_session(target)
+    if session is not None:
+        mark_namespaces_changed(namespaces, session)
+
+
+@event.listens_for(QuestionBank, 'after_insert')
+@event.listens_for(QuestionBank, 'after_update')
+@event.listens_for(QuestionBank, 'after_delete')
+def _bank_changed(mapper, connection, target):
+    _record(target, ['banks', f'bank:{target.id}'])
+
+
+@event.listens_for(Question, 'after_insert')
+@event.listens_for(Question, 'after_update')
+@event.listens_for(Question, 'after_delete')
+def _question_changed(mapper, connection, target):
+    _record(target, [f'bank:{target.bank_id}'])
+
+
+@event.listens_for(UserProgress, 'after_insert')
+@event.listens_for(UserProgress, 'after_update')
+@event.listens_for(UserProgress, 'after_delete')
+def _progress_changed(mapper, connection, target):
+    _record(target, [f'progress:{target.user_id}'])
+
+
+@event.listens_for(User, 'after_update')
+@event.listens_for(User, 'after_delete')
+def _user_changed(mapper, connection, target):
+    state = inspect(target)
+    if state.deleted or any(state.attrs[field].history.has_changes() for field in USER_VISIBILITY_FIELDS):
+        _record(target, [f'user:{target.id}'])
+
+
+@event.listens_for(Session, 'after_commit')
+def _invalidate_committed(session):
+    namespaces = session.info.pop(SESSION_NAMESPACES_KEY, None)
+    if namespaces:
+        invalidate_namespaces(namespaces)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_uncommitted(session):
+    session.info.pop(SESSION_NAMESPACES_KEY, None)
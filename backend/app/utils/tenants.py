@@ -0,0 +1,147 @@
+"""
+租户注册表
+所有租户（含停用的）及其设置一次性加载到进程内缓存，按 TENANT_CACHE_TIMEOUT 过期后整体重新加载；
+本进程创建、修改、删除租户时在事务提交后立即失效，其他进程最迟在TTL后看到变化。
+租户检查和按租户的功能开关从缓存读取，不查询 tenants 表
+"""
+import threading
+import time
+from typing import Any, Dict, NamedTuple, Optional
+
+from flask import current_app
+from sqlalchemy import event, select
+from sqlalchemy.orm import Session, object_session
+
+from app import db
+from app.models import Tenant
+from app.utils.db_routing import use_primary
+
+# 未配置时的缓存时间（秒）
+DEFAULT_TENANT_CACHE_TIMEOUT = 300
+
+
+class TenantInfo(NamedTuple):
+    """缓存的租户信息"""
+    id: str
+    code: str
+    name: str
+    domain: Optional[str]
+    is_active: bool
+    settings: Dict[str, Any]
+
+    def setting(self, key: str, default=None):
+        return self.settings.get(key, default)
+
+    def feature_enabled(self, feature: str, default: bool = False) -> bool:
+        """租户设置 features 中的功能开关"""
+        features = self.settings.get('features') or {}
+        return bool(features.get(feature, default))
+
+
+class TenantRegistry:
+    """按ID和代码索引的租户快照，过期或失效后下一次访问时整体重新加载"""
+
+    def __init__(self):
+        self._by_id: Dict[str, TenantInfo] = {}
+        self._by_code: Dict[str, TenantInfo] = {}
+        self._expires_at = 0.0
+        self._lock = threading.Lock()
+
+    def _load(self):
+        # 读主库：失效后从有延迟的副本重新加载会把旧设置再缓存一个TTL
+        with use_primary():
+            rows = db.session.execute(
+                select(Tenant.id, Tenant.code, Tenant.name, Tenant.domain, Tenant.is_active, Tenant.settings)
+            ).all()
+        tenants = [
+            TenantInfo(row.id, row.code, row.name, row.domain, bool(row.is_active), row.settings or {})
+            for row in rows
+        ]
+        ttl = current_app.config.get('TENANT_CACHE_TIMEOUT', DEFAULT_TENANT_CACHE_TIMEOUT)
+        self._by_id = {tenant.id: tenant for tenant in tenants}
+        self._by_code = {tenant.code: tenant for tenant in tenants}
+        self._expires_at = time.monotonic() + ttl
+
+    def _ensure_loaded(self):
+        if time.monotonic() < self._expires_at:
+            return
+        with self._lock:
+            if time.monotonic() >= self._expires_at:
+                self._load()
+
+    def get(self, tenant_id: str) -> Optional[TenantInfo]:
+        self._ensure_loaded()
+        return self._by_id.get(tenant_id)
+
+    def get_by_code(self, code: str) -> Optional[TenantInfo]:
+        self._ensure_loaded()
+        return self._by_code.get(code)
+
+    def all(self):
+        self._ensure_loaded()
+        return list(self._by_id.values())
+
+    def invalidate(self):
+        self._expires_at = 0.0
+
+
+tenant_registry = TenantRegistry()
+
+
+def get_tenant(tenant_id: Optional[str]) -> Optional[TenantInfo]:
+    """按ID获取租户，不存在时返回None"""
+    if not tenant_id:
+        return None
+    return tenant_registry.get(tenant_id)
+
+
+def get_active_tenant_by_code(code: Optional[str]) -> Optional[TenantInfo]:
+    """按租户代码获取启用中的租户"""
+    if not code:
+        return None
+    tenant = tenant_registry.get_by_code(code)
+    return tenant if tenant is not None and tenant.is_active else None
+
+
+def tenant_disabled(tenant_id: Optional[str]) -> bool:
+    """租户存在且已被停用（没有租户记录的旧数据不视为停用）"""
+    tenant = get_tenant(tenant_id)
+    return tenant is not None and not tenant.is_active
+
+
+def tenant_setting(tenant_id: Optional[str], key: str, default=None):
+    """租户设置项，租户不存在或未设置时返回默认值"""
+    tenant = get_tenant(tenant_id)
+    return tenant.setting(key, default) if tenant is not None else default
+
+
+def tenant_feature_enabled(tenant_id: Optional[str], feature: str, default: bool = False) -> bool:
+    """租户是否开启了某项功能"""
+    tenant = get_tenant(tenant_id)
+    return tenant.feature_enabled(feature, default) if tenant is not None else default
+
+
+def invalidate_tenants():
+    """使租户缓存失效，下一次访问时重新加载"""
+    tenant_registry.invalidate()
+
+
+# ORM写入租户时标记会话，事务提交后使缓存失效
+@event.listens_for(Tenant, 'after_insert')
+@event.listens_for(Tenant, 'after_update')
+@event.listens_for(Tenant, 'after_delete')
+def _mark_tenant_changed(mapper, connection, target):
+    session = object_session(target)
+    if session is not None:
+        session.info['tenants_changed'] = True
+
+
+@event.listens_for(Session, 'after_commit')
+def _invalidate_changed_tenants(session):
+    if session.info.pop('tenants_changed', False):
+        invalidate_tenants()
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_changed_tenants(session):
+    session.info.pop('tenants_changed', None)
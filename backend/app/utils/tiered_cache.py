@@ -0,0 +1,175 @@
+"""
+两级缓存
+进程内LRU（按序列化后的字节数限制总大小）在前，共享缓存后端（Flask-Caching）在后；
+同一进程内对同一个键的并发计算合并为一次（single-flight），其余请求等待结果或直接使用旧值
+"""
+import pickle
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Tuple
+
+
+class LocalLRUCache:
+    """线程安全的进程内LRU缓存：key -> (过期时间, 字节数, 值)"""
+
+    def __init__(self, max_bytes: int, max_item_bytes: int):
+        self.max_bytes = max_bytes
+        self.max_item_bytes = max_item_bytes
+        self.current_bytes = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, size, value = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                self.current_bytes -= size
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value, size: int, ttl: float):
+        if size > self.max_item_bytes or ttl <= 0:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.current_bytes -= previous[1]
+            self._entries[key] = (time.monotonic() + ttl, size, value)
+            self.current_bytes += size
+            while self.current_bytes > self.max_bytes and self._entries:
+                _, (_, evicted_size, _) = self._entries.popitem(last=False)
+                self.current_bytes -= evicted_size
+
+    def delete(self, key: str):
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is not None:
+                self.current_bytes -= entry[1]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.current_bytes = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class _Flight:
+    __slots__ = ('event', 'result', 'failed')
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.failed = False
+
+
+class SingleFlight:
+    """同一个键同时只有一个线程计算，其余线程等待该结果"""
+
+    def __init__(self):
+        self._flights: Dict[str, _Flight] = {}
+        self._lock = threading.Lock()
+
+    def begin(self, key: str) -> Tuple[_Flight, bool]:
+        """返回 (flight, 是否由当前线程负责计算)"""
+        with self._lock:
+            flight = self._flights.get(key)
+            if flight is not None:
+                return flight, False
+            flight = self._flights[key] = _Flight()
+            return flight, True
+
+    def finish(self, key: str, flight: _Flight, result=None, failed: bool = False):
+        flight.result = result
+        flight.failed = failed
+        with self._lock:
+            if self._flights.get(key) is flight:
+                del self._flights[key]
+        flight.event.set()
+
+    def in_flight(self) -> int:
+        return len(self._flights)
+
+
+class CacheCounters:
+    """命中、未命中、合并等计数"""
+
+    FIELDS = ('local_hits', 'shared_hits', 'misses', 'coalesced', 'stale_served', 'errors')
+
+    def __init__(self):
+        self._values = dict.fromkeys(self.FIELDS, 0)
+        self._lock = threading.Lock()
+
+    def incr(self, field: str, amount: int = 1):
+        with self._lock:
+            self._values[field] += amount
+
+    def snapshot(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._values)
+
+    def reset(self):
+        with self._lock:
+            self._values = dict.fromkeys(self.FIELDS, 0)
+
+
+class TwoTierCache:
+    """
+    进程内LRU + 共享后端
+
+    local_enabled 为False时（共享后端本身就在进程内，如SimpleCache）只使用共享后端
+    """
+
+    def __init__(self, backend_getter: Callable[[], Any]):
+        self._backend_getter = backend_getter
+        self.local: Optional[LocalLRUCache] = None
+        self.flights = SingleFlight()
+        self.counters = CacheCounters()
+
+    def configure(self, local_enabled: bool, max_bytes: int, max_item_bytes: int):
+        self.local = LocalLRUCache(max_bytes, max_item_bytes) if local_enabled else None
+
+    @property
+    def backend(self):
+        return self._backend_getter()
+
+    def get(self, key: str) -> Tuple[Any, Optional[str]]:
+        """返回 (值, 来源 local/shared)，未找到时为 (None, None)；是否计为命中由调用方判断"""
+        if self.local is not None:
+            value = self.local.get(key)
+            if value is not None:
+                return value, 'local'
+
+        value = self.backend.get(key)
+        if value is None:
+            return None, None
+        if self.local is not None:
+            self.local.set(key, value, len(pickle.dumps(value, pickle.HIGHEST_PROTOCOL)), self._local_ttl(value))
+        return value, 'shared'
+
+    def set(self, key: str, value, timeout: int):
+        self.backend.set(key, value, timeout=timeout)
+        if self.local is not None:
+            self.local.set(key, value, len(pickle.dumps(value, pickle.HIGHEST_PROTOCOL)), timeout)
+
+    @staticmethod
+    def _local_ttl(value) -> float:
+        expires_at = getattr(value, 'expires_at', None)
+        return expires_at - time.time() if expires_at else 0
+
+    def stats(self) -> Dict[str, Any]:
+        stats = self.counters.snapshot()
+        stats['in_flight'] = self.flights.in_flight()
+        if self.local is not None:
+            stats['local_items'] = len(self.local)
+            stats['local_bytes'] = self.local.current_bytes
+        lookups = stats['local_hits'] + stats['shared_hits'] + stats['misses']
+        stats['hit_rate'] = round((stats['local_hits'] + stats['shared_hits']) / lookups, 4) if lookups else None
+        return stats
@@ -27,6 +27,22 @@ class Config:
         'pool_timeout': 20,
         'max_overflow': 0
     }
+
+    # 连接池配置: 从 app/config/optimization.py 选取环境的连接池参数（development / production / testing），
+    # 不设置时使用上面的默认参数；DB_POOL_SIZE / DB_MAX_OVERFLOW / DB_POOL_TIMEOUT 单独覆盖
+    DB_POOL_PROFILE = os.environ.get('DB_POOL_PROFILE')
+    DB_POOL_SIZE = int(os.environ['DB_POOL_SIZE']) if os.environ.get('DB_POOL_SIZE') else None
+    DB_MAX_OVERFLOW = int(os.environ['DB_MAX_OVERFLOW']) if os.environ.get('DB_MAX_OVERFLOW') else None
+    DB_POOL_TIMEOUT = int(os.environ['DB_POOL_TIMEOUT']) if os.environ.get('DB_POOL_TIMEOUT') else None
+    DB_POOL_SATURATION_LOG_SECONDS = 60  # 连接池占满的告警日志最短间隔
+
+    # 只读副本（逗号分隔的数据库URI）；只读请求的查询路由到副本，见 app/utils/db_routing.py
+    SQLALCHEMY_REPLICA_URIS = os.environ.get('SQLALCHEMY_REPLICA_URIS') or ''
+    # 副本复制延迟超过该秒数时回退到主库；延迟每隔 REPLICA_LAG_CHECK_SECONDS 秒检查一次
+    REPLICA_MAX_LAG_SECONDS = int(os.environ.get('REPLICA_MAX_LAG_SECONDS') or 5)
+    REPLICA_LAG_CHECK_SECONDS = int(os.environ.get('REPLICA_LAG_CHECK_SECONDS') or 5)
+    # 用户提交写入后该秒数内的请求都读主库（读己之写），应大于副本的正常复制延迟
+    READ_YOUR_WRITES_SECONDS = int(os.environ.get('READ_YOUR_WRITES_SECONDS') or 5)
     
     # JWT配置
     JWT_SECRET_KEY = 'jwt-secret-key-questionbank-master-2024'  # 固定密钥用于开发
@@ -36,8 +52,68 @@ class Config:
     # 文件上传配置
     UPLOAD_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'uploads')
     MAX_CONTENT_LENGTH = 50 * 1024 * 1024  # 50MB
-    ALLOWED_EXTENSIONS = {'pdf', 'docx', 'xlsx', 'json'}
-    
+    ALLOWED_EXTENSIONS = {'pdf', 'docx', 'xlsx', 'json', 'parquet'}
+
+    # 分片上传配置（内容寻址存储）
+    UPLOAD_CHUNK_SIZE = 5 * 1024 * 1024  # 默认分片大小5MB
+    UPLOAD_MAX_CHUNK_SIZE = 20 * 1024 * 1024  # 客户端可指定的最大分片
+    UPLOAD_SESSION_EXPIRES = timedelta(hours=24)  # 未完成上传的保留时间
+
+    # 导出缓存配置（渲染后的PDF/DOCX/XLSX/Markdown文件）
+    EXPORT_CACHE_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'export_cache')
+    EXPORT_CACHE_MAX_BYTES = int(os.environ.get('EXPORT_CACHE_MAX_BYTES') or 1024 * 1024 * 1024)  # 1GB
+
+    # 权限检查字段（角色、租户、是否激活）的进程内缓存；用户修改后本进程立即失效，其他进程最迟TTL秒后失效
+    AUTH_IDENTITY_CACHE_TTL = int(os.environ.get('AUTH_IDENTITY_CACHE_TTL') or 60)
+    AUTH_IDENTITY_CACHE_SIZE = 10000
+
+    # 租户注册表（租户信息和设置）的进程内缓存时间；本进程修改租户后立即失效
+    TENANT_CACHE_TIMEOUT = int(os.environ.get('TENANT_CACHE_TIMEOUT') or 300)
+
+    # 授权模式: database 从数据库读取角色和租户；claims 只读请求直接信任令牌声明（零查询）
+    AUTHZ_MODE = os.environ.get('AUTHZ_MODE') or 'database'
+    # claims 模式下访问令牌的有效期上限，用户权限变化最迟在该时间后生效
+    AUTHZ_CLAIMS_TOKEN_EXPIRES = timedelta(minutes=int(os.environ.get('AUTHZ_CLAIMS_TOKEN_MINUTES') or 15))
+
+    # JWT撤销检查：登出、修改密码、禁用账户后令牌立即失效（本进程）或在同步间隔后失效（其他进程）
+    JWT_REVOCATION_ENABLED = os.environ.get('JWT_REVOCATION_ENABLED', 'true').lower() in ['true', 'on', '1']
+    TOKEN_REVOCATION_REFRESH_SECONDS = int(os.environ.get('TOKEN_REVOCATION_REFRESH_SECONDS') or 5)
+    TOKEN_REVOCATION_RECENT_WINDOW = timedelta(hours=1)  # 最近撤销的jti精确保存在内存中
+    TOKEN_REVOCATION_BLOOM_CAPACITY = int(os.environ.get('TOKEN_REVOCATION_BLOOM_CAPACITY') or 100000)
+    TOKEN_REVOCATION_BLOOM_ERROR_RATE = 0.001
+    TOKEN_REVOCATION_REDIS_URL = os.environ.get('TOKEN_REVOCATION_REDIS_URL')  # 配置后各进程经Redis同步撤销记录
+    # 撤销数据（数据库/Redis）不可用时是否放行令牌；默认拒绝，避免已撤销的令牌在故障期间有效
+    TOKEN_REVOCATION_FAIL_OPEN = os.environ.get('TOKEN_REVOCATION_FAIL_OPEN', 'false').lower() in ['true', 'on', '1']
+
+    # 速率限制：每个进程本地令牌桶；配置 RATELIMIT_STORAGE_URL 后经Redis滑动窗口在所有进程间共享额度
+    RATELIMIT_ENABLED = os.environ.get('RATELIMIT_ENABLED', 'true').lower() in ['true', 'on', '1']
+    RATELIMIT_STORAGE_URL = os.environ.get('RATELIMIT_STORAGE_URL')
+    RATELIMIT_LOGIN = os.environ.get('RATELIMIT_LOGIN') or '5 per minute'  # 按IP
+    RATELIMIT_ANSWER = os.environ.get('RATELIMIT_ANSWER') or '120 per minute'  # 练习和考试提交答案
+    RATELIMIT_UPLOAD = os.environ.get('RATELIMIT_UPLOAD') or '20 per hour'
+    RATELIMIT_EXPORT = os.environ.get('RATELIMIT_EXPORT') or '30 per hour'
+    RATELIMIT_TENANT_MULTIPLIER = int(os.environ.get('RATELIMIT_TENANT_MULTIPLIER') or 20)  # 租户额度为单用户的倍数
+    RATELIMIT_IP_MULTIPLIER = int(os.environ.get('RATELIMIT_IP_MULTIPLIER') or 10)  # 已登录请求按IP的额度为单用户的倍数
+
+    # 应用前的可信反向代理层数，按 X-Forwarded-For / X-Forwarded-Proto 还原客户端地址；0 表示直接面向客户端
+    PROXY_FIX_HOPS = int(os.environ.get('PROXY_FIX_HOPS') or 0)
+
+    # 每个请求记录两条INFO访问日志（请求和响应），默认关闭；通常由nginx的访问日志代替
+    REQUEST_LOGGING_ENABLED = os.environ.get('REQUEST_LOGGING_ENABLED', 'false').lower() in ['true', 'on', '1']
+
+    # create_app 时预热PDF渲染（注册中文字体、构建样式）；默认关闭，避免每个flask命令和导出渲染进程都注册字体。
+    # gunicorn工作进程由 gunicorn.conf.py 在启动后预热
+    PDF_WARMUP_ON_START = os.environ.get('PDF_WARMUP_ON_START', 'false').lower() in ['true', 'on', '1']
+
+    # 异步导出任务配置
+    EXPORT_JOB_WORKERS = int(os.environ.get('EXPORT_JOB_WORKERS') or 2)  # 每个Web进程的渲染进程数
+    EXPORT_JOB_TENANT_CONCURRENCY = int(os.environ.get('EXPORT_JOB_TENANT_CONCURRENCY') or 2)  # 每个租户同时运行的任务数
+    EXPORT_JOB_RETENTION = timedelta(days=7)  # 已结束任务记录和结果文件的保留时间
+    EXPORT_JOB_FOLDER = os.environ.get('EXPORT_JOB_FOLDER') or \
+        os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'export_jobs')  # 任务结果文件
+    EXPORT_JOB_HEARTBEAT_SECONDS = int(os.environ.get('EXPORT_JOB_HEARTBEAT_SECONDS') or 30)
+    EXPORT_JOB_STALE_SECONDS = int(os.environ.get('EXPORT_JOB_STALE_SECONDS') or 120)  # 心跳超时后任务视为失败
+
     # CORS配置
     CORS_ORIGINS = [
         'http://localhost:3000', 'http://127.0.0.1:3000',
@@ -48,6 +124,35 @@ class Config:
         'https://*.zicp.fun'           # 支持所有zicp.fun子域名HTTPS
     ]
     
+    # 接口响应缓存: simple 进程内 / filesystem 本机共享 / redis 多机共享 / null 关闭
+    # 多进程部署建议使用 redis，进程内缓存在其他进程修改数据后只能等待TTL过期
+    CACHE_BACKEND = os.environ.get('CACHE_BACKEND') or 'simple'
+    CACHE_DEFAULT_TIMEOUT = int(os.environ.get('CACHE_DEFAULT_TIMEOUT') or 300)
+    CACHE_KEY_PREFIX = 'qbm:'
+    CACHE_THRESHOLD = 5000  # simple/filesystem 后端的最大条目数
+    CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'response_cache')
+    CACHE_REDIS_URL = os.environ.get('CACHE_REDIS_URL') or 'redis://localhost:6379/1'
+    RESPONSE_CACHE_ENABLED = os.environ.get('RESPONSE_CACHE_ENABLED', 'true').lower() in ['true', 'on', '1']
+    CACHE_LOCAL_MAX_BYTES = int(os.environ.get('CACHE_LOCAL_MAX_BYTES') or 64 * 1024 * 1024)  # 共享后端前的进程内缓存层
+    CACHE_LOCAL_MAX_ITEM_BYTES = 1024 * 1024  # 超过该大小的条目只存共享后端
+    CACHE_STALE_TTL = int(os.environ.get('CACHE_STALE_TTL') or 60)  # 开启旧值重验证的接口，过期后仍可返回旧值的秒数
+    CACHE_SINGLE_FLIGHT_TIMEOUT = 10  # 等待同一条目并发计算结果的最长秒数
+    QUESTION_PAYLOAD_CACHE_BYTES = int(os.environ.get('QUESTION_PAYLOAD_CACHE_BYTES') or 128 * 1024 * 1024)  # 每个进程题目JSON片段缓存的总大小
+
+    # 缓存预热：按近期答题量选出热门题库，预先加载题目片段和公开题库的响应缓存
+    CACHE_WARMUP_ON_START = os.environ.get('CACHE_WARMUP_ON_START', 'false').lower() in ['true', 'on', '1']
+    CACHE_WARMUP_BANKS = int(os.environ.get('CACHE_WARMUP_BANKS') or 20)
+    CACHE_WARMUP_DAYS = int(os.environ.get('CACHE_WARMUP_DAYS') or 7)  # 统计答题量的天数
+    CACHE_WARMUP_PAGES = int(os.environ.get('CACHE_WARMUP_PAGES') or 1)  # 每个题库预热的题目列表页数
+    CACHE_WARMUP_CONCURRENCY = int(os.environ.get('CACHE_WARMUP_CONCURRENCY') or 4)
+
+    # 答题记录生命周期：已汇总且超过保留期的原始记录按月写入冷存储后删除
+    ANSWER_RETENTION_DAYS = int(os.environ.get('ANSWER_RETENTION_DAYS') or 180)
+    ANSWER_ARCHIVE_FOLDER = os.environ.get('ANSWER_ARCHIVE_FOLDER') or \
+        os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'answer_archive')
+    ANSWER_ARCHIVE_BATCH_SIZE = int(os.environ.get('ANSWER_ARCHIVE_BATCH_SIZE') or 10000)  # 每批删除的行数
+    ANSWER_PARTITION_MONTHS_AHEAD = int(os.environ.get('ANSWER_PARTITION_MONTHS_AHEAD') or 3)  # MySQL预建分区的月数
+
     # 分页配置
     QUESTIONS_PER_PAGE = 20
     BANKS_PER_PAGE = 10
@@ -68,21 +173,35 @@ class Config:
         # 确保上传目录存在
         os.makedirs(Config.UPLOAD_FOLDER, exist_ok=True)
 
+        # claims 授权模式使用短有效期的访问令牌
+        if app.config['AUTHZ_MODE'] == 'claims':
+            app.config['JWT_ACCESS_TOKEN_EXPIRES'] = min(
+                app.config['JWT_ACCESS_TOKEN_EXPIRES'], app.config['AUTHZ_CLAIMS_TOKEN_EXPIRES']
+            )
+
 class DevelopmentConfig(Config):
     """开发环境配置"""
     DEBUG = True
     TESTING = False
+    DB_POOL_PROFILE = os.environ.get('DB_POOL_PROFILE') or 'development'
 
 class TestingConfig(Config):
     """测试环境配置"""
     TESTING = True
     SQLALCHEMY_DATABASE_URI = 'sqlite:///:memory:'
     WTF_CSRF_ENABLED = False
+    PDF_WARMUP_ON_START = False
+    RATELIMIT_ENABLED = False
+    CACHE_BACKEND = 'null'
 
 class ProductionConfig(Config):
     """生产环境配置"""
     DEBUG = False
     TESTING = False
+    DB_POOL_PROFILE = os.environ.get('DB_POOL_PROFILE') or 'production'
+
+    # 生产环境经 nginx 转发；前面再有负载均衡时设为 2
+    PROXY_FIX_HOPS = int(os.environ.get('PROXY_FIX_HOPS') or 1)
     
     # 生产环境安全配置
     SESSION_COOKIE_SECURE = True
@@ -0,0 +1,13 @@
+"""
+Gunicorn配置（命令行参数见 Dockerfile.prod）
+
+工作进程加载应用后预热PDF渲染上下文（注册中文字体、构建样式），避免首个PDF导出请求承担初始化开销；
+只在Web工作进程中执行，flask 命令行和导出任务的渲染进程不经过这里
+"""
+
+
+def post_worker_init(worker):
+    from app.utils.export import warm_pdf_renderer
+
+    if warm_pdf_renderer():
+        worker.log.info("PDF renderer warmed up")
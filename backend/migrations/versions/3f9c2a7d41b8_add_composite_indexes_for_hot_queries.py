@@ -0,0 +1,70 @@
+"""add composite indexes for hot queries
+
+Revision ID: 3f9c2a7d41b8
+Revises: f2c6a8e4b9d1
+Create Date: 2026-10-19 10:12:00.000000
+
+表结构由 flask init-db（db.create_all）创建，新部署时这些索引已随模型建立；
+本迁移只为已有数据库补建缺少的索引，已存在的索引跳过
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3f9c2a7d41b8'
+down_revision = 'f2c6a8e4b9d1'
+branch_labels = None
+depends_on = None
+
+
+# (表, 索引名, 列)
+INDEXES = [
+    ('user_answers', 'idx_answer_user_bank', ['user_id', 'bank_id', 'answered_at']),
+    ('user_answers', 'idx_answer_question_correct', ['question_id', 'is_correct']),
+    ('user_answers', 'idx_answer_bank_correct', ['bank_id', 'is_correct']),
+    ('questions', 'idx_question_bank_order', ['bank_id', 'order_index']),
+    ('questions', 'idx_question_bank_type_difficulty', ['bank_id', 'type', 'difficulty', 'order_index']),
+    ('exam_attempts', 'idx_attempt_exam_user_status', ['exam_id', 'user_id', 'status']),
+    ('file_imports', 'idx_import_user_status_created', ['user_id', 'status', 'created_at']),
+    ('user_sessions', 'ix_user_sessions_active_updated', ['is_active', 'updated_at']),
+]
+
+
+def _existing_indexes(table):
+    return {index['name']: index['column_names'] for index in sa.inspect(op.get_bind()).get_indexes(table)}
+
+
+def _foreign_key_columns(table):
+    return {
+        column
+        for foreign_key in sa.inspect(op.get_bind()).get_foreign_keys(table)
+        for column in foreign_key['constrained_columns']
+    }
+
+
+def upgrade():
+    existing = {}
+    for table, name, columns in INDEXES:
+        if table not in existing:
+            existing[table] = _existing_indexes(table)
+        if name not in existing[table]:
+            op.create_index(name, table, columns)
+
+
+def downgrade():
+    is_mysql = op.get_bind().dialect.name == 'mysql'
+    for table, name, columns in reversed(INDEXES):
+        existing = _existing_indexes(table)
+        if name not in existing:
+            continue
+        # MySQL建立以外键列开头的复合索引时会删除自动创建的外键单列索引，
+        # 删除复合索引前需要先补建，否则报 "needed in a foreign key constraint"
+        first_column = columns[0]
+        if is_mysql and first_column in _foreign_key_columns(table) and not any(
+            index_columns and index_columns[0] == first_column
+            for index_name, index_columns in existing.items() if index_name != name
+        ):
+            op.create_index(f'ix_{table}_{first_column}', table, [first_column])
+        op.drop_index(name, table_name=table)
@@ -0,0 +1,43 @@
+"""add answer rollups
+
+Revision ID: 8b41d6e02c5a
+Revises: 3f9c2a7d41b8
+Create Date: 2026-10-19 15:40:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8b41d6e02c5a'
+down_revision = '3f9c2a7d41b8'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # init-db 创建的新库已包含该表
+    if sa.inspect(op.get_bind()).has_table('answer_rollups'):
+        return
+    op.create_table(
+        'answer_rollups',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('day', sa.Date(), nullable=False),
+        sa.Column('grain', sa.Enum('user', 'bank', 'question'), nullable=False),
+        sa.Column('subject_id', sa.Integer(), nullable=False),
+        sa.Column('bank_id', sa.Integer(), nullable=True),
+        sa.Column('attempts', sa.Integer(), nullable=False),
+        sa.Column('correct', sa.Integer(), nullable=False),
+        sa.Column('total_score', sa.BigInteger(), nullable=False),
+        sa.Column('total_time_spent', sa.BigInteger(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('grain', 'subject_id', 'day', name='uq_rollup_grain_subject_day')
+    )
+    op.create_index('idx_rollup_day', 'answer_rollups', ['day'])
+
+
+def downgrade():
+    op.drop_index('idx_rollup_day', table_name='answer_rollups')
+    op.drop_table('answer_rollups')
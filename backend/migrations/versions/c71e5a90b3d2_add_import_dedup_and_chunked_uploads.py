@@ -0,0 +1,68 @@
+"""add import dedup and chunked uploads
+
+Revision ID: c71e5a90b3d2
+Revises:
+Create Date: 2026-10-19 09:30:00.000000
+
+- file_imports.content_hash：文件内容SHA-256，用于去重和复用解析结果
+- 新表 chunked_uploads：分片上传会话
+
+表结构由 flask init-db（db.create_all）创建，新部署时已包含这些列和表；
+本迁移只为已有数据库补建缺少的部分，已存在的跳过
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c71e5a90b3d2'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+
+    if 'content_hash' not in {column['name'] for column in inspector.get_columns('file_imports')}:
+        op.add_column('file_imports', sa.Column('content_hash', sa.String(64), nullable=True))
+    if 'ix_file_imports_content_hash' not in {index['name'] for index in inspector.get_indexes('file_imports')}:
+        op.create_index('ix_file_imports_content_hash', 'file_imports', ['content_hash'])
+
+    if not inspector.has_table('chunked_uploads'):
+        op.create_table(
+            'chunked_uploads',
+            sa.Column('id', sa.String(32), nullable=False),
+            sa.Column('user_id', sa.Integer(), nullable=False),
+            sa.Column('bank_id', sa.Integer(), nullable=True),
+            sa.Column('filename', sa.String(255), nullable=False),
+            sa.Column('file_type', sa.String(10), nullable=False),
+            sa.Column('file_size', sa.BigInteger(), nullable=False),
+            sa.Column('chunk_size', sa.Integer(), nullable=False),
+            sa.Column('total_chunks', sa.Integer(), nullable=False),
+            sa.Column('sha256', sa.String(64), nullable=True),
+            sa.Column('status', sa.Enum('uploading', 'completed', 'expired'), nullable=True),
+            sa.Column('import_id', sa.Integer(), nullable=True),
+            sa.Column('created_at', sa.DateTime(), nullable=True),
+            sa.Column('expires_at', sa.DateTime(), nullable=False),
+            sa.ForeignKeyConstraint(['user_id'], ['users.id']),
+            sa.ForeignKeyConstraint(['bank_id'], ['question_banks.id']),
+            sa.ForeignKeyConstraint(['import_id'], ['file_imports.id']),
+            sa.PrimaryKeyConstraint('id')
+        )
+        op.create_index('ix_chunked_uploads_user_id', 'chunked_uploads', ['user_id'])
+        op.create_index('ix_chunked_uploads_status', 'chunked_uploads', ['status'])
+        op.create_index('ix_chunked_uploads_expires_at', 'chunked_uploads', ['expires_at'])
+
+
+def downgrade():
+    inspector = sa.inspect(op.get_bind())
+
+    if inspector.has_table('chunked_uploads'):
+        op.drop_table('chunked_uploads')
+
+    if 'ix_file_imports_content_hash' in {index['name'] for index in inspector.get_indexes('file_imports')}:
+        op.drop_index('ix_file_imports_content_hash', table_name='file_imports')
+    with op.batch_alter_table('file_imports') as batch_op:
+        batch_op.drop_column('content_hash')
@@ -0,0 +1,39 @@
+"""add import merge mode
+
+Revision ID: d4a8f1c2e6b7
+Revises: c71e5a90b3d2
+Create Date: 2026-10-19 09:40:00.000000
+
+file_imports、chunked_uploads 增加 merge_mode（导入到已有题库时的合并模式）；已存在的列跳过
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd4a8f1c2e6b7'
+down_revision = 'c71e5a90b3d2'
+branch_labels = None
+depends_on = None
+
+
+TABLES = ('file_imports', 'chunked_uploads')
+MERGE_MODES = ('append', 'replace', 'sync')
+
+
+def _has_merge_mode(table):
+    return 'merge_mode' in {column['name'] for column in sa.inspect(op.get_bind()).get_columns(table)}
+
+
+def upgrade():
+    for table in TABLES:
+        if not _has_merge_mode(table):
+            op.add_column(table, sa.Column('merge_mode', sa.Enum(*MERGE_MODES), nullable=True))
+
+
+def downgrade():
+    for table in reversed(TABLES):
+        if _has_merge_mode(table):
+            with op.batch_alter_table(table) as batch_op:
+                batch_op.drop_column('merge_mode')
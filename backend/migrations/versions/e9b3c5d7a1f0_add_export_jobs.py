@@ -0,0 +1,49 @@
+"""add export jobs
+
+Revision ID: e9b3c5d7a1f0
+Revises: d4a8f1c2e6b7
+Create Date: 2026-10-19 09:50:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e9b3c5d7a1f0'
+down_revision = 'd4a8f1c2e6b7'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # init-db 创建的新库已包含该表
+    if sa.inspect(op.get_bind()).has_table('export_jobs'):
+        return
+    op.create_table(
+        'export_jobs',
+        sa.Column('id', sa.String(32), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('tenant_id', sa.String(50), nullable=False),
+        sa.Column('bank_id', sa.Integer(), nullable=False),
+        sa.Column('format', sa.String(20), nullable=False),
+        sa.Column('include_answers', sa.Boolean(), nullable=False),
+        sa.Column('status', sa.Enum('pending', 'running', 'completed', 'failed'), nullable=False),
+        sa.Column('progress', sa.Integer(), nullable=False),
+        sa.Column('file_path', sa.String(500), nullable=True),
+        sa.Column('download_name', sa.String(255), nullable=True),
+        sa.Column('error_message', sa.Text(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('started_at', sa.DateTime(), nullable=True),
+        sa.Column('completed_at', sa.DateTime(), nullable=True),
+        sa.Column('heartbeat_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id']),
+        sa.ForeignKeyConstraint(['bank_id'], ['question_banks.id']),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_export_jobs_user_id', 'export_jobs', ['user_id'])
+    op.create_index('idx_export_job_tenant_status', 'export_jobs', ['tenant_id', 'status'])
+
+
+def downgrade():
+    op.drop_table('export_jobs')
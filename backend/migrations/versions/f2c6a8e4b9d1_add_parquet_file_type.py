@@ -0,0 +1,45 @@
+"""add parquet file type
+
+Revision ID: f2c6a8e4b9d1
+Revises: e9b3c5d7a1f0
+Create Date: 2026-10-19 10:00:00.000000
+
+file_imports.file_type 增加 parquet；只有MySQL的ENUM需要修改列定义，SQLite中枚举为普通字符串列
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f2c6a8e4b9d1'
+down_revision = 'e9b3c5d7a1f0'
+branch_labels = None
+depends_on = None
+
+
+FILE_TYPES = ('pdf', 'docx', 'xlsx', 'json')
+
+
+def upgrade():
+    if op.get_bind().dialect.name != 'mysql':
+        return
+    op.alter_column(
+        'file_imports', 'file_type',
+        existing_type=sa.Enum(*FILE_TYPES),
+        type_=sa.Enum(*FILE_TYPES, 'parquet'),
+        existing_nullable=False
+    )
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'mysql':
+        return
+    # parquet 导入记录无法用旧的枚举表示
+    op.execute("DELETE FROM file_imports WHERE file_type = 'parquet'")
+    op.alter_column(
+        'file_imports', 'file_type',
+        existing_type=sa.Enum(*FILE_TYPES, 'parquet'),
+        type_=sa.Enum(*FILE_TYPES),
+        existing_nullable=False
+    )
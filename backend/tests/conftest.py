@@ -2,21 +2,21 @@
 测试配置文件
 """
 import pytest
-import tempfile
 import os
+import shutil
+import tempfile
 from app import create_app, db
 from app.models import User, Tenant, QuestionBank, Question
 
 @pytest.fixture
 def app():
     """创建测试应用"""
-    # 创建临时数据库文件
-    db_fd, db_path = tempfile.mkstemp()
+    # 测试配置使用内存SQLite数据库；上传文件写入临时目录
+    upload_folder = tempfile.mkdtemp()
     
-    app = create_app({
-        'TESTING': True,
-        'SQLALCHEMY_DATABASE_URI': f'sqlite:///{db_path}',
-        'WTF_CSRF_ENABLED': False,
+    app = create_app('testing')
+    app.config.update({
+        'UPLOAD_FOLDER': upload_folder,
         'JWT_SECRET_KEY': 'test-secret-key',
         'SECRET_KEY': 'test-secret-key'
     })
@@ -37,8 +37,10 @@ def app():
     yield app
     
     # 清理
-    os.close(db_fd)
-    os.unlink(db_path)
+    with app.app_context():
+        db.session.remove()
+        db.drop_all()
+    shutil.rmtree(upload_folder, ignore_errors=True)
 
 @pytest.fixture
 def client(app):
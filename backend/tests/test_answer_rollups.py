@@ -0,0 +1,54 @@
+"""
+答题记录汇总和归档后的统计测试
+"""
+from datetime import datetime, timedelta
+
+from app import db
+from app.models import AnswerRollup, Question, QuestionBank, User, UserAnswer
+from app.services.answer_lifecycle import maintain_answer_log
+
+
+def _statistics(user_id, question_ids, bank_id):
+    return (
+        db.session.get(User, user_id).get_statistics(),
+        [db.session.get(Question, question_id).get_statistics() for question_id in question_ids],
+        db.session.get(QuestionBank, bank_id).get_statistics(),
+    )
+
+
+def test_statistics_unchanged_after_archiving(app, auth_headers, tmp_path):
+    app.config['ANSWER_ARCHIVE_FOLDER'] = str(tmp_path)
+    now = datetime.utcnow()
+
+    with app.app_context():
+        user = User.query.filter_by(username='testuser').first()
+        bank = QuestionBank(name='统计题库', creator_id=user.id, tenant_id=user.tenant_id)
+        db.session.add(bank)
+        db.session.flush()
+        questions = [
+            Question(bank_id=bank.id, type='true_false', title=f'题目{i}', content={},
+                     answer={'is_true': True}, order_index=i)
+            for i in range(2)
+        ]
+        db.session.add_all(questions)
+        db.session.flush()
+        for i in range(60):
+            db.session.add(UserAnswer(
+                user_id=user.id, question_id=questions[i % 2].id, bank_id=bank.id,
+                user_answer={'is_true': True}, is_correct=i % 3 == 0, score=i % 3 == 0 and 1 or 0,
+                time_spent=10 + i, answered_at=now - timedelta(days=i * 7, hours=1)
+            ))
+        db.session.commit()
+
+        user_id, bank_id = user.id, bank.id
+        question_ids = [question.id for question in questions]
+        before = _statistics(user_id, question_ids, bank_id)
+
+        result = maintain_answer_log(retention_days=180)
+        assert result['archived']
+        assert UserAnswer.query.count() < 60
+        assert AnswerRollup.query.filter_by(grain='question').count() > 0
+
+        after = _statistics(user_id, question_ids, bank_id)
+        assert after == before
+        assert before[0]['total_answers'] == 60
@@ -0,0 +1,35 @@
+"""
+多题库归档导出的权限测试
+"""
+import pytest
+
+from app import db
+from app.models import QuestionBank, User
+from app.utils.export_archive import archive_bank_ids
+
+
+@pytest.fixture
+def other_bank(app, admin_headers):
+    with app.app_context():
+        admin = User.query.filter_by(username='admin').first()
+        bank = QuestionBank(name='他人的题库', creator_id=admin.id, tenant_id=admin.tenant_id)
+        db.session.add(bank)
+        db.session.commit()
+        return bank.id
+
+
+def test_deactivated_account_cannot_archive(app, client, auth_headers, other_bank):
+    with app.app_context():
+        user = User.query.filter_by(username='testuser').first()
+        user.is_active = False
+        db.session.commit()
+
+    response = client.get(f'/api/v1/banks/export-archive?bank_ids={other_bank}', headers=auth_headers)
+    assert response.status_code in (401, 403, 404)
+
+
+def test_missing_identity_is_not_unrestricted(app, other_bank):
+    with app.app_context():
+        with pytest.raises(ValueError):
+            archive_bank_ids(None)
+        assert archive_bank_ids(None, unrestricted=True) == [other_bank]
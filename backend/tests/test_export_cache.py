@@ -0,0 +1,54 @@
+"""
+题库导出缓存测试
+"""
+import os
+
+import pytest
+
+from app import db
+from app.models import Question, QuestionBank, User
+from app.services.export_cache import ExportCache
+
+
+@pytest.fixture
+def bank_id(app, auth_headers, tmp_path):
+    app.config['EXPORT_CACHE_FOLDER'] = str(tmp_path)
+    with app.app_context():
+        user = User.query.filter_by(username='testuser').first()
+        bank = QuestionBank(name='缓存题库', creator_id=user.id, tenant_id=user.tenant_id)
+        db.session.add(bank)
+        db.session.flush()
+        db.session.add(Question(bank_id=bank.id, type='true_false', title='题目', content={},
+                                answer={'is_true': True}, order_index=0))
+        db.session.commit()
+        return bank.id
+
+
+def _cached_files(app):
+    return [name for _, _, names in os.walk(app.config['EXPORT_CACHE_FOLDER']) for name in names]
+
+
+def test_cache_shared_across_users(app, client, auth_headers, admin_headers, bank_id):
+    url = f'/api/v1/banks/{bank_id}/export?format=markdown'
+    first = client.get(url, headers=auth_headers)
+    second = client.get(url, headers=admin_headers)
+    assert first.status_code == second.status_code == 200
+    assert first.data == second.data
+    assert 'testuser' not in first.data.decode('utf-8')
+    assert len(_cached_files(app)) == 1
+
+    partial = client.get(url, headers={**auth_headers, 'Range': 'bytes=0-9'})
+    assert partial.status_code == 206
+    assert partial.data == first.data[:10]
+
+
+def test_download_survives_invalidation(app, client, auth_headers, bank_id):
+    url = f'/api/v1/banks/{bank_id}/export?format=markdown'
+    expected = client.get(url, headers=auth_headers).data
+
+    response = client.get(url, headers=auth_headers, buffered=False)
+    with app.app_context():
+        ExportCache().invalidate(bank_id)
+    assert _cached_files(app) == []
+    assert b''.join(response.response) == expected
+    response.close()
@@ -0,0 +1,79 @@
+"""
+异步导出任务调度测试（进程池替换为记录提交的假执行器）
+"""
+from concurrent.futures import Future
+from datetime import datetime, timedelta
+
+import pytest
+
+from app import db
+from app.models import ExportJob, QuestionBank, User
+from app.services import export_jobs
+
+
+class RecordingExecutor:
+    def __init__(self):
+        self.submitted = []
+
+    def submit(self, func, job_id):
+        self.submitted.append(job_id)
+        return Future()
+
+
+@pytest.fixture
+def executor(monkeypatch):
+    executor = RecordingExecutor()
+    monkeypatch.setattr(export_jobs, '_get_executor', lambda app: executor)
+    return executor
+
+
+@pytest.fixture
+def add_job(app, auth_headers):
+    with app.app_context():
+        user = User.query.filter_by(username='testuser').first()
+        bank = QuestionBank(name='导出题库', creator_id=user.id, tenant_id=user.tenant_id)
+        db.session.add(bank)
+        db.session.commit()
+        user_id, bank_id = user.id, bank.id
+
+    def add(job_id, status='pending', heartbeat_at=None, minutes_ago=0):
+        with app.app_context():
+            db.session.add(ExportJob(
+                id=job_id, user_id=user_id, tenant_id='default', bank_id=bank_id, format='pdf',
+                include_answers=True, download_name='bank.pdf', status=status, heartbeat_at=heartbeat_at,
+                created_at=datetime.utcnow() - timedelta(minutes=minutes_ago)
+            ))
+            db.session.commit()
+    return add
+
+
+def _statuses(app):
+    with app.app_context():
+        return {job.id: job.status for job in ExportJob.query.all()}
+
+
+def test_dispatch_respects_tenant_running_jobs(app, executor, add_job):
+    app.config['EXPORT_JOB_TENANT_CONCURRENCY'] = 2
+    add_job('running-elsewhere', status='running', heartbeat_at=datetime.utcnow())
+    for i in range(3):
+        add_job(f'pending-{i}', minutes_ago=10 - i)
+
+    export_jobs.dispatch_pending_jobs(app, 'default')
+    assert executor.submitted == ['pending-0']
+
+    # 名额已满时不再认领
+    export_jobs.dispatch_pending_jobs(app, 'default')
+    assert executor.submitted == ['pending-0']
+    assert list(_statuses(app).values()).count('running') == 2
+
+
+def test_status_poll_reaps_stale_jobs_and_dispatches(app, client, auth_headers, executor, add_job):
+    app.config['EXPORT_JOB_TENANT_CONCURRENCY'] = 1
+    add_job('orphaned', status='running', heartbeat_at=datetime.utcnow() - timedelta(hours=1))
+    add_job('waiting')
+
+    response = client.get('/api/v1/banks/export-jobs/waiting', headers=auth_headers)
+    assert response.status_code == 200
+    assert response.get_json()['status'] == 'running'
+    assert executor.submitted == ['waiting']
+    assert _statuses(app)['orphaned'] == 'failed'
@@ -0,0 +1,166 @@
+"""
+文件导入合并模式测试（replace / sync 的删除保护）
+"""
+import io
+import json
+
+import pytest
+
+from app import db
+from app.models import Question, QuestionBank, User, UserAnswer, UserFavorite, FileImport
+from app.services.file_parser import FileParserService, ImportRefusedError
+
+
+def _question(title, order_index=0):
+    return {
+        'type': 'choice',
+        'title': title,
+        'content': {'options': [{'key': 'A', 'text': '是'}, {'key': 'B', 'text': '否'}]},
+        'answer': {'correct_option': 'A'},
+        'order_index': order_index
+    }
+
+
+@pytest.fixture
+def bank_with_questions(app, auth_headers):
+    """包含3道题目的题库，返回 (题库ID, 题目ID列表)"""
+    with app.app_context():
+        user = User.query.filter_by(username='testuser').first()
+        bank = QuestionBank(name='导入测试题库', creator_id=user.id, tenant_id=user.tenant_id)
+        db.session.add(bank)
+        db.session.flush()
+        questions = [
+            Question(bank_id=bank.id, order_index=i, **{k: v for k, v in _question(f'原题{i}').items()
+                                                         if k != 'order_index'})
+            for i in range(3)
+        ]
+        db.session.add_all(questions)
+        db.session.commit()
+        return bank.id, [question.id for question in questions]
+
+
+def _add_history(app, question_id):
+    with app.app_context():
+        user = User.query.filter_by(username='testuser').first()
+        question = db.session.get(Question, question_id)
+        db.session.add(UserAnswer(user_id=user.id, question_id=question_id, bank_id=question.bank_id,
+                                  user_answer={'selected_option': 'A'}, is_correct=True, score=1))
+        db.session.add(UserFavorite(user_id=user.id, question_id=question_id))
+        db.session.commit()
+
+
+def _question_ids(app, bank_id):
+    with app.app_context():
+        return sorted(question.id for question in Question.query.filter_by(bank_id=bank_id))
+
+
+@pytest.mark.parametrize('merge_mode', ['replace', 'sync'])
+def test_refuses_when_nothing_parsed(app, bank_with_questions, merge_mode):
+    bank_id, question_ids = bank_with_questions
+    with app.app_context():
+        with pytest.raises(ImportRefusedError):
+            FileParserService().merge_questions(iter([]), bank_id, merge_mode)
+    assert _question_ids(app, bank_id) == question_ids
+
+
+@pytest.mark.parametrize('merge_mode', ['replace', 'sync'])
+def test_refuses_when_rows_skipped(app, bank_with_questions, merge_mode):
+    bank_id, question_ids = bank_with_questions
+    with app.app_context():
+        service = FileParserService()
+        service._skip(2, '无效的题目类型: bad')
+        with pytest.raises(ImportRefusedError):
+            service.merge_questions(iter([_question('新题')]), bank_id, merge_mode)
+    assert _question_ids(app, bank_id) == question_ids
+
+
+def test_append_allows_skipped_rows(app, bank_with_questions):
+    bank_id, question_ids = bank_with_questions
+    with app.app_context():
+        service = FileParserService()
+        service._skip(2, '无效的题目类型: bad')
+        stats = service.merge_questions(iter([_question('新题', 3)]), bank_id, 'append')
+    assert stats['inserted'] == 1
+    assert len(_question_ids(app, bank_id)) == len(question_ids) + 1
+
+
+def test_replace_requires_confirmation_to_delete_history(app, bank_with_questions):
+    bank_id, question_ids = bank_with_questions
+    _add_history(app, question_ids[0])
+
+    with app.app_context():
+        with pytest.raises(ImportRefusedError, match='答题记录'):
+            FileParserService().merge_questions(iter([_question('新题')]), bank_id, 'replace')
+    assert _question_ids(app, bank_id) == question_ids
+
+    with app.app_context():
+        stats = FileParserService().merge_questions(
+            iter([_question('新题')]), bank_id, 'replace', delete_history=True
+        )
+        assert stats['deleted'] == 3
+        assert stats['inserted'] == 1
+        assert UserAnswer.query.count() == 0
+        assert UserFavorite.query.count() == 0
+
+
+def test_replace_without_history(app, bank_with_questions):
+    bank_id, _ = bank_with_questions
+    with app.app_context():
+        stats = FileParserService().merge_questions(
+            iter([_question('新题0'), _question('新题1', 1)]), bank_id, 'replace'
+        )
+    assert stats == {'total': 2, 'inserted': 2, 'updated': 0, 'unchanged': 0, 'deleted': 3}
+
+
+def test_sync_requires_confirmation_to_delete_history(app, bank_with_questions):
+    bank_id, question_ids = bank_with_questions
+    _add_history(app, question_ids[2])
+    # 文件只包含前两道题，第三道题将被删除
+    questions = [_question('原题0'), _question('原题1', 1)]
+
+    with app.app_context():
+        with pytest.raises(ImportRefusedError, match='收藏'):
+            FileParserService().merge_questions(iter(questions), bank_id, 'sync')
+    assert _question_ids(app, bank_id) == question_ids
+
+    with app.app_context():
+        stats = FileParserService().merge_questions(iter(questions), bank_id, 'sync', delete_history=True)
+        assert stats['unchanged'] == 2
+        assert stats['deleted'] == 1
+        assert UserFavorite.query.count() == 0
+    assert _question_ids(app, bank_id) == question_ids[:2]
+
+
+def test_sync_keeps_history_of_unchanged_questions(app, bank_with_questions):
+    bank_id, question_ids = bank_with_questions
+    _add_history(app, question_ids[0])
+    questions = [_question('原题0'), _question('原题1', 1), _question('原题2', 2), _question('新题', 3)]
+
+    with app.app_context():
+        stats = FileParserService().merge_questions(iter(questions), bank_id, 'sync')
+        assert stats['inserted'] == 1
+        assert stats['deleted'] == 0
+        assert UserAnswer.query.filter_by(question_id=question_ids[0]).count() == 1
+
+
+def test_parse_endpoint_refuses_empty_sync(app, client, auth_headers, bank_with_questions):
+    bank_id, question_ids = bank_with_questions
+    payload = json.dumps([{'type': 'bad', 'title': 'x', 'content': {}, 'answer': {}}]).encode('utf-8')
+
+    response = client.post('/api/v1/files/upload', headers=auth_headers, data={
+        'file': (io.BytesIO(payload), 'questions.json'),
+        'bank_id': str(bank_id),
+        'merge_mode': 'sync'
+    }, content_type='multipart/form-data')
+    assert response.status_code in (200, 201), response.get_json()
+    import_id = response.get_json()['import_id']
+
+    response = client.post(f'/api/v1/files/parse/{import_id}', headers=auth_headers, json={})
+    assert response.status_code == 400
+    body = response.get_json()
+    assert body['skipped_count'] == 1
+    assert _question_ids(app, bank_id) == question_ids
+
+    # 导入记录恢复为待处理，可以修正后重新解析
+    with app.app_context():
+        assert db.session.get(FileImport, import_id).status == 'pending'
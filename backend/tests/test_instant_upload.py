@@ -0,0 +1,49 @@
+"""
+分片上传秒传测试：只复用本用户或本租户上传过的内容
+"""
+import hashlib
+import io
+import json
+
+from app import db
+from app.models import Tenant, User
+
+PAYLOAD = json.dumps([{'type': 'true_false', 'title': '私有题目', 'content': {}, 'answer': {'is_true': True}}]).encode('utf-8')
+DIGEST = hashlib.sha256(PAYLOAD).hexdigest()
+
+
+def _login(client, username, tenant_id):
+    with client.application.app_context():
+        if db.session.get(Tenant, tenant_id) is None:
+            db.session.add(Tenant(id=tenant_id, name=tenant_id, code=tenant_id))
+        user = User(username=username, email=f'{username}@example.com', tenant_id=tenant_id)
+        user.set_password('testpass')
+        db.session.add(user)
+        db.session.commit()
+    response = client.post('/api/v1/auth/login', json={'username': username, 'password': 'testpass'})
+    return {'Authorization': f'Bearer {response.get_json()["access_token"]}'}
+
+
+def _init_upload(client, headers):
+    return client.post('/api/v1/files/uploads', headers=headers, json={
+        'filename': 'questions.json', 'file_size': len(PAYLOAD), 'sha256': DIGEST
+    })
+
+
+def test_instant_upload_scoped_to_tenant(client, auth_headers):
+    response = client.post('/api/v1/files/upload', headers=auth_headers, data={
+        'file': (io.BytesIO(PAYLOAD), 'questions.json')
+    }, content_type='multipart/form-data')
+    assert response.status_code in (200, 201), response.get_json()
+
+    # 其他租户只知道哈希，需要上传文件
+    other_tenant = _login(client, 'outsider', 'other')
+    response = _init_upload(client, other_tenant)
+    assert response.status_code == 201
+    assert response.get_json()['instant'] is False
+
+    # 同租户的其他用户可以秒传
+    colleague = _login(client, 'colleague', 'default')
+    response = _init_upload(client, colleague)
+    assert response.status_code == 201
+    assert response.get_json()['instant'] is True
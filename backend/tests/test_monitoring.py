@@ -0,0 +1,23 @@
+"""
+监控端点和访问日志测试
+"""
+import logging
+
+from app import create_app
+from config import config
+
+
+def test_request_logging_off_by_default(client, caplog):
+    with caplog.at_level(logging.INFO, logger='app.utils.monitoring'):
+        assert client.get('/health').status_code == 200
+    assert not [record for record in caplog.records if record.getMessage().startswith(('Request:', 'Response:'))]
+
+
+def test_request_logging_enabled(monkeypatch, caplog):
+    monkeypatch.setattr(config['testing'], 'REQUEST_LOGGING_ENABLED', True)
+    client = create_app('testing').test_client()
+    with caplog.at_level(logging.INFO, logger='app.utils.monitoring'):
+        assert client.get('/health').status_code == 200
+    messages = [record.getMessage() for record in caplog.records]
+    assert any(message.startswith('Request:') for message in messages)
+    assert any(message.startswith('Response:') for message in messages)
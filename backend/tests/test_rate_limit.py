@@ -0,0 +1,47 @@
+"""
+速率限制测试
+"""
+from app import create_app, db
+from app.utils.rate_limit import TokenBucketLimiter, rate_limiter
+from config import config
+
+
+def test_denied_request_does_not_consume_other_keys():
+    limiter = TokenBucketLimiter()
+    keys = [('user', 1, 60), ('tenant', 5, 60)]
+    assert limiter.acquire(keys) == 0
+    for _ in range(10):
+        assert limiter.acquire(keys) > 0
+
+    # 被用户键拒绝的请求没有扣减租户键
+    for _ in range(4):
+        assert limiter.acquire([('tenant', 5, 60)]) == 0
+    assert limiter.acquire([('tenant', 5, 60)]) > 0
+
+
+def test_login_limit_is_per_forwarded_client(monkeypatch):
+    # 应用部署在一层反向代理之后
+    monkeypatch.setattr(config['testing'], 'PROXY_FIX_HOPS', 1)
+    monkeypatch.setattr(config['testing'], 'RATELIMIT_ENABLED', True)
+    monkeypatch.setattr(config['testing'], 'RATELIMIT_LOGIN', '2 per minute')
+    app = create_app('testing')
+    client = app.test_client()
+    rate_limiter.local.clear()
+
+    def login(client_ip):
+        return client.post(
+            '/api/v1/auth/login', json={'username': 'nobody', 'password': 'wrong'},
+            environ_base={'REMOTE_ADDR': '10.0.0.1'}, headers={'X-Forwarded-For': client_ip}
+        )
+
+    with app.app_context():
+        db.create_all()
+
+    assert login('203.0.113.1').status_code != 429
+    assert login('203.0.113.1').status_code != 429
+    assert login('203.0.113.1').status_code == 429
+    # 同一代理之后的其他客户端不受影响
+    assert login('203.0.113.2').status_code != 429
+
+    with app.app_context():
+        db.drop_all()
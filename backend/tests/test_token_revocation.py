@@ -0,0 +1,46 @@
+"""
+令牌撤销测试
+"""
+from app import db
+from app.models import User
+from app.services import token_revocation
+from app.services.token_revocation import revoke_user_sessions
+
+
+def _profile(client, headers):
+    return client.get('/api/v1/auth/me', headers=headers)
+
+
+def test_users_change_password_revokes_tokens(client, auth_headers):
+    assert _profile(client, auth_headers).status_code == 200
+
+    response = client.post('/api/v1/users/change-password', headers=auth_headers, json={
+        'old_password': 'testpass',
+        'new_password': 'newpass123'
+    })
+    assert response.status_code == 200
+
+    assert _profile(client, auth_headers).status_code == 401
+
+
+def test_rolled_back_revocation_is_not_published(app, client, auth_headers):
+    # 先完成一次检查，使过滤器已初始化
+    assert _profile(client, auth_headers).status_code == 200
+    with app.app_context():
+        user = User.query.filter_by(username='testuser').first()
+        assert revoke_user_sessions(user.id) > 0
+        db.session.rollback()
+
+    assert _profile(client, auth_headers).status_code == 200
+
+
+def test_revocation_check_fails_closed(app, client, auth_headers, monkeypatch):
+    def unavailable(jti, source):
+        raise RuntimeError('revocation store unavailable')
+
+    revocation_filter, _ = token_revocation._get_filter()
+    monkeypatch.setattr(revocation_filter, 'is_revoked', unavailable)
+    assert _profile(client, auth_headers).status_code == 401
+
+    app.config['TOKEN_REVOCATION_FAIL_OPEN'] = True
+    assert _profile(client, auth_headers).status_code == 200